@@ -1,5 +1,7 @@
 import operator
+from collections import defaultdict
 from itertools import product
+from typing import Dict, List, Optional, Tuple
 
 OPCODES = {
     1: operator.add,
@@ -25,7 +27,112 @@ def part_1(prg):
     return run(prg)[0]
 
 
-def part_2(prg):
+# Exponents of (noun, verb)
+Monomial = Tuple[int, int]
+
+
+class Polynomial:
+    """Polynomial in `noun` and `verb` with integer coefficients."""
+
+    def __init__(self, terms: Dict[Monomial, int] = None):
+        self.terms = {m: c for m, c in (terms or {}).items() if c != 0}
+
+    @classmethod
+    def constant(cls, val: int) -> "Polynomial":
+        return cls({(0, 0): val})
+
+    def __add__(self, other: "Polynomial") -> "Polynomial":
+        terms = defaultdict(int, self.terms)
+        for m, c in other.terms.items():
+            terms[m] += c
+        return Polynomial(terms)
+
+    def __mul__(self, other: "Polynomial") -> "Polynomial":
+        terms: Dict[Monomial, int] = defaultdict(int)
+        for (n1, v1), c1 in self.terms.items():
+            for (n2, v2), c2 in other.terms.items():
+                terms[n1 + n2, v1 + v2] += c1 * c2
+        return Polynomial(terms)
+
+    def coefficient(self, noun: int = 0, verb: int = 0) -> int:
+        return self.terms.get((noun, verb), 0)
+
+    def is_constant(self) -> bool:
+        return all(m == (0, 0) for m in self.terms)
+
+    def is_affine(self) -> bool:
+        return all(n + v <= 1 for n, v in self.terms)
+
+    def __call__(self, noun: int, verb: int) -> int:
+        return sum(c * noun ** n * verb ** v for (n, v), c in self.terms.items())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        return self.terms == other.terms
+
+    def __repr__(self) -> str:
+        return f"Polynomial({self.terms})"
+
+
+NOUN = Polynomial({(1, 0): 1})
+VERB = Polynomial({(0, 1): 1})
+
+
+def run_symbolic(prg) -> List[Optional[Polynomial]]:
+    """Runs `prg` with `noun` and `verb` in addresses 1 and 2, as `run`.
+
+    Returns the final memory as polynomials. A cell read through an address
+    depending on the noun or verb is unknown (None), as is anything computed from
+    it, which is fine as long as it's overwritten before being used.
+
+    Raises:
+        ValueError: If an opcode, or address written to, isn't a constant
+    """
+    mem: List[Optional[Polynomial]] = [Polynomial.constant(x) for x in prg]
+    mem[1], mem[2] = NOUN, VERB
+
+    def address(ip: int) -> Optional[int]:
+        # None if the address isn't known
+        val = mem[ip]
+        if val is None or not val.is_constant():
+            return None
+        return val.coefficient()
+
+    ip = 0
+    while True:
+        op = address(ip)
+        if op == 99:
+            break
+        if op not in OPCODES:
+            raise ValueError(f"Unsupported opcode at {ip}: {mem[ip]}")
+        p1, p2, p3 = (address(ip + i) for i in range(1, 4))
+        if p3 is None:
+            raise ValueError(f"Unknown address written to at {ip}")
+        x = mem[p1] if p1 is not None else None
+        y = mem[p2] if p2 is not None else None
+        mem[p3] = OPCODES[op](x, y) if x is not None and y is not None else None
+        ip += 4
+    return mem
+
+
+def solve_affine(output: Polynomial, target: int) -> Optional[Tuple[int, int]]:
+    """The `(noun, verb)` from 0-99 for which `output` is `target`, in the order
+    `part_2_brute_force` tries them."""
+    a, b = output.coefficient(noun=1), output.coefficient(verb=1)
+    rest = target - output.coefficient()
+    for verb in range(100):
+        if a == 0:
+            if b * verb == rest:
+                return 0, verb
+            continue
+        noun, remainder = divmod(rest - b * verb, a)
+        if remainder == 0 and 0 <= noun < 100:
+            return noun, verb
+    return None
+
+
+def part_2_brute_force(prg):
     for x2, x1 in product(range(100), range(100)):
         _prg = prg[:]
         _prg[1], _prg[2] = x1, x2
@@ -33,6 +140,26 @@ def part_2(prg):
             return 100 * x1 + x2
 
 
+def part_2(prg):
+    """Solves for the noun and verb algebraically, when address 0 ends up as an
+    affine function of them, otherwise falls back to `part_2_brute_force`."""
+    try:
+        output = run_symbolic(prg)[0]
+    except ValueError:
+        output = None
+    if output is None or not output.is_affine():
+        return part_2_brute_force(prg)
+    found = solve_affine(output, 19690720)
+    if found is None:
+        return None
+    noun, verb = found
+    # Confirm with a concrete run
+    _prg = prg[:]
+    _prg[1], _prg[2] = noun, verb
+    assert run(_prg)[0] == 19690720
+    return 100 * noun + verb
+
+
 def main(puzzle_input_f):
     line = puzzle_input_f.read().strip()
     prg = [int(x) for x in line.split(",")]
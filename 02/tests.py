@@ -1,6 +1,14 @@
 import pytest
 
-from solution import run
+from solution import (
+    NOUN,
+    VERB,
+    Polynomial,
+    part_2,
+    part_2_brute_force,
+    run,
+    run_symbolic,
+)
 
 
 @pytest.mark.parametrize(
@@ -15,3 +23,40 @@ from solution import run
 def test_run(prg, expected):
     result = run(prg)
     assert result == expected
+
+
+def padded(prg):
+    # Room for the first instruction to read any address from 0-99
+    return prg + [0] * (100 - len(prg))
+
+
+# [0] = 100000 * noun + verb + 18490686
+AFFINE = padded(
+    [1, 0, 0, 3, 2, 1, 17, 0, 1, 0, 2, 0, 1, 0, 18, 0, 99, 100000, 18490686]
+)
+
+
+def test_run_symbolic():
+    mem = run_symbolic(AFFINE)
+    assert mem[0] == Polynomial({(1, 0): 100000, (0, 1): 1, (0, 0): 18490686})
+    assert mem[0].is_affine()
+    # The first instruction's result depends on what's at the noun and verb
+    assert mem[3] is None
+    assert mem[0](12, 34) == run(AFFINE[:1] + [12, 34] + AFFINE[3:])[0]
+
+
+def test_run_symbolic_not_affine():
+    # [0] = noun * verb
+    mem = run_symbolic(padded([1, 0, 0, 3, 2, 1, 2, 0, 99]))
+    assert mem[0] == NOUN * VERB
+    assert not mem[0].is_affine()
+
+
+def test_run_symbolic_unknown_write():
+    # Writes to the address computed by the first instruction
+    with pytest.raises(ValueError):
+        run_symbolic(padded([1, 1, 2, 7, 1, 0, 0, 0, 99]))
+
+
+def test_part_2():
+    assert part_2(AFFINE[:]) == part_2_brute_force(AFFINE[:]) == 1234
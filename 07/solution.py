@@ -1,81 +1,19 @@
-"""
-Note: Intcode computer (`run` function) mostly copied from day 05 solution
-"""
 import itertools
+import os
+import queue
+import time
 from collections import deque
-from enum import IntEnum
-from typing import List, NamedTuple
+from multiprocessing import Process, Queue
+from typing import Dict, List, Optional, Tuple
 
-
-class Mode(IntEnum):
-    position = 0
-    immediate = 1
-
-
-class Instruction(NamedTuple):
-    op: int
-    modes: List[Mode]
-
-
-# Note: 3 and 4 are special cases and handled within run
-OPCODES = {
-    1: lambda x, y: x + y,
-    2: lambda x, y: x * y,
-    5: lambda test, val: val if test != 0 else None,
-    6: lambda test, val: val if test == 0 else None,
-    7: lambda x, y: 1 if x < y else 0,
-    8: lambda x, y: 1 if x == y else 0,
-}
-
-
-def parse_instruction(code) -> Instruction:
-    op = code % 100
-    inst = Instruction(op, [code // i % 10 for i in (100, 1000, 10000)])
-    assert inst.modes[-1] == Mode.position
-    return inst
-
-
-# TODO: Clean this up! I'm not proud of this code, it's *certainly* not clean or elegant!
-def run(prg, inqueue):
-    ip = 0
-    while True:
-        inst = parse_instruction(prg[ip])
-
-        if inst.op == 99:
-            return prg
-        elif inst.op == 3:
-            prg[prg[ip + 1]] = inqueue.popleft()  # 'read' from input
-            ip += 2
-        elif inst.op == 4:
-            yield prg[prg[ip + 1]]  # 'output' a value
-            ip += 2
-        else:
-            # get params according to modes
-            params = []
-            for mode, val in zip(inst.modes, prg[ip + 1 : ip + 3]):
-                if mode == Mode.position:
-                    params.append(prg[val])
-                elif mode == Mode.immediate:
-                    params.append(val)
-            if inst.op in (5, 6):
-                jump_pos = OPCODES[inst.op](*params)
-                if jump_pos is None:
-                    ip += 3
-                else:
-                    ip = jump_pos
-            else:
-                # calculate result according to op
-                result = OPCODES[inst.op](*params)
-                # store result according to final mode
-                prg[prg[ip + 3]] = result
-                ip += 4
-    return prg
+from intcode import execute_sync, prg_to_memory, run
 
 
 class Amplifier:
     def __init__(self, name, prg, phase):
+        self.name = name
         self.inqueue = deque([phase])
-        self.process = run(prg[:], self.inqueue)
+        self.process = run(prg_to_memory(prg), self.inqueue)
 
     def __str__(self):
         return f"Amplifier {self.name}"
@@ -106,14 +44,219 @@ def run_amps(prg, phases, init_val=0):
         next_amp.inqueue.append(val)
 
 
+class AmplifierChain:
+    """Evaluates chains of amplifiers without feedback, caching each amplifier's
+    output by the phases of the chain up to and including it, and the chain's
+    input signal.
+
+    Chains sharing a prefix of phases share the outputs of those amplifiers, so
+    evaluating every permutation of phases runs each node of the permutation
+    tree once, e.g. 325 amplifier runs rather than 600 for 5 amplifiers.
+    """
+
+    def __init__(self, prg):
+        self.prg = prg
+        self.outputs: Dict[Tuple[Tuple[int, ...], int], int] = {}
+        self.runs = 0
+        # Amplifier runs avoided by using cached outputs
+        self.avoided = 0
+
+    def output(self, phases: Tuple[int, ...], init_val: int = 0) -> int:
+        key = (phases, init_val)
+        if key in self.outputs:
+            self.avoided += len(phases)
+            return self.outputs[key]
+        signal = self.output(phases[:-1], init_val) if len(phases) > 1 else init_val
+        amp = Amplifier(len(phases) - 1, self.prg, phases[-1])
+        amp.inqueue.append(signal)
+        self.runs += 1
+        self.outputs[key] = next(amp)
+        return self.outputs[key]
+
+
 def part_1(prg):
-    return max(run_amps(prg, phases) for phases in itertools.permutations(range(5)))
+    chain = AmplifierChain(prg)
+    # Permutations are generated depth-first, in lexicographic order
+    return max(chain.output(phases) for phases in itertools.permutations(range(5)))
 
 
 def part_2(prg):
     return max(run_amps(prg, phases) for phases in itertools.permutations(range(5, 10)))
 
 
+# Maximum signals waiting to be read by each amplifier in a pipelined chain
+QUEUE_SIZE = 16
+
+
+def run_amp_worker(
+    key, index: int, prg, first_inputs, inq: Queue, outq: Queue, results: Queue
+):
+    """Worker process running an amplifier of a pipelined chain.
+
+    Reads `first_inputs` (its phase, and the initial signal for the first
+    amplifier) then signals from `inq`, and writes its output signals to `outq`.
+    Once the amplifier halts, the chain's `key`, the amplifier's index, its last
+    output and its number of outputs are put on `results`.
+    """
+    inputs = itertools.chain(first_inputs, iter(inq.get, None))
+    last, n_outputs = None, 0
+
+    def write_out(val: int):
+        nonlocal last, n_outputs
+        last, n_outputs = val, n_outputs + 1
+        outq.put(val)
+
+    execute_sync(prg_to_memory(prg), lambda: next(inputs), write_out)
+    results.put((key, index, last, n_outputs))
+
+
+class PipelinedChain:
+    """A feedback loop of amplifiers, each in its own process, connected by
+    bounded queues.
+
+    The amplifiers report to `results` when they halt (see `run_amp_worker`),
+    which can be shared by several chains with different `key`s.
+    """
+
+    def __init__(self, prg, phases, results: Queue, key=None, init_val=0):
+        queues = [Queue(QUEUE_SIZE) for _ in phases]
+        # The first inputs are passed to the workers rather than put on their
+        # queues, as they'd race other amplifiers' outputs onto them
+        first_inputs = [[phase] for phase in phases]
+        first_inputs[0].append(init_val)
+        self.amps = [
+            Process(
+                target=run_amp_worker,
+                args=(
+                    key,
+                    i,
+                    prg,
+                    first_inputs[i],
+                    q,
+                    queues[(i + 1) % len(queues)],
+                    results,
+                ),
+            )
+            for i, q in enumerate(queues)
+        ]
+        for amp in self.amps:
+            amp.start()
+        self.outputs: Dict[int, int] = {}
+        # Signals passed between amplifiers
+        self.signals = 0
+
+    def record(self, index: int, last: int, n_outputs: int):
+        self.outputs[index] = last
+        self.signals += n_outputs
+        if self.done:
+            for amp in self.amps:
+                amp.join()
+
+    def close(self):
+        """Stops any amplifiers still running, e.g. if another has died."""
+        for amp in self.amps:
+            if amp.is_alive():
+                amp.terminate()
+            amp.join()
+
+    @property
+    def done(self) -> bool:
+        return len(self.outputs) == len(self.amps)
+
+    @property
+    def output(self) -> int:
+        """The last amplifier's final output."""
+        return self.outputs[len(self.amps) - 1]
+
+
+# Seconds to wait for a result before checking the amplifiers are still alive
+POLL_INTERVAL = 0.1
+
+
+def get_result(results: Queue, amps: List[Process]):
+    """The next result put on `results` by one of `amps`.
+
+    Raises:
+        RuntimeError: If one of `amps` dies (e.g. the program crashed), as its
+            result would never be put
+    """
+    while True:
+        try:
+            return results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            pass
+        for amp in amps:
+            if amp.exitcode:
+                raise RuntimeError(f"{amp.name} exited with code {amp.exitcode}")
+
+
+def run_amps_pipelined(prg, phases, init_val=0) -> PipelinedChain:
+    """`run_amps` with a `PipelinedChain`, returned once every amplifier halts."""
+    results: Queue = Queue()
+    chain = PipelinedChain(prg, phases, results, init_val=init_val)
+    try:
+        while not chain.done:
+            _, *result = get_result(results, chain.amps)
+            chain.record(*result)
+    finally:
+        chain.close()
+    return chain
+
+
+def part_2_pipelined(prg, max_chains: Optional[int] = None):
+    """`part_2`, evaluating the permutations concurrently with pipelined chains.
+
+    A single chain has only one signal in flight around its loop, so only one
+    of its amplifiers is ever running: the permutations' chains are what run in
+    parallel, up to `max_chains` at once (default: number of CPUs).
+    """
+    permutations = itertools.permutations(range(5, 10))
+    results: Queue = Queue()
+    running: Dict[Tuple[int, ...], PipelinedChain] = {}
+    best = None
+
+    def start_next():
+        phases = next(permutations, None)
+        if phases is not None:
+            running[phases] = PipelinedChain(prg, phases, results, key=phases)
+
+    try:
+        for _ in range(max_chains or os.cpu_count()):
+            start_next()
+        while running:
+            amps = [amp for chain in running.values() for amp in chain.amps]
+            phases, *result = get_result(results, amps)
+            chain = running[phases]
+            chain.record(*result)
+            if chain.done:
+                del running[phases]
+                best = chain.output if best is None else max(best, chain.output)
+                start_next()
+    finally:
+        for chain in running.values():
+            chain.close()
+    return best
+
+
+def throughput(prg, n_amps: int, pipelined: bool) -> float:
+    """Signals per second passed around a feedback loop of `n_amps` amplifiers."""
+    phases = list(itertools.islice(itertools.cycle(range(5, 10)), n_amps))
+    start = time.perf_counter()
+    if pipelined:
+        signals = run_amps_pipelined(prg, phases).signals
+    else:
+        amps = [Amplifier(i, prg, p) for i, p in enumerate(phases)]
+        amps[0].inqueue.append(0)
+        signals = 0
+        for amp, next_amp in pairwise_circle(amps):
+            try:
+                next_amp.inqueue.append(next(amp))
+            except StopIteration:
+                break
+            signals += 1
+    return signals / (time.perf_counter() - start)
+
+
 def main(puzzle_input_f):
     line = puzzle_input_f.read().strip()
     prg = [int(x) for x in line.split(",")]
@@ -122,7 +265,6 @@ def main(puzzle_input_f):
 
 
 if __name__ == "__main__":
-    import os
     from aocpy import input_cli
 
     base_dir = os.path.dirname(__file__)
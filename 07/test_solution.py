@@ -0,0 +1,75 @@
+import itertools
+import multiprocessing
+
+import pytest
+
+from solution import (
+    AmplifierChain,
+    part_1,
+    part_2,
+    part_2_pipelined,
+    run_amps,
+    run_amps_pipelined,
+    throughput,
+)
+
+EXAMPLE_1 = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
+EXAMPLE_2 = [
+    3, 23, 3, 24, 1002, 24, 10, 24, 1002, 23, -1, 23, 101, 5, 23, 23, 1, 24, 23, 23,
+    4, 23, 99, 0, 0,
+]  # fmt: skip
+FEEDBACK_EXAMPLE = [
+    3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001, 28,
+    -1, 28, 1005, 28, 6, 99, 0, 0, 5,
+]  # fmt: skip
+
+
+@pytest.mark.parametrize(
+    "prg,phases,expected",
+    [(EXAMPLE_1, (4, 3, 2, 1, 0), 43210), (EXAMPLE_2, (0, 1, 2, 3, 4), 54321)],
+)
+def test_chain_output(prg, phases, expected):
+    assert AmplifierChain(prg).output(phases) == expected
+    assert run_amps(prg, phases) == expected
+    assert part_1(prg) == expected
+
+
+def test_chain_runs_each_prefix_once():
+    chain = AmplifierChain(EXAMPLE_1)
+    for phases in itertools.permutations(range(5)):
+        chain.output(phases)
+    assert chain.runs == 5 + 5 * 4 + 5 * 4 * 3 + 5 * 4 * 3 * 2 + 120
+    assert chain.runs + chain.avoided == 5 * 120
+
+
+def test_feedback_loop():
+    assert part_2(FEEDBACK_EXAMPLE) == 139629729
+
+
+def test_pipelined_feedback_loop():
+    chain = run_amps_pipelined(FEEDBACK_EXAMPLE, (9, 8, 7, 6, 5))
+    assert chain.output == 139629729
+    # Each amplifier outputs 5 signals before halting
+    assert chain.signals == 5 * 5
+    assert part_2_pipelined(FEEDBACK_EXAMPLE, max_chains=4) == 139629729
+
+
+# The first amplifier crashes on an invalid opcode once it's read its inputs,
+# leaving the others waiting for signals
+CRASHES = [3, 0, 3, 0, 42]
+
+
+def test_pipelined_amplifier_dies():
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        run_amps_pipelined(CRASHES, (9, 8, 7, 6, 5))
+    # The other amplifiers were stopped
+    assert not multiprocessing.active_children()
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        part_2_pipelined(CRASHES, max_chains=2)
+    assert not multiprocessing.active_children()
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_throughput(pipelined):
+    # More amplifiers than phases, which are reused
+    assert throughput(FEEDBACK_EXAMPLE, 7, pipelined) > 0
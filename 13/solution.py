@@ -1,7 +1,6 @@
-import asyncio
 from collections import defaultdict, deque
 from enum import IntEnum
-from typing import Deque, Iterable, NamedTuple
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import intcode
 
@@ -41,13 +40,13 @@ def drain_buffer(buffer: OutputBuffer) -> Iterable[int]:
         yield buffer.popleft()
 
 
-def part_1(prg: intcode.Program):
+def part_1(prg: intcode.Program, **kwargs):
     class TileMapper:
         def __init__(self):
             self.tiles = defaultdict(lambda: TileId.EMPTY)
             self.buffer = deque([])
 
-        async def __call__(self, value):
+        def __call__(self, value):
             self.buffer.append(value)
             if len(self.buffer) == 3:
                 self.process(*drain_buffer(self.buffer))
@@ -58,56 +57,192 @@ def part_1(prg: intcode.Program):
 
     mem = intcode.prg_to_memory(prg)
     s = TileMapper()
-    asyncio.run(intcode.execute(mem, intcode.no_input, s))
+    intcode.execute_sync(mem, intcode.no_input, s, **kwargs)
     return sum(1 for v in s.tiles.values() if v == 2)
 
 
+def joystick(ball_x: int, paddle_x: int) -> JoystickPosition:
+    if ball_x == paddle_x:
+        return JoystickPosition.NEUTRAL
+    return JoystickPosition.LEFT if ball_x < paddle_x else JoystickPosition.RIGHT
+
+
+class Game:
+    def __init__(self):
+        self.tiles = defaultdict(lambda: TileId.EMPTY)
+        self.score = 0
+        self.paddle_pos: Coord = None
+        self.ball_pos: Coord = None
+        # Movement of the ball in the last frame
+        self.ball_velocity: Coord = None
+        self.buffer: OutputBuffer = deque([])
+
+    def handle_output(self, value: int):
+        self.buffer.append(value)
+        if len(self.buffer) == 3:
+            self.process(*drain_buffer(self.buffer))
+            assert not self.buffer
+
+    def handle_input(self) -> JoystickPosition:
+        if self.ball_pos is None or self.paddle_pos is None:
+            return JoystickPosition.NEUTRAL
+        return joystick(self.ball_pos.x, self.paddle_pos.x)
+
+    def process(self, x: int, y: int, tile_id_or_score: int):
+        if x == -1 and y == 0:
+            self.score = tile_id_or_score
+            return
+        c = Coord(x, y)
+        if tile_id_or_score == TileId.PADDLE:
+            self.paddle_pos = c
+        elif tile_id_or_score == TileId.BALL:
+            if self.ball_pos is not None:
+                self.ball_velocity = c - self.ball_pos
+            self.ball_pos = c
+        self.tiles[c] = tile_id_or_score
+
+    def predict_ball(self, max_frames: int) -> List[Coord]:
+        """Positions of the ball in the following frames, for as long as it's in
+        free flight, i.e. there's nothing next to it that it could bounce off."""
+        path: List[Coord] = []
+        if self.ball_velocity is None or self.paddle_pos is None:
+            return path
+        pos, v = self.ball_pos, self.ball_velocity
+        if abs(v.x) != 1 or abs(v.y) != 1:
+            return path
+        while len(path) < max_frames:
+            next_pos = pos + v
+            if next_pos.y >= self.paddle_pos.y or any(
+                self.tiles.get(c, TileId.EMPTY) != TileId.EMPTY
+                for c in (Coord(next_pos.x, pos.y), Coord(pos.x, next_pos.y), next_pos)
+            ):
+                break
+            path.append(next_pos)
+            pos = next_pos
+        return path
+
+
 # TODO: Simulate the game output with curses?
-def part_2(prg: intcode.Program):
-    class Game:
-        def __init__(self):
-            self.tiles = defaultdict(lambda: TileId.EMPTY)
-            self.score = 0
-            self.paddle_pos: Coord = None
-            self.ball_pos: Coord = None
-            self.buffer: OutputBuffer = deque([])
+def part_2(prg: intcode.Program, **kwargs):
+    mem = intcode.prg_to_memory(prg)
+    mem[0] = 2  # play for free!
 
-        async def handle_output(self, value: int):
-            self.buffer.append(value)
-            if len(self.buffer) == 3:
-                self.process(*drain_buffer(self.buffer))
-                assert not self.buffer
+    g = Game()
+    intcode.execute_sync(mem, g.handle_input, g.handle_output, **kwargs)
+    return g.score
 
-        async def handle_input(self) -> JoystickPosition:
-            if self.ball_pos is None or self.paddle_pos is None:
-                return JoystickPosition.NEUTRAL
-
-            if self.ball_pos.x == self.paddle_pos.x:
-                return JoystickPosition.NEUTRAL
-
-            return (
-                JoystickPosition.LEFT
-                if self.ball_pos.x < self.paddle_pos.x
-                else JoystickPosition.RIGHT
-            )
-
-        def process(self, x: int, y: int, tile_id_or_score: int):
-            if x == -1 and y == 0:
-                self.score = tile_id_or_score
-                return
-            c = Coord(x, y)
-            if tile_id_or_score == TileId.PADDLE:
-                self.paddle_pos = c
-            elif tile_id_or_score == TileId.BALL:
-                self.ball_pos = c
-            self.tiles[c] = tile_id_or_score
 
+# Most frames the controller would predict the ball's position for
+MAX_FAST_FORWARD = 100
+
+# `(mem, ip, rel_base)` of the VM waiting for a joystick input
+Snapshot = Tuple[intcode.Memory, int, int]
+
+
+class FastForwardStats(NamedTuple):
+    frames: int
+    # Batches of frames run with inputs predicted ahead of time, i.e. the number
+    # of times control is handed back to the controller
+    batches: int
+    # Batches which were rolled back as the ball didn't follow its prediction
+    rollbacks: int
+
+
+def run_frames(
+    snapshot: Snapshot, inputs: List[int], **kwargs
+) -> Tuple[List[List[int]], Optional[Snapshot]]:
+    """Runs a copy of the VM in `snapshot` with an input for each frame.
+
+    Returns:
+        The outputs before the first input then the outputs of each frame, and the
+        VM waiting for its next input (`None` if the game is over)
+    """
+    mem, ip, rel_base = snapshot
+    vm = intcode.execute_generator(mem.copy(), ip, rel_base, **kwargs)
+    pending = iter(inputs)
+    frames: List[List[int]] = [[]]
+    val = None
+    while True:
+        try:
+            out = vm.send(val)
+        except StopIteration as stop:
+            if stop.value is not None:
+                frames.pop()  # Stopped waiting for the next frame's input
+            return frames, stop.value
+        if out is None:
+            val = next(pending, intcode.DebugCommands.IMMEDIATE_EXIT)
+            frames.append([])
+        else:
+            val = None
+            frames[-1].append(out)
+
+
+def frame_positions(frame: List[int]) -> Dict[int, Coord]:
+    """Final positions of the tiles drawn in a frame, by tile id."""
+    return {t: Coord(x, y) for x, y, t in zip(*[iter(frame)] * 3) if x != -1}
+
+
+def part_2_fast_forward(
+    prg: intcode.Program, max_frames: int = MAX_FAST_FORWARD, **kwargs
+) -> Tuple[int, FastForwardStats]:
+    """Plays the game speculatively, feeding the VM batches of joystick inputs.
+
+    While the ball's trajectory can be predicted (see `Game.predict_ball`) the
+    joystick inputs for each frame are known in advance: the same inputs the
+    controller would choose frame by frame. A batch of them is run from a snapshot
+    of the VM, and is checked against the predicted positions of the ball and
+    paddle. If they differ, the VM is rolled back to the snapshot and only the
+    frames up to and including the first unpredicted frame are run again.
+
+    `kwargs` are passed to `intcode.execute_generator`, except `decode_cache`: the
+    batches share a decode cache, which is replaced after a rollback as it may
+    hold instructions decoded from memory which was discarded.
+
+    Returns:
+        The final score, and stats of the frames and batches run
+    """
     mem = intcode.prg_to_memory(prg)
     mem[0] = 2  # play for free!
 
     g = Game()
-    asyncio.run(intcode.execute(mem, g.handle_input, g.handle_output))
-    return g.score
+    cache = intcode.DecodeCache()
+    frames, snapshot = run_frames((mem, 0, 0), [], decode_cache=cache, **kwargs)
+    n_frames = batches = rollbacks = 0
+    while True:
+        for frame in frames:
+            for val in frame:
+                g.handle_output(val)
+        if snapshot is None:
+            return g.score, FastForwardStats(n_frames, batches, rollbacks)
+
+        path = g.predict_ball(max_frames)
+        inputs, paddle_xs = [], []
+        paddle_x = g.paddle_pos.x
+        for ball in [g.ball_pos] + path:
+            inputs.append(joystick(ball.x, paddle_x))
+            paddle_x += inputs[-1]
+            paddle_xs.append(paddle_x)
+
+        batches += 1
+        frames, next_snapshot = run_frames(
+            snapshot, inputs, decode_cache=cache, **kwargs
+        )
+        # The inputs following each frame were chosen assuming it moved the ball
+        # along its path (the paddle isn't drawn if it didn't move)
+        for i, (frame, ball) in enumerate(zip(frames[1:], path)):
+            positions = frame_positions(frame)
+            paddle = positions.get(TileId.PADDLE)
+            if positions.get(TileId.BALL) != ball or (
+                paddle is not None and paddle.x != paddle_xs[i]
+            ):
+                rollbacks += 1
+                cache = intcode.DecodeCache()
+                frames, next_snapshot = run_frames(
+                    snapshot, inputs[: i + 1], decode_cache=cache, **kwargs
+                )
+                break
+        n_frames += len(frames) - 1
+        snapshot = next_snapshot
 
 
 def main(puzzle_input_f):
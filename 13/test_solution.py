@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from solution import (
+    Coord,
+    Game,
+    TileId,
+    frame_positions,
+    part_2,
+    part_2_fast_forward,
+)
+
+PART_2 = 12952
+
+
+@pytest.fixture
+def game():
+    #  0123456
+    # 0#######
+    # 1#  #  #
+    # 2#     #
+    # 3#  o  #
+    # 4#     #
+    # 5#  -  #
+    g = Game()
+    for x in range(7):
+        g.process(x, 0, TileId.WALL)
+    for y in range(1, 6):
+        g.process(0, y, TileId.WALL)
+        g.process(6, y, TileId.WALL)
+    g.process(3, 1, TileId.BLOCK)
+    g.process(3, 5, TileId.PADDLE)
+    g.process(2, 4, TileId.BALL)
+    g.process(3, 3, TileId.BALL)
+    return g
+
+
+@pytest.fixture(scope="module")
+def puzzle_prg():
+    with open(os.path.join(os.path.dirname(__file__), "input.txt")) as f:
+        return [int(x) for x in f.read().strip().split(",")]
+
+
+def test_predict_ball(game):
+    assert game.ball_velocity == Coord(1, -1)
+    # Then bounces off the wall next to (5, 1)
+    assert game.predict_ball(10) == [Coord(4, 2), Coord(5, 1)]
+    assert game.predict_ball(1) == [Coord(4, 2)]
+    assert game.predict_ball(0) == []
+
+
+def test_predict_ball_stops_at_block(game):
+    game.process(2, 2, TileId.BALL)
+    game.ball_velocity = Coord(1, -1)
+    # The ball would bounce off the block at (3, 1)
+    assert game.predict_ball(10) == []
+
+
+def test_predict_ball_stops_above_paddle(game):
+    game.ball_velocity = Coord(1, 1)
+    assert game.predict_ball(10) == [Coord(4, 4)]
+
+
+def test_frame_positions():
+    frame = [3, 5, TileId.EMPTY, 4, 5, TileId.PADDLE, -1, 0, 120, 2, 2, TileId.BALL]
+    assert frame_positions(frame) == {
+        TileId.EMPTY: Coord(3, 5),
+        TileId.PADDLE: Coord(4, 5),
+        TileId.BALL: Coord(2, 2),
+    }
+
+
+def test_part_2(puzzle_prg):
+    assert part_2(puzzle_prg) == PART_2
+
+
+def test_part_2_fast_forward(puzzle_prg):
+    score, stats = part_2_fast_forward(puzzle_prg)
+    assert score == PART_2
+    assert stats.batches < stats.frames
+
+
+def test_part_2_fast_forward_rolls_back(puzzle_prg, monkeypatch):
+    predict_ball = Game.predict_ball
+
+    def mispredict(self, max_frames):
+        # The ball is predicted one tile to the right in the last frame, so the
+        # joystick input chosen after that frame is wrong
+        path = predict_ball(self, max_frames)
+        if path:
+            path[-1] += Coord(1, 0)
+        return path
+
+    monkeypatch.setattr(Game, "predict_ball", mispredict)
+    score, stats = part_2_fast_forward(puzzle_prg)
+    assert stats.rollbacks > 0
+    # The same game as frame by frame
+    assert score == PART_2
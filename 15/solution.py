@@ -1,9 +1,9 @@
-import asyncio
 from collections import deque
 from enum import IntEnum
-from typing import Iterable, List, NamedTuple, Set, Tuple, Deque, Optional
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple, Deque, Optional
 
 import intcode
+from flatgrid import UNREACHABLE, bfs
 
 
 class Coord(NamedTuple):
@@ -52,88 +52,126 @@ def moves_from(loc: Coord) -> Iterable[Tuple[Coord, MoveCmd]]:
     return ((loc + diff, move_cmd) for move_cmd, diff in MOVE_DIRECTIONS.items())
 
 
-def find_path(
-    start: Coord, target: Coord, traversable_locations: Set[Coord]
-) -> List[Tuple[Coord, MoveCmd]]:
-    SearchNode = Tuple[Coord, List[Tuple[Coord, MoveCmd]]]
-    if start == target:
-        return []
-    seen: Set[Coord] = set()
-    q: Deque[SearchNode] = deque([(start, [])])
-    while True:
-        loc, path = q.popleft()
-        for next_loc, move_cmd in moves_from(loc):
-            next_path = path + [(next_loc, move_cmd)]
-            if next_loc == target:
-                return next_path
-            if next_loc in seen or next_loc not in traversable_locations:
-                continue
-            q.append((next_loc, next_path))
-            seen.add(next_loc)
+def move_droid(
+    droid: intcode.VMSnapshot, move_cmd: MoveCmd
+) -> Tuple[DroidStatus, intcode.VMSnapshot]:
+    """Moves a clone of `droid` (VM state, waiting for a movement command)."""
+    inputs = iter([move_cmd])
+    outputs: List[int] = []
+    mem, ip, rel_base = intcode.execute_sync(
+        droid.mem.copy(),
+        lambda: next(inputs, intcode.DebugCommands.IMMEDIATE_EXIT),
+        outputs.append,
+        droid.ip,
+        droid.rel_base,
+    )
+    return DroidStatus(outputs[0]), intcode.VMSnapshot(mem, ip, rel_base)
+
+
+class ShipMap(NamedTuple):
+    # Moves from the droid's start location to each traversable location
+    distances: Dict[Coord, int]
+    oxygen_system_pos: Coord
+
 
+def flood_fill_ship(prg: intcode.Program) -> ShipMap:
+    """Explores the ship breadth-first, cloning the droid at every location.
 
-async def explore_ship(mem: intcode.Memory) -> Tuple[Set[Coord], Coord]:
-    seen: Set[Coord] = set()
-    traversable_locations: Set[Coord] = set()
+    Rather than driving a single droid back and forth between frontier
+    locations, each location is only moved into once: by a clone of the droid at
+    the location it was first reached from.
+    """
+    start = intcode.VMSnapshot(intcode.prg_to_memory(prg), 0, 0)
+    distances = {DROID_START_LOCATION: 0}
+    walls: Set[Coord] = set()
     oxygen_system_pos: Optional[Coord] = None
-    droid_loc = DROID_START_LOCATION
-    to_visit = {droid_loc}
-    inq: asyncio.Queue = asyncio.Queue()
-    outq: asyncio.Queue = asyncio.Queue()
-
-    pc = asyncio.create_task(intcode.execute(mem, inq.get, outq.put))
-
-    while to_visit:
-        target = to_visit.pop()
-        seen.add(target)
-        path = find_path(droid_loc, target, traversable_locations)
-        if path:
-            for next_loc, move_cmd in path:
-                await inq.put(move_cmd)
-                status = await outq.get()
-                if status == DroidStatus.WALL:
-                    break
-                droid_loc = next_loc
-                if status == DroidStatus.MOVED_FOUND_SYSTEM:
-                    oxygen_system_pos = droid_loc
-        else:
-            status = DroidStatus.MOVED
-
-        if status != DroidStatus.WALL:
-            traversable_locations.add(droid_loc)
-
-        possible_next_loctions = (l for l, _ in moves_from(droid_loc))
-        to_visit.update(filter(lambda l: l not in seen, possible_next_loctions))
-
-    pc.cancel()
+    q: Deque[Tuple[Coord, intcode.VMSnapshot]] = deque([(DROID_START_LOCATION, start)])
+    while q:
+        loc, droid = q.popleft()
+        for next_loc, move_cmd in moves_from(loc):
+            if next_loc in distances or next_loc in walls:
+                continue
+            status, next_droid = move_droid(droid, move_cmd)
+            if status == DroidStatus.WALL:
+                walls.add(next_loc)
+                continue
+            if status == DroidStatus.MOVED_FOUND_SYSTEM:
+                oxygen_system_pos = next_loc
+            distances[next_loc] = distances[loc] + 1
+            q.append((next_loc, next_droid))
+
     assert oxygen_system_pos is not None
-    return traversable_locations, oxygen_system_pos
+    return ShipMap(distances, oxygen_system_pos)
 
 
-def part_1(prg: intcode.Program) -> int:
-    mem = intcode.prg_to_memory(prg)
-    traversable_locations, oxygen_system_pos = asyncio.run(explore_ship(mem))
-    return len(
-        find_path(DROID_START_LOCATION, oxygen_system_pos, traversable_locations)
-    )
+class DistanceField(NamedTuple):
+    """Distances from a source to every location in a grid's bounding box.
+
+    Locations are stored row-major in a flat list, with `UNREACHABLE` for those
+    which can't be reached from the source.
+    """
 
+    origin: Coord  # Top left of the bounding box
+    width: int
+    distances: List[int]
 
-def part_2(prg: intcode.Program) -> int:
-    mem = intcode.prg_to_memory(prg)
-    traversable_locations, oxygen_system_pos = asyncio.run(explore_ship(mem))
+    def distance(self, loc: Coord) -> int:
+        x, y = loc - self.origin
+        if 0 <= x < self.width and 0 <= y < len(self.distances) // self.width:
+            return self.distances[y * self.width + x]
+        return UNREACHABLE
+
+    def reachable(self) -> Dict[Coord, int]:
+        return {
+            self.origin + Coord(i % self.width, i // self.width): d
+            for i, d in enumerate(self.distances)
+            if d != UNREACHABLE
+        }
+
+    def max(self) -> int:
+        return max(self.distances)
+
+
+def distance_field(
+    source: Coord, traversable_locations: Iterable[Coord]
+) -> DistanceField:
+    """BFS from `source` to all reachable locations, in a single pass.
+
+    The bounding box is padded by a border of untraversable locations, as
+    `flatgrid` requires.
+    """
+    traversable_locations = list(traversable_locations)
+    xs, ys = [l.x for l in traversable_locations], [l.y for l in traversable_locations]
+    origin = Coord(min(xs) - 1, min(ys) - 1)
+    width = max(xs) - origin.x + 2
+    height = max(ys) - origin.y + 2
+    traversable = [False] * (width * height)
+    for loc in traversable_locations:
+        x, y = loc - origin
+        traversable[y * width + x] = True
+
+    x, y = source - origin
+    distances = bfs(traversable, width, y * width + x).distances
+    return DistanceField(origin, width, distances)
+
+
+def part_1(ship: ShipMap) -> int:
+    return ship.distances[ship.oxygen_system_pos]
+
+
+def part_2(ship: ShipMap) -> int:
     # Filling with oxygen is equivalent to the longest path from any empty location
     # in the ship
-    return max(
-        len(find_path(oxygen_system_pos, loc, traversable_locations))
-        for loc in traversable_locations
-    )
+    return distance_field(ship.oxygen_system_pos, ship.distances).max()
 
 
 def main(puzzle_input_f):
     line = puzzle_input_f.read().strip()
     prg = [int(x) for x in line.split(",")]
-    print("Part 1: ", part_1(prg[:]))
-    print("Part 2: ", part_2(prg))
+    # Both parts use the same map, so the ship is only explored once
+    ship = flood_fill_ship(prg)
+    print("Part 1: ", part_1(ship))
+    print("Part 2: ", part_2(ship))
 
 
 if __name__ == "__main__":
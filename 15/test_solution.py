@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from solution import (
+    UNREACHABLE,
+    Coord,
+    distance_field,
+    flood_fill_ship,
+    part_1,
+    part_2,
+)
+
+
+@pytest.fixture
+def example_grid():
+    return [
+        " ##   ",
+        "#..## ",
+        "#.#..#",
+        "#.O.# ",
+        " ###  ",
+    ]
+
+
+def test_distance_field(example_grid):
+    traversable = {
+        Coord(x, y)
+        for y, row in enumerate(example_grid)
+        for x, val in enumerate(row)
+        if val in ".O"
+    }
+    field = distance_field(Coord(2, 3), traversable)
+    assert set(field.reachable()) == traversable
+    assert field.distance(Coord(2, 3)) == 0
+    assert field.distance(Coord(1, 3)) == 1
+    assert field.distance(Coord(4, 2)) == 3
+    # Walls and locations outside of the grid
+    assert field.distance(Coord(2, 2)) == UNREACHABLE
+    assert field.distance(Coord(-10, 50)) == UNREACHABLE
+    # Filling the example with oxygen takes 4 minutes
+    assert field.max() == 4
+
+
+def test_parts_share_ship_map():
+    with open(os.path.join(os.path.dirname(__file__), "input.txt")) as f:
+        prg = [int(x) for x in f.read().strip().split(",")]
+    ship = flood_fill_ship(prg)
+    assert part_1(ship) == 230
+    assert part_2(ship) == 288
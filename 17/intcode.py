@@ -1 +0,0 @@
-../intcode/intcode.py
\ No newline at end of file
@@ -1,5 +1,5 @@
-import asyncio
 import re
+from collections import deque
 from enum import Enum
 from functools import reduce
 from itertools import takewhile
@@ -65,7 +65,7 @@ class output_collector:
     def __init__(self):
         self.output: List[int] = []
 
-    async def __call__(self, value: int):
+    def __call__(self, value: int):
         self.output.append(value)
 
 
@@ -90,7 +90,7 @@ def grid_to_map(grid: Grid) -> ScaffoldMap:
 
 def build_map(mem: intcode.Memory) -> ScaffoldMap:
     collector = output_collector()
-    asyncio.run(intcode.execute(mem, intcode.no_input, collector))
+    intcode.execute_sync(mem, intcode.no_input, collector)
     grid = split_iter(map(chr, collector.output[:-1]), "\n")
     return grid_to_map(grid)
 
@@ -162,19 +162,19 @@ def scaffold_route(start_loc: Coord, start_dir: Direction, m: ScaffoldMap):
                     return
 
 
-async def run_movement_program(mem: intcode.Memory, main_routine, movement_funcs):
+def run_movement_program(mem: intcode.Memory, main_routine, movement_funcs):
     mem[0] = 2
-    inqueue = asyncio.Queue()
+    inqueue = deque()
     for c in main_routine + "\n":
-        await inqueue.put(ord(c))
+        inqueue.append(ord(c))
     for k, pattern in movement_funcs.items():
         for c in pattern + "\n":
-            await inqueue.put(ord(c))
-    await inqueue.put(ord("n"))
-    await inqueue.put(ord("\n"))
+            inqueue.append(ord(c))
+    inqueue.append(ord("n"))
+    inqueue.append(ord("\n"))
 
     collector = output_collector()
-    await asyncio.create_task(intcode.execute(mem, inqueue.get, collector))
+    intcode.execute_sync(mem, inqueue.popleft, collector)
     return collector.output
 
 
@@ -198,7 +198,7 @@ def part_2(prg: intcode.Program):
         lambda s, rep: s.replace(rep[1], rep[0]), movement_funcs.items(), route_str
     )
     mem = intcode.prg_to_memory(prg)
-    robot_output = asyncio.run(run_movement_program(mem, main_routine, movement_funcs))
+    robot_output = run_movement_program(mem, main_routine, movement_funcs)
     assert robot_output[-3:-1] == [10, 10]  # Robot outputs dust value after 2 newlines
     return robot_output[-1]
 
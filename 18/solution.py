@@ -13,6 +13,8 @@ from heapq import heappop, heappush
 from itertools import count
 from typing import DefaultDict, Dict, FrozenSet, List, NamedTuple, Tuple
 
+from flatgrid import bfs
+
 
 class Coord(NamedTuple):
     x: int
@@ -77,37 +79,29 @@ def build_graph(grid: Grid, poi_map: POIMap, entrances: List[str]) -> POIGraph:
     locations of keys `b` and `d`.
     """
 
-    def bfs(pos: Coord):
-        q = [(pos, 0, ())]
-        seen, paths = set(), dict()
-        while q:
-            p, dist, required_keys = q.pop(0)
-            if p in seen:
-                continue
-            seen.add(p)
-            pos_id = grid[p.y][p.x]
-            # An unseen key or door
-            if p != pos and pos_id in poi_map and pos_id not in entrances:
-                paths[pos_id] = (dist, frozenset(required_keys))
-
-            for diff in MOVE_DIRS:
-                next_p = p + diff
-                pos_id = grid[next_p.y][next_p.x]
-                if pos_id != WALL:
-                    q.append(
-                        (
-                            next_p,
-                            dist + 1,
-                            required_keys + (pos_id.lower(),)
-                            if pos_id.isupper()  # Position is a door -> key is required
-                            else required_keys,
-                        )
-                    )
+    # Flat, row-major grid, see `flatgrid`. The grid is surrounded by walls
+    width = len(grid[0])
+    cells = [val for row in grid for val in row]
+    traversable = [val != WALL for val in cells]
+
+    def paths_from(pos: Coord):
+        search = bfs(traversable, width, pos.y * width + pos.x)
+        # Doors on the (unique) path to each position
+        doors: List[Tuple[str, ...]] = [()] * len(cells)
+        paths = dict()
+        for i in search.order[1:]:
+            pos_id = cells[i]
+            doors[i] = doors[search.parents[i]]
+            if pos_id.isupper():  # Position is a door -> key is required
+                doors[i] += (pos_id.lower(),)
+            # An unseen key
+            elif pos_id in poi_map and pos_id not in entrances:
+                paths[pos_id] = (search.distances[i], frozenset(doors[i]))
         return paths
 
     g = defaultdict(dict)
     for pos_id, pos in poi_map.items():
-        for k, v in bfs(pos).items():
+        for k, v in paths_from(pos).items():
             g[pos_id][k] = v
 
     return g
@@ -1,31 +1,28 @@
-import asyncio
-from itertools import count, product, tee
-from typing import Tuple
+from itertools import count, product
+from typing import Iterable, Tuple
 
-from intcode import Memory, Program, execute, prg_to_memory
+from intcode import Program, run_batch
 
+# Number of locations to test per `run_batch` when the total number isn't known
+BATCH_SIZE = 500
 
-async def scanner(mem: Memory, size: int = 50):
-    inqueue: asyncio.Queue[int] = asyncio.Queue()
-    outqueue: asyncio.Queue[int] = asyncio.Queue()
-    for x, y in product(*tee(range(size))):
-        await inqueue.put(x)
-        await inqueue.put(y)
-        await asyncio.create_task(execute(mem.copy(), inqueue.get, outqueue.put))
-        yield x, y, await outqueue.get()
 
+def scanner(prg: Program, size: int = 50) -> Iterable[Tuple[int, int, int]]:
+    locations = list(product(range(size), repeat=2))
+    for (x, y), (val,) in zip(locations, run_batch(prg, locations)):
+        yield x, y, val
 
-async def affected_points(scanner):
-    return sum([val async for x, y, val in scanner])
+
+def affected_points(scanner: Iterable[Tuple[int, int, int]]) -> int:
+    return sum(val for x, y, val in scanner)
 
 
 def part_1(prg: Program):
-    mem = prg_to_memory(prg)
-    scan = scanner(mem)
-    return asyncio.run(affected_points(scan))
+    scan = scanner(prg)
+    return affected_points(scan)
 
 
-async def find_gradients(mem: Memory, y=10000) -> Tuple[int, int]:
+def find_gradients(prg: Program, y=10000) -> Tuple[float, float]:
     """Approximate the gradients of the two enclosing lines of the tractor beam.
 
     Scans through x coordinates, running the drone program to determine whether
@@ -34,27 +31,23 @@ async def find_gradients(mem: Memory, y=10000) -> Tuple[int, int]:
     the first and last locations within the beam respectively.
 
     Args:
-        mem: Memory loaded with drone system Intcode program.
+        prg: Drone system Intcode program.
         y: Y coordinate to approximate gradients at
     Returns:
         Tuple of gradients m1, m2 of the lower and upper lines respectively.
     """
-    inqueue: asyncio.Queue[int] = asyncio.Queue()
-    outqueue: asyncio.Queue[int] = asyncio.Queue()
     enter_beam_x = None
-    for x in count():
-        # Run drone program to test whether this location is within the beam
-        await inqueue.put(x)
-        await inqueue.put(y)
-        await asyncio.create_task(execute(mem.copy(), inqueue.get, outqueue.put))
-        val = await outqueue.get()
-        if enter_beam_x is None and val == 1:
-            enter_beam_x = x
-        elif enter_beam_x is not None and val == 0:
-            # Previous location was the last in the beam at this y level
-            exit_beam_x = x - 1
-            # Calculate gradients
-            return y / enter_beam_x, y / exit_beam_x
+    for start in count(step=BATCH_SIZE):
+        # Run drone program to test whether these locations are within the beam
+        xs = range(start, start + BATCH_SIZE)
+        for x, (val,) in zip(xs, run_batch(prg, ((x, y) for x in xs))):
+            if enter_beam_x is None and val == 1:
+                enter_beam_x = x
+            elif enter_beam_x is not None and val == 0:
+                # Previous location was the last in the beam at this y level
+                exit_beam_x = x - 1
+                # Calculate gradients
+                return y / enter_beam_x, y / exit_beam_x
     # Given the known behaviour of the drone program, the above for loop *will*
     # always exit
     # This assert is to a) satisfy MyPy and b) ensure that an explicit failure
@@ -139,8 +132,7 @@ def part_2(prg: Program) -> int:
     then finish off as specified in the puzzle by multiplying the x coordinate
     by 10000 and adding the y coordinate.
     """
-    mem = prg_to_memory(prg)
-    m1, m2 = asyncio.run(find_gradients(mem))
+    m1, m2 = find_gradients(prg)
     w = 99  # Square is 100 wide *including* the starting location
     x1 = round(((m2 * w) + w) / (m1 - m2))  # [j]
     y2 = round((m1 * x1) - w)  # [i]
@@ -1,8 +1,9 @@
-import heapq
-from collections import defaultdict
+from collections import defaultdict, deque
 from enum import Enum
 from typing import DefaultDict, Dict, Iterable, List, NamedTuple, Tuple
 
+from flatgrid import UNREACHABLE, bfs, neighbour_offsets
+
 
 class Coord(NamedTuple):
     x: int
@@ -112,26 +113,45 @@ def parse_grid(grid: Grid) -> Maze:
     return Maze(m, pm, start, end)
 
 
-def find_shortest_path_length(m: Maze) -> int:
-    seen = set()
-    q = [(0, m.start)]
-    while q:
-        dist, loc = heapq.heappop(q)
-        seen.add(loc)
-        if loc == m.end:
-            return dist
-        for next_loc in neighbours(loc):
-            if next_loc in seen or m.tiles[next_loc] != Tile.OPEN:
-                continue
-            # Normal step
-            heapq.heappush(q, (dist + 1, next_loc))
-        if loc in m.portals:
-            src, dest = m.portals[loc]
-            if dest.location not in seen:
-                # Teleport!
-                heapq.heappush(q, (dist + 1, dest.location))
+class FlatMaze(NamedTuple):
+    """A `Maze` as a flat, row-major array over its bounding box (see `flatgrid`)."""
 
-    raise RuntimeError(f"No path found from {m.start} -> {m.end}")
+    width: int
+    open: List[bool]
+    # Portal index -> destination index, and the portals at either end
+    portals: Dict[int, Tuple[int, Portal, Portal]]
+    start: int
+    end: int
+
+
+def flatten(m: Maze) -> FlatMaze:
+    # Open tiles are always surrounded by walls or labels, so neighbouring
+    # indices never wrap around a row
+    width = max(loc.x for loc in m.tiles) + 1
+    height = max(loc.y for loc in m.tiles) + 1
+    open_ = [False] * (width * height)
+    for loc, tile in m.tiles.items():
+        if tile == Tile.OPEN:
+            open_[loc.y * width + loc.x] = True
+
+    def index(loc: Coord) -> int:
+        return loc.y * width + loc.x
+
+    portals = {
+        index(loc): (index(dest.location), src, dest)
+        for loc, (src, dest) in m.portals.items()
+    }
+    return FlatMaze(width, open_, portals, index(m.start), index(m.end))
+
+
+def find_shortest_path_length(m: Maze) -> int:
+    """BFS where each step, including teleporting, has a distance of one."""
+    fm = flatten(m)
+    teleports = {i: j for i, (j, _, _) in fm.portals.items()}
+    distance = bfs(fm.open, fm.width, fm.start, teleports).distances[fm.end]
+    if distance == UNREACHABLE:
+        raise RuntimeError(f"No path found from {m.start} -> {m.end}")
+    return distance
 
 
 def part_1(grid: Grid) -> int:
@@ -157,32 +177,42 @@ def find_shortest_path_length_recursive_levels(m: Maze) -> int:
         - Inner portals increment depth (recurse into smaller maze)
     - Terminate when depth 0 and location == ZZ
     """
-    seen = set()
-    q = [(0, 0, m.start)]
+    fm = flatten(m)
+    # Not `flatgrid.bfs`, as the states searched are (depth, index) pairs
+    offsets = neighbour_offsets(fm.width)
+    # Distances at each depth, only allocated once the depth is reached
+    levels: DefaultDict[int, List[int]] = defaultdict(
+        lambda: [UNREACHABLE] * len(fm.open)
+    )
+    levels[0][fm.start] = 0
+    q = deque([(0, fm.start)])
     while q:
-        dist, depth, loc = heapq.heappop(q)
-        seen.add((depth, loc))
-        if depth == 0 and loc == m.end:
-            return dist
-
-        for next_loc in neighbours(loc):
-            if (depth, next_loc) in seen or m.tiles[next_loc] != Tile.OPEN:
-                continue
-            # Normal step
-            heapq.heappush(q, (dist + 1, depth, next_loc))
-
-        if loc in m.portals:
-            src, dest = m.portals[loc]
+        depth, i = q.popleft()
+        distances = levels[depth]
+        dist = distances[i] + 1
+        if depth == 0 and i == fm.end:
+            return distances[i]
+
+        for offset in offsets:
+            j = i + offset
+            if fm.open[j] and distances[j] == UNREACHABLE:
+                # Normal step
+                distances[j] = dist
+                q.append((depth, j))
+
+        if i in fm.portals:
+            j, src, dest = fm.portals[i]
             if is_disabled(src, depth):
                 continue
             # Inner portals recurse deeper
             # Outer portals 'pop' back previous level
             d = depth - 1 if dest.outer else depth + 1
-            if (d, dest.location) not in seen:
+            if levels[d][j] == UNREACHABLE:
                 # Teleport!
-                heapq.heappush(q, (dist + 1, d, dest.location))
+                levels[d][j] = dist
+                q.append((d, j))
 
-    raise RuntimeError(f"No path found from {src} -> {dest}")
+    raise RuntimeError(f"No path found from {m.start} -> {m.end}")
 
 
 def part_2(grid: Grid) -> int:
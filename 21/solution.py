@@ -1,18 +1,21 @@
-import asyncio
 from typing import List
 
-from intcode import Memory, Program, execute, prg_to_memory
+from intcode import Program, SpecialisationCache
+
+# Shared by both parts, so the droid program's start up (its prompt) only runs
+# once, and each springscript only once
+specialisations = SpecialisationCache()
 
 
 class output_collector:
     def __init__(self):
         self.output: List[int] = []
 
-    async def __call__(self, value: int):
+    def __call__(self, value: int):
         self.output.append(value)
 
 
-async def stdout(val: int):
+def stdout(val: int):
     try:
         s = chr(val)
     except ValueError:
@@ -20,11 +23,10 @@ async def stdout(val: int):
     print(s, end="")
 
 
-async def droid(mem: Memory, script: List[str], out=stdout):
-    inqueue: asyncio.Queue[int] = asyncio.Queue()
-    for c in "\n".join(script) + "\n":
-        await inqueue.put(ord(c))
-    await asyncio.create_task(execute(mem, inqueue.get, out))
+def droid(prg: Program, script: List[str], out=stdout):
+    inputs = [ord(c) for c in "\n".join(script) + "\n"]
+    for val in specialisations.run(prg, inputs):
+        out(val)
 
 
 def part_1(prg: Program) -> int:
@@ -70,9 +72,8 @@ def part_1(prg: Program) -> int:
     AND D J
     OR T J
     """
-    mem = prg_to_memory(prg)
     c = output_collector()
-    asyncio.run(droid(mem, ["NOT A T", "NOT C J", "AND D J", "OR T J", "WALK"], out=c))
+    droid(prg, ["NOT A T", "NOT C J", "AND D J", "OR T J", "WALK"], out=c)
     return c.output[-1]
 
 
@@ -123,24 +124,21 @@ def part_2(prg: Program):
     OR T J
     RUN
     """
-    mem = prg_to_memory(prg)
     c = output_collector()
-    asyncio.run(
-        droid(
-            mem,
-            [
-                "NOT C J",
-                "AND D J",
-                "AND H J",
-                "NOT B T",
-                "AND D T",
-                "OR T J",
-                "NOT A T",
-                "OR T J",
-                "RUN",
-            ],
-            out=c,
-        )
+    droid(
+        prg,
+        [
+            "NOT C J",
+            "AND D J",
+            "AND H J",
+            "NOT B T",
+            "AND D T",
+            "OR T J",
+            "NOT A T",
+            "OR T J",
+            "RUN",
+        ],
+        out=c,
     )
     return c.output[-1]
 
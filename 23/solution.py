@@ -1,5 +1,18 @@
-from collections import deque
-from typing import List, NamedTuple, Optional, Deque
+from collections import defaultdict, deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from typing import (
+    DefaultDict,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from intcode import IntCodeVM, Program, Status
 
@@ -17,18 +30,24 @@ class Packet(NamedTuple):
 
 
 class NetworkedIntcodeVM:
-    def __init__(self, prg: Program, address: int, target_address: int, network: list):
+    def __init__(self, prg: Program, address: int):
         self.packet_queue: Deque[Packet] = deque([])
         self.vm = IntCodeVM(prg)
         self.address = address
         self.vm.input_val = address
-        self.target_address = target_address
-        self.network = network
         self.vm.execute_until_complete_or_input()
         self.vm.input_val = -1
-        self.status = Status.IDLE
+        self.status = Status.RUNNING
+        # Whether the last input read was -1 (no packets queued)
+        self.polled_empty = False
 
     def execute_until_io(self) -> Optional[Packet]:
+        """Runs until the NIC sends a packet, which is returned, or reads input.
+
+        The NIC is `Status.IDLE` once it's read `-1` twice in a row (there were no
+        packets queued) without sending anything in between: it's waiting for a
+        packet, so running it again would only repeat the same polling loop.
+        """
         self.status = Status.RUNNING
         if not self.packet_queue:
             self.vm.input_val = -1
@@ -37,44 +56,227 @@ class NetworkedIntcodeVM:
         dest_address = self.vm.execute_until_complete_or_io()
         assert self.vm.status != Status.COMPLETE
         if self.vm.status != Status.HALTED_ON_INPUT:
-            self.status = Status.RUNNING
             x = self.vm.execute_until_complete_or_io()
             y = self.vm.execute_until_complete_or_io()
             assert dest_address and x and y
-            packet = Packet(dest_address, x, y)
-            if packet.destination == self.target_address:
-                return packet
-            self.network[dest_address].packet_queue.append(packet)
+            self.polled_empty = False
+            return Packet(dest_address, x, y)
+        if self.packet_queue:
+            self.vm.input_val = self.packet_queue.popleft().y
+            self.vm.execute_until_complete_or_input()
+            self.polled_empty = False
+        elif self.polled_empty:
+            self.status = Status.IDLE
         else:
-            if self.packet_queue:
-                self.vm.input_val = self.packet_queue.popleft().y
-                self.vm.execute_until_complete_or_input()
-            else:
-                self.status = Status.IDLE
+            self.polled_empty = True
         return None
 
 
-Network = List[NetworkedIntcodeVM]
+# NICs by address
+Network = Dict[int, NetworkedIntcodeVM]
+
+
+def init_network(prg: Program, addresses: Iterable[int]) -> Network:
+    return {address: NetworkedIntcodeVM(prg, address) for address in addresses}
+
+
+class Scheduler:
+    """Runs the NICs of a network, only waking an idle NIC when it's sent a packet.
+
+    NICs with work to do are kept in a run queue. A NIC which reads `-1` is idle
+    and leaves the queue, so idle NICs cost nothing: the cost of running the
+    network is proportional to its traffic rather than its size. The network is
+    idle when every NIC is, which is tracked by a count of idle NICs.
+    """
+
+    def __init__(self, network: Network):
+        self.network = network
+        self.run_queue: Deque[NetworkedIntcodeVM] = deque(
+            pc for pc in network.values() if pc.status != Status.IDLE
+        )
+        self.n_idle = len(network) - len(self.run_queue)
+
+    def is_idle(self) -> bool:
+        return self.n_idle == len(self.network)
+
+    def deliver(self, address: int, packet: Packet):
+        pc = self.network[address]
+        pc.packet_queue.append(packet)
+        if pc.status == Status.IDLE:
+            pc.status = Status.RUNNING
+            self.n_idle -= 1
+            self.run_queue.append(pc)
+
+    def step(self) -> Optional[Packet]:
+        """Runs the next NIC in the run queue until it sends a packet or reads input.
+
+        Returns:
+            The packet sent, if it's to an address outside of the network
+        """
+        pc = self.run_queue.popleft()
+        packet = pc.execute_until_io()
+        if pc.status == Status.IDLE:
+            self.n_idle += 1
+        else:
+            self.run_queue.append(pc)
+        if packet is not None and packet.destination in self.network:
+            self.deliver(packet.destination, packet)
+            return None
+        return packet
+
+    def run(self) -> Iterator[Packet]:
+        """Runs until the network is idle, yielding the packets sent outside of it,
+        i.e. to the NAT."""
+        while self.run_queue:
+            packet = self.step()
+            if packet is not None:
+                yield packet
+
+
+# Maximum packets a shard sends to the coordinator in one message
+SHARD_BATCH_SIZE = 64
+
 
+def run_shard(prg: Program, addresses: List[int], conn: Connection):
+    """Worker process running a shard (the NICs at `addresses`) of the network.
 
-def init_network(prg: Program, n: int, nat_address: int) -> Network:
-    network: List[NetworkedIntcodeVM] = []
-    for address in range(n):
-        network.append(NetworkedIntcodeVM(prg, address, nat_address, network))
-    return network
+    Messages from the coordinator are batches of packets to deliver, as
+    `(address, packet)` pairs. Messages to the coordinator are either a batch of
+    packets sent outside of the shard or, once the shard is idle, the number of
+    packets delivered to it so far (see `ShardedNetwork`).
+    """
+    scheduler = Scheduler(init_network(prg, addresses))
+    delivered = 0
+    outbox: List[Packet] = []
 
+    def recv(block: bool):
+        nonlocal delivered
+        while block or conn.poll():
+            block = False
+            batch = conn.recv()
+            for address, packet in batch:
+                scheduler.deliver(address, packet)
+            delivered += len(batch)
 
-def part_1(prg: Program):
-    network = init_network(prg, NETWORK_SIZE, NAT_ADDRESS)
     while True:
-        for pc in network:
-            packet = pc.execute_until_io()
-            if packet is not None and packet.destination == NAT_ADDRESS:
-                return packet.y
+        while not scheduler.is_idle():
+            packet = scheduler.step()
+            if packet is not None:
+                outbox.append(packet)
+            if len(outbox) >= SHARD_BATCH_SIZE:
+                conn.send(outbox)
+                outbox = []
+            recv(block=False)
+        if outbox:
+            conn.send(outbox)
+            outbox = []
+        conn.send(delivered)
+        recv(block=True)
+
+
+class ShardedNetwork:
+    """A network whose NICs are partitioned between worker processes (shards).
+
+    Packets between shards are routed by the coordinator (this process), which
+    counts the packets delivered to each shard. A shard reports when it's idle,
+    along with the number of packets it's been delivered. Since packets sent by
+    a shard arrive before its report, it's idle if every packet delivered to it
+    was already handled when it made its most recent report, and the network is
+    idle when every shard is.
+
+    Has the same interface as `Scheduler`, and should be closed (or used as a
+    context manager) to stop the workers.
+    """
+
+    def __init__(self, prg: Program, addresses: Iterable[int], shards: int):
+        addresses = list(addresses)
+        self.shard_of: Dict[int, int] = {}
+        self.conns: List[Connection] = []
+        self.processes: List[Process] = []
+        for i in range(shards):
+            shard = addresses[i::shards]
+            self.shard_of.update((address, i) for address in shard)
+            conn, worker_conn = Pipe()
+            process = Process(
+                target=run_shard, args=(prg, shard, worker_conn), daemon=True
+            )
+            process.start()
+            self.conns.append(conn)
+            self.processes.append(process)
+        self.delivered = [0] * shards
+        self.idle = [False] * shards
+        self.n_idle = 0
+
+    def is_idle(self) -> bool:
+        return self.n_idle == len(self.conns)
+
+    def _send(self, shard: int, batch: List[Tuple[int, Packet]]):
+        self.conns[shard].send(batch)
+        self.delivered[shard] += len(batch)
+        if self.idle[shard]:
+            self.idle[shard] = False
+            self.n_idle -= 1
+
+    def deliver(self, address: int, packet: Packet):
+        self._send(self.shard_of[address], [(address, packet)])
+
+    def run(self) -> Iterator[Packet]:
+        """Runs until the network is idle, yielding the packets sent outside of it,
+        i.e. to the NAT."""
+        while not self.is_idle():
+            for conn in wait(self.conns):
+                shard = self.conns.index(conn)
+                msg = conn.recv()
+                if isinstance(msg, int):
+                    if msg == self.delivered[shard] and not self.idle[shard]:
+                        self.idle[shard] = True
+                        self.n_idle += 1
+                    continue
+                batches: DefaultDict[int, List[Tuple[int, Packet]]] = defaultdict(list)
+                for packet in msg:
+                    if packet.destination in self.shard_of:
+                        batches[self.shard_of[packet.destination]].append(
+                            (packet.destination, packet)
+                        )
+                    else:
+                        yield packet
+                for dest_shard, batch in batches.items():
+                    self._send(dest_shard, batch)
+
+    def close(self):
+        # Shards have no state worth keeping once the network's closed, and may
+        # be blocked sending packets which will never be read
+        for conn, process in zip(self.conns, self.processes):
+            process.terminate()
+            process.join()
+            conn.close()
+
+    def __enter__(self) -> "ShardedNetwork":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def start_network(prg: Program, shards: int = 1) -> Union[Scheduler, ShardedNetwork]:
+    """The day's network, run by this process or sharded between `shards` workers."""
+    if shards == 1:
+        return Scheduler(init_network(prg, range(NETWORK_SIZE)))
+    return ShardedNetwork(prg, range(NETWORK_SIZE), shards)
+
+
+def part_1(prg: Program, shards: int = 1):
+    network = start_network(prg, shards)
+    try:
+        for packet in network.run():
+            return packet.y
+    finally:
+        if isinstance(network, ShardedNetwork):
+            network.close()
 
 
 class NAT:
-    def __init__(self, network: Network):
+    def __init__(self, network: Union[Scheduler, ShardedNetwork]):
         self.network = network
 
         self.current_packet: Optional[Packet] = None
@@ -84,13 +286,13 @@ class NAT:
         self.current_packet = packet
 
     def poll(self) -> Optional[Packet]:
-        if self.current_packet is not None and self._is_network_idle():
+        if self.current_packet is not None and self.network.is_idle():
             if self._repeated_y():
                 return self.current_packet
             else:
                 self.prev_packet = None
             self.prev_packet = self.current_packet
-            self.network[0].packet_queue.append((self.current_packet))
+            self.network.deliver(0, self.current_packet)
             self.current_packet = None
         return None
 
@@ -99,22 +301,22 @@ class NAT:
             return False
         return self.current_packet.y == self.prev_packet.y
 
-    def _is_network_idle(self) -> bool:
-        return all(pc.status == Status.IDLE for pc in self.network)
-
 
-def part_2(prg: Program):
-    network = init_network(prg, NETWORK_SIZE, NAT_ADDRESS)
+def part_2(prg: Program, shards: int = 1):
+    network = start_network(prg, shards)
     nat = NAT(network)
-
-    while True:
-        for pc in network:
-            packet = pc.execute_until_io()
-            if packet is not None and packet.destination == NAT_ADDRESS:
+    try:
+        while True:
+            for packet in network.run():
+                assert packet.destination == NAT_ADDRESS
                 nat.recv(packet)
-        p = nat.poll()
-        if p is not None:
-            return p.y
+            p = nat.poll()
+            if p is not None:
+                return p.y
+            assert not network.is_idle(), "Network is idle and the NAT has no packet"
+    finally:
+        if isinstance(network, ShardedNetwork):
+            network.close()
 
 
 def main(puzzle_input_f):
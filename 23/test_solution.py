@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import solution
+from solution import (
+    NAT,
+    NAT_ADDRESS,
+    Packet,
+    Scheduler,
+    ShardedNetwork,
+    Status,
+    init_network,
+    part_1,
+    part_2,
+)
+
+# Fake NIC: for each packet (x, y) received, sends the packet (x, 255) to y
+FORWARD = [
+    3, 30, 3, 31, 1008, 31, -1, 32, 1005, 32, 2, 3, 33, 4, 33, 4, 31, 104, 255,
+    1105, 1, 2, 99, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+]  # fmt: skip
+
+
+@pytest.fixture(scope="module")
+def puzzle_prg():
+    with open(os.path.join(os.path.dirname(__file__), "input.txt")) as f:
+        return [int(x) for x in f.read().strip().split(",")]
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler(init_network(FORWARD, range(3)))
+
+
+def test_scheduler_idle(scheduler):
+    # Every NIC must poll before it's known to be idle
+    assert scheduler.n_idle == 0 and len(scheduler.run_queue) == 3
+    assert list(scheduler.run()) == []
+    assert scheduler.n_idle == 3 and not scheduler.run_queue
+    assert scheduler.is_idle()
+
+
+def test_scheduler_wakes_blocked_nic(scheduler):
+    list(scheduler.run())
+    nic = scheduler.network[0]
+    scheduler.deliver(0, Packet(0, 7, 1))
+    scheduler.deliver(0, Packet(0, 8, 2))
+    assert nic.status == Status.RUNNING
+    assert scheduler.n_idle == 2 and list(scheduler.run_queue) == [nic]
+    # NIC 0 sends to NICs 1 and 2, which are woken up in turn
+    assert list(scheduler.run()) == [
+        Packet(NAT_ADDRESS, 7, NAT_ADDRESS),
+        Packet(NAT_ADDRESS, 8, NAT_ADDRESS),
+    ]
+    assert scheduler.is_idle()
+
+
+def test_nat_waits_for_idle_network(scheduler):
+    nat = NAT(scheduler)
+    nat.recv(Packet(NAT_ADDRESS, 7, 1))
+    assert nat.poll() is None
+    # Not delivered, as the network is still running
+    assert not scheduler.network[0].packet_queue
+    for packet in scheduler.run():
+        nat.recv(packet)
+    assert nat.poll() is None
+    assert list(scheduler.network[0].packet_queue) == [Packet(NAT_ADDRESS, 7, 1)]
+    for packet in scheduler.run():
+        nat.recv(packet)
+    # NIC 0 forwards the packet to NIC 1, which sends (7, 255) to the NAT
+    assert nat.poll() is None
+    for packet in scheduler.run():
+        nat.recv(packet)
+    # NIC 0 sends (7, 255) straight back to the NAT, repeating its y
+    assert nat.poll() == Packet(NAT_ADDRESS, 7, NAT_ADDRESS)
+
+
+# 1 shard is the single process `Scheduler`, 7 doesn't divide the network size
+@pytest.mark.parametrize("shards", [1, 2, 3, 7])
+def test_part_1(puzzle_prg, shards):
+    assert part_1(puzzle_prg, shards) == 22829
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7])
+def test_part_2(puzzle_prg, shards):
+    assert part_2(puzzle_prg, shards) == 15678
+
+
+def report_idle_early(prg, addresses, conn):
+    # Shard which reports that it's idle before handling the packet delivered to
+    # it, then forwards the packet to the NAT
+    conn.send(0)
+    ((_, packet),) = conn.recv()
+    conn.send([Packet(NAT_ADDRESS, packet.x, packet.y)])
+    conn.send(1)
+    conn.recv()
+
+
+def test_sharded_network_waits_for_packets_in_flight(monkeypatch):
+    monkeypatch.setattr(solution, "run_shard", report_idle_early)
+    with ShardedNetwork([99], [0], shards=1) as network:
+        network.deliver(0, Packet(0, 7, 1))
+        # The shard's first report is stale, the packet is still in flight
+        assert list(network.run()) == [Packet(NAT_ADDRESS, 7, 1)]
+        assert network.is_idle()
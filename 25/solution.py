@@ -1,14 +1,21 @@
 import asyncio
-import pickle
+import os
+import zlib
 from itertools import combinations
-from typing import Iterable, List, Set
+from typing import Iterable, List, Optional, Set
 
 from intcode import (
     DebugCommands,
     Memory,
     Program,
+    SnapshotError,
+    SnapshotPool,
+    Status,
+    VMSnapshot,
     execute,
+    load_snapshot,
     prg_to_memory,
+    save_snapshot,
     stdin,
     stdout,
 )
@@ -46,44 +53,41 @@ async def auto_droid(
     return asyncio.create_task(execute(mem, inp, stdout, **kwargs))
 
 
-def item_combinations(items: List[str]) -> Iterable[Set[str]]:
+def item_combinations(items: Iterable[str]) -> Iterable[Set[str]]:
+    items = sorted(items)
     for n in range(len(items)):
-        yield set(combinations(items, n + 1))
+        for combination in combinations(items, n + 1):
+            yield set(combination)
 
 
 def drop_cmds(items: Iterable[str]) -> List[str]:
     return [f"drop {i}" for i in items]
 
 
-# TODO: Document
-async def run_drop(mem: Memory, items: Iterable[str], **kwargs):
-    inqueue = asyncio.Queue()
+def drop_inputs(items: Iterable[str]) -> List[int]:
+    """Inputs dropping `items` then trying to move past the Pressure-Sensitive Floor."""
+    return [x for inst in drop_cmds(items) + ["north"] for x in as_intcode(inst)]
 
-    for inst in drop_cmds(items) + ["north"]:
-        for x in as_intcode(inst):
-            await inqueue.put(x)
 
-    outq = []
-
-    async def outp(val: int):
-        if inqueue.empty():
-            outq.append(val)
-
-    async def inp():
-        if inqueue.empty():
-            return DebugCommands.IMMEDIATE_EXIT
-        else:
-            return await inqueue.get()
-
-    t = asyncio.create_task(execute(mem, inp, outp, **kwargs))
-    await t
-
-    return "".join(chr(x) for x in outq)
+def as_text(outputs: Iterable[int]) -> str:
+    return "".join(chr(x) for x in outputs)
 
 
 # TODO: Document
-def part_1(prg: Program):
-    mem = prg_to_memory(prg)
+def part_1(
+    prg: Program,
+    checkpoint: Optional[str] = None,
+    processes: Optional[int] = None,
+    **kwargs,
+):
+    """
+    `checkpoint` is a snapshot file of the VM at the Security Checkpoint. If it
+    exists it is resumed from, otherwise it's saved there after walking to it.
+
+    Each combination of items to keep is tried from the checkpoint by a pool of
+    `processes` workers (default: one per CPU), stopping at the first to pass.
+    """
+    mem = prg_to_memory(prg, paged=True)
 
     # 'Manually" constructed path using `interactive_droid` to collect all 'good'
     # items, ending at the Securtity Checkpoint
@@ -133,23 +137,33 @@ def part_1(prg: Program):
     }
 
     # 'Snapshot' of VM state at the Security Checkpoint w/ all items
-    # Could pickle this and save to a file for 'real' snapshots
-    checkpoint_mem, ip, rel_base = asyncio.run(
-        auto_droid(mem.copy(), instructions, stop_on_exhausted_instructions=True)
-    ).result()
+    saved: Optional[VMSnapshot] = None
+    if checkpoint is not None and os.path.exists(checkpoint):
+        try:
+            saved = load_snapshot(checkpoint)
+        except SnapshotError:
+            pass  # e.g. corrupt, so rebuilt and overwritten below
+    if saved is not None:
+        checkpoint_mem, ip, rel_base, *_ = saved
+    else:
+        checkpoint_mem, ip, rel_base = asyncio.run(
+            auto_droid(
+                mem.copy(), instructions, stop_on_exhausted_instructions=True, **kwargs
+            )
+        ).result()
+        if checkpoint is not None:
+            snapshot = VMSnapshot(checkpoint_mem, ip, rel_base, Status.INTERRUPTED)
+            save_snapshot(snapshot, checkpoint)
     assert checkpoint_mem != mem
 
-    for to_keep in item_combinations(items):
-        res = asyncio.run(
-            run_drop(
-                checkpoint_mem.copy(),
-                items.difference(to_keep),
-                ip=ip,
-                rel_base=rel_base,
-            )
-        )
-        if "Alert!" not in res:
-            return res
+    jobs = [drop_inputs(items - to_keep) for to_keep in item_combinations(items)]
+    snapshot = VMSnapshot(checkpoint_mem, ip, rel_base, Status.INTERRUPTED)
+    with SnapshotPool(snapshot, processes, **kwargs) as pool:
+        found = pool.first(jobs, lambda outputs: "Alert!" not in as_text(outputs))
+    if found is not None:
+        # Response to the final command, i.e. following the last prompt
+        text = as_text(found[1])
+        return text[text.rindex("Command?\n") + len("Command?\n") :]
 
 
 def part_2(prg: Program):
@@ -159,12 +173,16 @@ def part_2(prg: Program):
 def main(puzzle_input_f):
     line = puzzle_input_f.read().strip()
     prg = [int(x) for x in line.split(",")]
-    print("Part 1: ", part_1(prg[:]))
+    # Keyed by the program, so each puzzle input has its own checkpoint
+    checkpoint = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        f"checkpoint-{zlib.crc32(line.encode()):08x}.icvm",
+    )
+    print("Part 1: ", part_1(prg[:], checkpoint))
     print("Part 2: ", part_2(prg))
 
 
 if __name__ == "__main__":
-    import os
     from aocpy import input_cli
 
     base_dir = os.path.dirname(__file__)
@@ -0,0 +1,16 @@
+"""
+Searches of flat grids, shared by the grid puzzles.
+
+A grid is stored as a flat, row-major list of cells, so the neighbours of a cell
+are fixed offsets from its index (see `neighbour_offsets`) and searches index
+lists rather than hashing coordinates. Grids must be surrounded by cells which
+can't be moved into, so the offsets never wrap around a row or leave the grid.
+"""
+from .search import UNREACHABLE, Search, bfs, neighbour_offsets
+
+__all__ = [
+    "UNREACHABLE",
+    "Search",
+    "bfs",
+    "neighbour_offsets",
+]
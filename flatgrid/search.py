@@ -0,0 +1,54 @@
+from collections import deque
+from typing import Deque, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Distance (and parent) of cells which weren't reached
+UNREACHABLE = -1
+
+
+def neighbour_offsets(width: int) -> Tuple[int, int, int, int]:
+    """Offsets of the indices of a cell's neighbours (N, E, S, W)."""
+    return (-width, 1, width, -1)
+
+
+class Search(NamedTuple):
+    # Distance of each cell from the start
+    distances: List[int]
+    # Cell each cell was first reached from (`UNREACHABLE` for the start)
+    parents: List[int]
+    # Cells reached, in the order they were reached (i.e. by distance)
+    order: List[int]
+
+
+def bfs(
+    traversable: Sequence[bool],
+    width: int,
+    start: int,
+    portals: Optional[Mapping[int, int]] = None,
+) -> Search:
+    """Breadth-first search from `start` to every cell reachable from it.
+
+    Args:
+        traversable: Whether each cell can be moved into
+        width: Number of cells in each row
+        start: Index of the cell to search from
+        portals: Extra moves, from a cell's index to the index of another cell
+    """
+    distances = [UNREACHABLE] * len(traversable)
+    parents = [UNREACHABLE] * len(traversable)
+    distances[start] = 0
+    order = [start]
+    offsets = neighbour_offsets(width)
+    q: Deque[int] = deque([start])
+    while q:
+        i = q.popleft()
+        dist = distances[i] + 1
+        next_cells = [i + offset for offset in offsets]
+        if portals and i in portals:
+            next_cells.append(portals[i])
+        for j in next_cells:
+            if traversable[j] and distances[j] == UNREACHABLE:
+                distances[j] = dist
+                parents[j] = i
+                order.append(j)
+                q.append(j)
+    return Search(distances, parents, order)
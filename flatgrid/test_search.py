@@ -0,0 +1,38 @@
+from flatgrid import UNREACHABLE, bfs
+
+# 0123456
+# #######  0
+# #..#..#  1
+# #.##..#  2
+# #######  3
+WIDTH = 7
+GRID = "#######" "#..#..#" "#.##..#" "#######"
+TRAVERSABLE = [c == "." for c in GRID]
+
+
+def index(x: int, y: int) -> int:
+    return y * WIDTH + x
+
+
+def test_bfs():
+    search = bfs(TRAVERSABLE, WIDTH, index(1, 1))
+    assert search.distances[index(1, 1)] == 0
+    assert search.distances[index(2, 1)] == 1
+    assert search.distances[index(1, 2)] == 1
+    # Walls, and open cells which can't be reached
+    assert search.distances[index(3, 1)] == UNREACHABLE
+    assert search.distances[index(4, 1)] == UNREACHABLE
+    assert search.order == [index(1, 1), index(2, 1), index(1, 2)]
+    assert search.parents[index(1, 1)] == UNREACHABLE
+    assert search.parents[index(2, 1)] == index(1, 1)
+
+
+def test_bfs_portals():
+    portals = {index(1, 2): index(5, 2)}
+    search = bfs(TRAVERSABLE, WIDTH, index(1, 1), portals)
+    assert search.distances[index(5, 2)] == 2
+    assert search.distances[index(4, 1)] == 4
+    assert search.parents[index(5, 2)] == index(1, 2)
+    # Portals only lead one way
+    search = bfs(TRAVERSABLE, WIDTH, index(5, 2), portals)
+    assert search.distances[index(1, 2)] == UNREACHABLE
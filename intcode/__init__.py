@@ -0,0 +1,162 @@
+"""
+Intcode VM shared by every Intcode puzzle.
+
+Engines:
+    - `execute`: asyncio coroutine VM, which can also run programs using the
+      threaded code or block compiler engines (see `Engine`). `execute_sync`
+      and `execute_generator` are its synchronous equivalents
+    - `IntCodeVM`: stepping VM, driven by the caller *without asyncio*
+    - `run`: generator VM, yields outputs and reads inputs from a `deque`
+    - `run_compiled`/`run_batch`: run programs whose inputs are all known up
+      front using the block compiler (`simd.run_batch` is a NumPy alternative
+      for large batches, it is not imported here as NumPy is optional)
+
+Pass a `Profiler` to `execute` (or its synchronous equivalents) to profile a run,
+or a `Fusion` to execute common instruction sequences as superinstructions.
+`save_snapshot`/`load_snapshot` persist `VMSnapshot`s to disk, `SnapshotPool`
+runs many jobs from the same snapshot across processes. Pass a `Trace` to record
+a run's I/O, which `replay` feeds back to the program without its controller.
+`specialise` partially evaluates a program for a known prefix of its inputs,
+`SpecialisationCache` caches the resulting residual programs. `disassemble`
+statically analyses a program's instructions and control flow, `analyse` caches
+the analysis on disk. Pass a `Memoiser` to `execute` to memoise subroutine calls.
+"""
+from .batch import run_batch
+from .compiled import (
+    BlockCode,
+    BlockFunction,
+    TranslatedBlock,
+    compile_block,
+    execute_compiled,
+    run_compiled,
+    translate_block,
+)
+from .core import (
+    DebugCommands,
+    ExecutionGenerator,
+    Instruction,
+    Mode,
+    OpCodes,
+    Program,
+    parse_instruction,
+    program_digest,
+)
+from .disassembler import (
+    Analysis,
+    BasicBlock,
+    DecodedInstruction,
+    analyse,
+    disassemble,
+)
+from .fusion import (
+    Fusion,
+    FusionStats,
+    Pattern,
+    Superinstruction,
+    match_superinstruction,
+)
+from .generator import run
+from .interpreter import (
+    DecodeCache,
+    DecodeCacheStats,
+    Engine,
+    execute,
+    execute_generator,
+    execute_sync,
+    no_input,
+    stdin,
+    stdout,
+)
+from .memoise import MemoStats, Memoiser
+from .memory import (
+    MAX_PAGE_GROWTH,
+    PAGE_BITS,
+    PAGE_MASK,
+    PAGE_SIZE,
+    Memory,
+    PagedMemory,
+    prg_to_memory,
+)
+from .pool import SnapshotPool, run_snapshot
+from .profiler import Block, IOWait, Loop, Profiler
+from .snapshot import SnapshotError, dump_snapshot, load_snapshot, save_snapshot
+from .specialise import (
+    SpecialisationCache,
+    SpecialisationCacheStats,
+    specialise,
+)
+from .threaded import ThreadedCode, execute_threaded
+from .trace import ReplayError, Trace, TraceEvent, replay
+from .vm import IntCodeVM, Status, VMSnapshot
+
+__version__ = "1.9.0"
+
+__all__ = [
+    "MAX_PAGE_GROWTH",
+    "PAGE_BITS",
+    "PAGE_MASK",
+    "PAGE_SIZE",
+    "Analysis",
+    "BasicBlock",
+    "Block",
+    "BlockCode",
+    "BlockFunction",
+    "DebugCommands",
+    "DecodeCache",
+    "DecodeCacheStats",
+    "DecodedInstruction",
+    "Engine",
+    "ExecutionGenerator",
+    "Fusion",
+    "FusionStats",
+    "IOWait",
+    "Instruction",
+    "IntCodeVM",
+    "Loop",
+    "MemoStats",
+    "Memoiser",
+    "Memory",
+    "Mode",
+    "OpCodes",
+    "PagedMemory",
+    "Pattern",
+    "Profiler",
+    "Program",
+    "ReplayError",
+    "SnapshotError",
+    "SnapshotPool",
+    "SpecialisationCache",
+    "SpecialisationCacheStats",
+    "Status",
+    "Superinstruction",
+    "ThreadedCode",
+    "Trace",
+    "TraceEvent",
+    "TranslatedBlock",
+    "VMSnapshot",
+    "analyse",
+    "compile_block",
+    "disassemble",
+    "dump_snapshot",
+    "execute",
+    "execute_compiled",
+    "execute_generator",
+    "execute_sync",
+    "execute_threaded",
+    "load_snapshot",
+    "match_superinstruction",
+    "no_input",
+    "parse_instruction",
+    "prg_to_memory",
+    "program_digest",
+    "replay",
+    "run",
+    "run_batch",
+    "run_compiled",
+    "run_snapshot",
+    "save_snapshot",
+    "specialise",
+    "stdin",
+    "stdout",
+    "translate_block",
+]
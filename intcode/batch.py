@@ -0,0 +1,74 @@
+"""
+Running a 'pure' Intcode program many times with different inputs.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from .compiled import BlockCode, _run_block_code
+from .core import Program, program_digest
+from .disassembler import analyse, disassemble
+from .memory import prg_to_memory
+
+# Self-modified addresses of the programs run by this process, by program digest
+_volatile: Dict[str, FrozenSet[int]] = {}
+
+
+def _volatile_cells(prg: Program, cache_dir: Optional[str]) -> FrozenSet[int]:
+    if cache_dir is not None:
+        return analyse(prg, cache_dir).volatile
+    digest = program_digest(prg)
+    if digest not in _volatile:
+        _volatile[digest] = disassemble(prg).volatile
+    return _volatile[digest]
+
+
+def _run_batch(
+    prg: Program, volatile: FrozenSet[int], batch: List[Sequence[int]]
+) -> List[List[int]]:
+    # Blocks compiled against the unmodified program image, shared by every run
+    image = BlockCode(prg_to_memory(prg), volatile)
+    outputs = []
+    for inputs in batch:
+        code = image.fork(image.mem.copy())
+        outputs.append(_run_block_code(code, inputs))
+        image.learn(code)
+    return outputs
+
+
+def run_batch(
+    prg: Program,
+    inputs: Iterable[Sequence[int]],
+    processes: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> List[List[int]]:
+    """Runs `prg` once for each sequence of inputs in `inputs`.
+
+    Intended for 'pure' programs which are run many times with different inputs
+    (e.g. the day 19 drone program). Runs are independent, each starting from a
+    copy of the same program image. Blocks compiled for the image are shared by
+    every run (see `BlockCode.fork`) so each is only translated and compiled
+    once per batch. The program's self-modifying writes are found by its static
+    analysis (see `disassemble`), computed once per program, so no block is
+    compiled only to be discarded by a write.
+
+    Args:
+        prg: Intcode program
+        inputs: Sequences of inputs, one sequence per run
+        processes: Spread runs across a pool of this many processes, worthwhile
+            for large batches (default: run all in this process)
+        cache_dir: Also cache the program's analysis on disk in this directory,
+            see `analyse` (default: only cache it in memory)
+    Returns:
+        Outputs of each run, in the same order as `inputs`
+    """
+    batch = list(inputs)
+    volatile = _volatile_cells(prg, cache_dir)
+    if processes is None or processes <= 1:
+        return _run_batch(prg, volatile, batch)
+    # A few chunks per process to balance out differences in run times
+    chunksize = max(1, -(-len(batch) // (processes * 4)))
+    chunks = [batch[i : i + chunksize] for i in range(0, len(batch), chunksize)]
+    with ProcessPoolExecutor(processes) as pool:
+        results = pool.map(partial(_run_batch, prg, volatile), chunks)
+        return [output for chunk in results for output in chunk]
@@ -0,0 +1,221 @@
+"""
+Intcode VM benchmarks, run from the repository root with
+`python -m intcode.benchmarks`.
+
+Puzzle inputs from the days using the VM are used as benchmark programs.
+"""
+import asyncio
+import os
+import timeit
+from itertools import product
+from typing import Callable, List
+
+import intcode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_program(day: str) -> intcode.Program:
+    with open(os.path.join(BASE_DIR, "..", day, "input.txt")) as f:
+        return [int(x) for x in f.read().strip().split(",")]
+
+
+def run(mem: intcode.Memory, inputs: List[int], **kwargs) -> List[int]:
+    inputs = inputs[:]
+    output: List[int] = []
+
+    async def read_in():
+        return inputs.pop(0)
+
+    async def write_out(val: int):
+        output.append(val)
+
+    asyncio.run(intcode.execute(mem, read_in, write_out, **kwargs))
+    return output
+
+
+def best_of(fn: Callable, repeat: int = 5, number: int = 1) -> float:
+    """Best time (seconds) of `repeat` timings of calling `fn` `number` times."""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def count_instructions(prg: intcode.Program, inputs: List[int]) -> int:
+    cache = intcode.DecodeCache()
+    run(intcode.prg_to_memory(prg), inputs, decode_cache=cache)
+    return cache.hits + cache.misses
+
+
+def bench_memory_copy():
+    print("Memory copy (us per copy)")
+    print(f"{'program':<10}{'dict':>10}{'paged':>10}")
+    for day in ("09", "19", "25"):
+        prg = load_program(day)
+        dict_mem = intcode.prg_to_memory(prg)
+        paged_mem = intcode.prg_to_memory(prg, paged=True)
+        dict_t = best_of(dict_mem.copy, number=1000) * 1e6
+        paged_t = best_of(paged_mem.copy, number=1000) * 1e6
+        print(f"day {day:<6}{dict_t:>10.1f}{paged_t:>10.1f}")
+    print()
+
+
+def bench_memory_steps():
+    prg = load_program("09")
+    inputs = [2]  # BOOST sensor mode
+    n_instructions = count_instructions(prg, inputs)
+    print(f"Day 09 part 2 ({n_instructions} instructions), M instructions/s")
+    print(f"{'engine':<14}{'dict':>10}{'paged':>10}")
+    for engine in intcode.Engine:
+        rates = []
+        for paged in (False, True):
+            t = best_of(
+                lambda: run(intcode.prg_to_memory(prg, paged), inputs, engine=engine),
+                repeat=3,
+            )
+            rates.append(n_instructions / t / 1e6)
+        print(f"{engine.name:<14}" + "".join(f"{r:>10.2f}" for r in rates))
+    print()
+
+
+# Echoes every input straight back out, forever
+ECHO = [3, 7, 4, 7, 1105, 1, 0, 0]
+
+
+def bench_io(n_inputs: int = 20000):
+    """Per input/output cost of each way of driving the VM, using `ECHO`."""
+
+    def run_async(engine: intcode.Engine):
+        inputs = iter(range(n_inputs))
+
+        async def read_in():
+            return next(inputs, intcode.DebugCommands.IMMEDIATE_EXIT)
+
+        async def write_out(val: int):
+            pass
+
+        mem = intcode.prg_to_memory(ECHO)
+        asyncio.run(intcode.execute(mem, read_in, write_out, engine=engine))
+
+    def run_sync(engine: intcode.Engine):
+        inputs = iter(range(n_inputs))
+
+        def read_in():
+            return next(inputs, intcode.DebugCommands.IMMEDIATE_EXIT)
+
+        def write_out(val: int):
+            pass
+
+        mem = intcode.prg_to_memory(ECHO)
+        intcode.execute_sync(mem, read_in, write_out, engine=engine)
+
+    def run_generator(engine: intcode.Engine):
+        vm = intcode.execute_generator(intcode.prg_to_memory(ECHO), engine=engine)
+        next(vm)
+        for val in range(n_inputs):
+            vm.send(val)
+            next(vm)
+
+    print(f"Per I/O overhead ({n_inputs} inputs + outputs with ECHO), us per I/O")
+    print(f"{'engine':<14}{'execute':>10}{'sync':>10}{'generator':>11}")
+    for engine in intcode.Engine:
+        times = [
+            best_of(lambda: run(engine), repeat=3) / (2 * n_inputs) * 1e6
+            for run in (run_async, run_sync, run_generator)
+        ]
+        print(f"{engine.name:<14}{times[0]:>10.2f}{times[1]:>10.2f}{times[2]:>11.2f}")
+    print()
+
+
+def bench_fusion():
+    prg = load_program("09")
+    inputs = [2]  # BOOST sensor mode
+    fusion = intcode.Fusion()
+    run(intcode.prg_to_memory(prg), inputs, fusion=fusion)
+    print(
+        f"Day 09 part 2 superinstruction fusion ({fusion.dispatches_saved} "
+        "dispatches saved), seconds"
+    )
+    print(f"{'engine':<14}{'off':>10}{'on':>10}")
+    for engine in (intcode.Engine.INTERPRETER, intcode.Engine.THREADED):
+        off, on = (
+            best_of(
+                lambda: run(
+                    intcode.prg_to_memory(prg), inputs, engine=engine, fusion=f
+                ),
+                repeat=5,
+            )
+            for f in (None, intcode.Fusion())
+        )
+        print(f"{engine.name:<14}{off:>10.3f}{on:>10.3f}")
+    print()
+
+
+def play_breakout(mem: intcode.Memory, **kwargs):
+    """Plays day 13's game (part 2), moving the paddle towards the ball."""
+    tiles: List[int] = []
+    pos = {3: 0, 4: 0}  # Paddle and ball x
+
+    def handle_output(val: int):
+        tiles.append(val)
+        if len(tiles) == 3:
+            x, _, tile_id = tiles
+            if tile_id in pos and x != -1:
+                pos[tile_id] = x
+            tiles.clear()
+
+    def handle_input() -> int:
+        return (pos[4] > pos[3]) - (pos[4] < pos[3])
+
+    intcode.execute_sync(mem, handle_input, handle_output, **kwargs)
+
+
+def bench_replay():
+    prg = load_program("13")
+    prg[0] = 2  # Play for free
+    trace = intcode.Trace()
+    play_breakout(intcode.prg_to_memory(prg), trace=trace)
+    print(
+        f"Day 13 part 2 ({trace.instructions} instructions, {len(trace.inputs)} "
+        "inputs), live game vs replayed trace, seconds"
+    )
+    print(f"{'engine':<14}{'live':>10}{'replay':>10}")
+    for engine in intcode.Engine:
+        live, replayed = (
+            best_of(lambda: play_breakout(intcode.prg_to_memory(prg), engine=engine)),
+            best_of(
+                lambda: intcode.replay(
+                    trace, intcode.prg_to_memory(prg), verify=False, engine=engine
+                )
+            ),
+        )
+        print(f"{engine.name:<14}{live:>10.3f}{replayed:>10.3f}")
+    print()
+
+
+def bench_simd():
+    from intcode import simd  # Requires NumPy
+
+    prg = load_program("19")
+    print("Day 19 drone batches, scalar (compiled) vs lock-step SIMD")
+    print(f"{'batch':<22}{'scalar s':>10}{'simd s':>10}{'utilisation':>13}")
+    batches = {
+        "50x50 scan": list(product(range(50), repeat=2)),
+        "10k sweep (y=1000)": [(x, 1000) for x in range(10000)],
+    }
+    for name, inputs in batches.items():
+        scalar_t = best_of(lambda: intcode.run_batch(prg, inputs), repeat=3)
+        vm = simd.LockstepVM(prg, inputs)
+        vm.run()
+        simd_t = best_of(lambda: simd.run_batch(prg, inputs), repeat=3)
+        print(
+            f"{name:<22}{scalar_t:>10.3f}{simd_t:>10.3f}{vm.stats.utilisation:>13.2f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    bench_memory_copy()
+    bench_memory_steps()
+    bench_io()
+    bench_fusion()
+    bench_replay()
+    bench_simd()
@@ -0,0 +1,386 @@
+"""
+Block compiler Intcode engine: basic blocks are translated into Python functions.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .core import (
+    DebugCommands,
+    ExecutionGenerator,
+    Instruction,
+    Mode,
+    OpCodes,
+    parse_instruction,
+)
+from .memory import Memory
+
+# Instructions executed outside of blocks (I/O and volatile instructions) are
+# decoded every time they are executed. Decoding only depends on the value of the
+# opcode cell so it can be cached by value, even for self-modifying code.
+_decode = lru_cache(maxsize=None)(parse_instruction)
+
+
+def _param_address(mem: Memory, inst: Instruction, ip: int, rel_base: int, param: int):
+    return {
+        Mode.POSITION: mem[ip + param],
+        Mode.IMMEDIATE: ip + param,
+        Mode.RELATIVE: rel_base + mem[ip + param],
+    }[inst.modes[param - 1]]
+
+
+def _write_address(mem: Memory, inst: Instruction, ip: int, rel_base: int, param: int):
+    return {
+        Mode.POSITION: mem[ip + param],
+        Mode.RELATIVE: rel_base + mem[ip + param],
+    }[inst.modes[param - 1]]
+
+
+def _step(mem: Memory, inst: Instruction, ip: int, rel_base: int):
+    """Executes a single non-I/O instruction.
+
+    Returns:
+        Tuple of the updated `ip`, `rel_base` and the address written to (if any).
+    """
+
+    def read(param: int) -> int:
+        return mem[_param_address(mem, inst, ip, rel_base, param)]
+
+    op = inst.op
+    if op == OpCodes.SET_REL_BASE:
+        return ip + 2, rel_base + read(1), None
+    elif op == OpCodes.JUMP_IF_TRUE:
+        return (read(2) if read(1) else ip + 3), rel_base, None
+    elif op == OpCodes.JUMP_IF_FALSE:
+        return (ip + 3 if read(1) else read(2)), rel_base, None
+    elif op == OpCodes.ADD:
+        val = read(1) + read(2)
+    elif op == OpCodes.MUL:
+        val = read(1) * read(2)
+    elif op == OpCodes.LT:
+        val = 1 if read(1) < read(2) else 0
+    elif op == OpCodes.EQ:
+        val = 1 if read(1) == read(2) else 0
+    else:
+        raise RuntimeError(f"Invalid opcode {op}")
+    addr = _write_address(mem, inst, ip, rel_base, 3)
+    mem[addr] = val
+    return ip + 4, rel_base, addr
+
+
+class TranslatedBlock(NamedTuple):
+    start: int
+    end: int  # Exclusive
+    source: str
+
+
+def translate_block(
+    mem: Memory, start: int, volatile: AbstractSet[int] = frozenset()
+) -> Optional[TranslatedBlock]:
+    """Translates the basic block starting at `start` into Python source.
+
+    A block is a run of instructions ending at (and including) the first jump, or
+    ending just before the first I/O instruction, `STOP` or instruction which
+    cannot be decoded. The source defines a function `block(mem, rb, cells,
+    invalidate)` which executes the block with the relative base held in the
+    local `rb` and returns a tuple of the next `ip` and `rb`.
+
+    Parameters are fixed in the generated source so every write is checked
+    against `cells` (addresses of translated code) and, if it hits, calls
+    `invalidate` with the address and returns immediately. Parameters at
+    `volatile` addresses (those known to be written to by the program) are
+    instead read from memory when the block is executed, and the block ends
+    before any instruction whose opcode is volatile.
+
+    Returns:
+        The translated block or `None` if no instructions could be translated
+        (e.g. `start` contains an I/O instruction).
+    """
+
+    def operand(addr: int, mode: Mode) -> str:
+        val = f"mem[{addr}]" if addr in volatile else f"{mem[addr]}"
+        return {
+            Mode.POSITION: f"mem[{val}]",
+            Mode.IMMEDIATE: val,
+            Mode.RELATIVE: f"mem[rb + {val}]",
+        }[mode]
+
+    def target(addr: int, mode: Mode) -> str:
+        val = f"mem[{addr}]" if addr in volatile else f"{mem[addr]}"
+        return {Mode.POSITION: val, Mode.RELATIVE: f"rb + {val}"}[mode]
+
+    expressions = {
+        OpCodes.ADD: "{} + {}",
+        OpCodes.MUL: "{} * {}",
+        OpCodes.LT: "1 if {} < {} else 0",
+        OpCodes.EQ: "1 if {} == {} else 0",
+    }
+    lines = ["def block(mem, rb, cells, invalidate):"]
+    ip = start
+    while ip not in volatile:
+        try:
+            inst = parse_instruction(mem[ip])
+        except (AssertionError, ValueError):
+            break
+        x, y = (operand(ip + i, inst.modes[i - 1]) for i in (1, 2))
+        if inst.op in expressions:
+            lines += [
+                f"    addr = {target(ip + 3, inst.modes[2])}",
+                f"    mem[addr] = {expressions[inst.op].format(x, y)}",
+                "    if addr in cells:",
+                "        invalidate(addr)",
+                f"        return {ip + 4}, rb",
+            ]
+            ip += 4
+        elif inst.op == OpCodes.SET_REL_BASE:
+            lines.append(f"    rb += {x}")
+            ip += 2
+        elif inst.op == OpCodes.JUMP_IF_TRUE:
+            lines += [
+                f"    if {x}:",
+                f"        return {y}, rb",
+                f"    return {ip + 3}, rb",
+            ]
+            return TranslatedBlock(start, ip + 3, "\n".join(lines))
+        elif inst.op == OpCodes.JUMP_IF_FALSE:
+            lines += [
+                f"    if not {x}:",
+                f"        return {y}, rb",
+                f"    return {ip + 3}, rb",
+            ]
+            return TranslatedBlock(start, ip + 3, "\n".join(lines))
+        else:
+            break
+    if ip == start:
+        return None
+    lines.append(f"    return {ip}, rb")
+    return TranslatedBlock(start, ip, "\n".join(lines))
+
+
+BlockFunction = Callable[[Memory, int, Any, Callable[[int], None]], Tuple[int, int]]
+
+# Most compiled blocks kept for later runs, the least recently used block is
+# evicted when it's exceeded
+MAX_COMPILED_BLOCKS = 4096
+
+BlockKey = Tuple[int, Tuple[Optional[int], ...]]
+
+# Compiled blocks shared between all runs, keyed by start address and the contents
+# of the block's memory, with volatile addresses replaced by `None`. Translating
+# and compiling are by far the most expensive part of running a block so this
+# allows programs which are run many times to only pay for it once.
+_compiled_blocks: "OrderedDict[BlockKey, BlockFunction]" = OrderedDict()
+# End addresses of the cached blocks starting at each address, with the number
+# of cached blocks ending there
+_block_ends: Dict[int, Dict[int, int]] = {}
+
+
+def compile_block(
+    mem: Memory, start: int, volatile: AbstractSet[int] = frozenset()
+) -> Optional[Tuple[BlockFunction, int]]:
+    """Translates and compiles the basic block starting at `start`.
+
+    See `translate_block` for argument details.
+
+    Returns:
+        Tuple of the block function and the (exclusive) end address of the block,
+        or `None` if there is no block to compile at `start`.
+    """
+
+    def key(end: int) -> BlockKey:
+        return (
+            start,
+            tuple(None if a in volatile else mem[a] for a in range(start, end)),
+        )
+
+    for end in _block_ends.get(start, ()):
+        cached = key(end)
+        fn = _compiled_blocks.get(cached)
+        if fn is not None:
+            _compiled_blocks.move_to_end(cached)
+            return fn, end
+    block = translate_block(mem, start, volatile)
+    if block is None:
+        return None
+    namespace: Dict[str, Any] = {}
+    exec(compile(block.source, f"<intcode block {start}>", "exec"), namespace)
+    fn = _compiled_blocks[key(block.end)] = namespace["block"]
+    ends = _block_ends.setdefault(start, {})
+    ends[block.end] = ends.get(block.end, 0) + 1
+    if len(_compiled_blocks) > MAX_COMPILED_BLOCKS:
+        (evicted, contents), _ = _compiled_blocks.popitem(last=False)
+        ends = _block_ends[evicted]
+        end = evicted + len(contents)
+        ends[end] -= 1
+        if not ends[end]:
+            del ends[end]
+            if not ends:
+                del _block_ends[evicted]
+    return fn, block.end
+
+
+class BlockCode:
+    """Basic blocks of the program in `mem`, compiled to Python functions.
+
+    Blocks are compiled the first time they are entered. Writes which land on a
+    block discard it and mark the written address as volatile. Blocks compiled
+    afterwards read volatile parameters from memory, and instructions with a
+    volatile opcode are interpreted one at a time. Addresses known to be volatile
+    up front (see `Analysis.volatile`) can be given as `volatile`, so blocks
+    containing them are never compiled only to be discarded.
+    """
+
+    def __init__(self, mem: Memory, volatile: Iterable[int] = ()):
+        self.mem = mem
+        # `None` for addresses which do not start a block
+        self.blocks: Dict[int, Optional[BlockFunction]] = {}
+        # Tuples rather than lists so `fork` can copy this shallowly
+        self.cells: Dict[int, Tuple[int, ...]] = {}
+        self._ends: Dict[int, int] = {}
+        self.volatile: Set[int] = set(volatile)
+
+    def fork(self, mem: Memory) -> "BlockCode":
+        """Copy of these blocks for `mem`, an *unmodified* copy of this memory."""
+        code = BlockCode(mem)
+        code.blocks = self.blocks.copy()
+        code.cells = self.cells.copy()
+        code._ends = self._ends.copy()
+        code.volatile = self.volatile.copy()
+        return code
+
+    def learn(self, other: "BlockCode"):
+        """Compiles the blocks entered by `other`, a fork of this code, here too.
+
+        Addresses found to be volatile by `other` are also treated as volatile
+        here, so future forks don't need to discard the blocks containing them.
+        Blocks are compiled from this code's memory so they are valid for future
+        forks regardless of any self-modification seen by `other`.
+        """
+        for addr in other.volatile - self.volatile:
+            self.invalidate(addr)
+        for start in other.blocks.keys() - self.blocks.keys():
+            self.fetch(start)
+
+    def fetch(self, ip: int) -> Optional[BlockFunction]:
+        try:
+            return self.blocks[ip]
+        except KeyError:
+            pass
+        assert ip >= 0
+        compiled = compile_block(self.mem, ip, self.volatile)
+        if compiled is None:
+            self.blocks[ip] = None
+            return None
+        fn, end = compiled
+        self.blocks[ip] = fn
+        self._ends[ip] = end
+        for addr in range(ip, end):
+            if addr not in self.volatile:
+                self.cells[addr] = self.cells.get(addr, ()) + (ip,)
+        return fn
+
+    def run_until_io(self, ip: int, rel_base: int) -> Tuple[Instruction, int, int]:
+        """Executes from `ip` until reaching an I/O or `STOP` instruction.
+
+        Returns:
+            Tuple of the (decoded) I/O or `STOP` instruction, `ip` and `rel_base`.
+        """
+        mem, blocks, cells = self.mem, self.blocks, self.cells
+        fetch, invalidate, decode = self.fetch, self.invalidate, _decode
+        while True:
+            block = blocks[ip] if ip in blocks else fetch(ip)
+            if block is not None:
+                ip, rel_base = block(mem, rel_base, cells, invalidate)
+                continue
+
+            inst = decode(mem[ip])
+            if inst.op in (OpCodes.STOP, OpCodes.INPUT, OpCodes.OUTPUT):
+                return inst, ip, rel_base
+            ip, rel_base, addr = _step(mem, inst, ip, rel_base)
+            if addr in cells:
+                invalidate(addr)
+
+    def write_input(self, inst: Instruction, ip: int, rel_base: int, val: int):
+        """Writes `val` as the result of the `INPUT` instruction at `ip`."""
+        addr = _write_address(self.mem, inst, ip, rel_base, 1)
+        self.mem[addr] = val
+        if addr in self.cells:
+            self.invalidate(addr)
+
+    def invalidate(self, addr: int):
+        self.volatile.add(addr)
+        for start in self.cells.pop(addr, ()):
+            del self.blocks[start]
+            for other in range(start, self._ends.pop(start)):
+                if other in self.cells:
+                    remaining = tuple(s for s in self.cells[other] if s != start)
+                    if remaining:
+                        self.cells[other] = remaining
+                    else:
+                        del self.cells[other]
+
+
+def execute_compiled(mem: Memory, ip: int = 0, rel_base: int = 0) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`) using `BlockCode`.
+
+    Engine for `execute_generator` (see it for argument details).
+    """
+    code = BlockCode(mem)
+    while True:
+        inst, ip, rel_base = code.run_until_io(ip, rel_base)
+        if inst.op == OpCodes.STOP:
+            return
+        elif inst.op == OpCodes.INPUT:
+            val = yield None
+            if val is DebugCommands.IMMEDIATE_EXIT:
+                # Return 'snapshot' of VM state for debugging
+                return mem, ip, rel_base
+            code.write_input(inst, ip, rel_base, val)
+        else:
+            yield mem[_param_address(mem, inst, ip, rel_base, 1)]
+        ip += 2
+
+
+def run_compiled(mem: Memory, inputs: Iterable[int]) -> List[int]:
+    """Runs the program in `mem` to completion using `BlockCode`, *without* asyncio.
+
+    Args:
+        mem: Memory containing an Intcode program
+        inputs: Every input the program will receive, in order
+    Returns:
+        All outputs of the program, in order
+    Raises:
+        RuntimeError: If the program requires more input than `inputs` provides
+    """
+    return _run_block_code(BlockCode(mem), inputs)
+
+
+def _run_block_code(code: BlockCode, inputs: Iterable[int]) -> List[int]:
+    inputs = iter(inputs)
+    output: List[int] = []
+    mem = code.mem
+    ip = rel_base = 0
+    while True:
+        inst, ip, rel_base = code.run_until_io(ip, rel_base)
+        if inst.op == OpCodes.STOP:
+            return output
+        elif inst.op == OpCodes.INPUT:
+            try:
+                val = next(inputs)
+            except StopIteration:
+                raise RuntimeError("Program requires more input than provided")
+            code.write_input(inst, ip, rel_base, val)
+        else:
+            output.append(mem[_param_address(mem, inst, ip, rel_base, 1)])
+        ip += 2
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def intcode_cache_dir(tmp_path, monkeypatch):
+    # Analyses cached on disk by tests don't end up in the user's cache
+    monkeypatch.setenv("INTCODE_CACHE_DIR", str(tmp_path / "intcode-cache"))
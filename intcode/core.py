@@ -0,0 +1,52 @@
+"""
+Intcode instruction set: opcodes, addressing modes and instruction decoding.
+"""
+import hashlib
+from enum import Enum, IntEnum
+from typing import Any, Generator, List, NamedTuple, Optional
+
+Program = List[int]
+
+# Yields program outputs, or `None` when the program requires input which must
+# then be sent to it. See `execute_generator`.
+ExecutionGenerator = Generator[Optional[int], Optional[int], Any]
+
+
+class DebugCommands(Enum):
+    IMMEDIATE_EXIT = 0
+
+
+class Mode(IntEnum):
+    POSITION = 0
+    IMMEDIATE = 1
+    RELATIVE = 2
+
+
+class Instruction(NamedTuple):
+    op: int
+    modes: List[Mode]
+
+
+class OpCodes(IntEnum):
+    ADD = 1
+    MUL = 2
+    INPUT = 3
+    OUTPUT = 4
+    JUMP_IF_TRUE = 5
+    JUMP_IF_FALSE = 6
+    LT = 7
+    EQ = 8
+    SET_REL_BASE = 9
+    STOP = 99
+
+
+def parse_instruction(code: int) -> Instruction:
+    op = code % 100
+    inst = Instruction(op, [Mode(code // i % 10) for i in (100, 1000, 10000)])
+    assert inst.modes[-1] in (Mode.POSITION, Mode.RELATIVE)
+    return inst
+
+
+def program_digest(prg: Program) -> str:
+    """Digest identifying a program, for use in cache keys."""
+    return hashlib.blake2b(",".join(map(str, prg)).encode(), digest_size=16).hexdigest()
@@ -0,0 +1,322 @@
+"""
+Static analysis of Intcode programs: disassembly, control flow and
+self-modifying writes.
+
+`disassemble` follows the program's control flow from its entry points
+(recursive descent), so data is not mistaken for code, recovering:
+
+- Instructions, by address
+- Jumps and their targets, where known statically (immediate mode). Jumps whose
+  target is read from memory (e.g. returns from subroutines) are indirect
+- Basic blocks and the edges between them
+- Self-modifying write sites: instructions whose (position mode) destination is
+  a cell of a disassembled instruction
+
+Return addresses are found by a heuristic: the constant stored by an
+`ADD`/`MUL` of immediate operands just before an unconditional jump (i.e. a
+call, see `Pattern.CALL`) is disassembled as an entry point. Relative mode
+writes (the stack) are assumed not to modify code.
+
+`analyse` caches the analysis on disk, keyed by the program's digest, so it's
+only ever computed once for each program::
+
+    analysis = intcode.analyse(prg)
+    print(analysis.listing())
+"""
+import json
+import os
+import tempfile
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from .core import Mode, OpCodes, Program, parse_instruction, program_digest
+from .profiler import BLOCK_ENDS, PARAMETERS
+
+# Version of the analysis, cached analyses of other versions are recomputed
+VERSION = 1
+
+JUMPS = {OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE}
+
+# Index of the destination parameter of each instruction which writes to memory
+DESTINATIONS = {
+    OpCodes.ADD: 3,
+    OpCodes.MUL: 3,
+    OpCodes.INPUT: 1,
+    OpCodes.LT: 3,
+    OpCodes.EQ: 3,
+}
+
+
+class DecodedInstruction(NamedTuple):
+    address: int
+    op: OpCodes
+    modes: Tuple[Mode, ...]  # One per parameter
+    params: Tuple[int, ...]
+
+    @property
+    def end(self) -> int:
+        """Address following the instruction (exclusive)."""
+        return self.address + len(self.params) + 1
+
+    def __str__(self) -> str:
+        params = (
+            {
+                Mode.POSITION: f"[{p}]",
+                Mode.IMMEDIATE: f"{p}",
+                Mode.RELATIVE: f"[rb{p:+}]",
+            }[mode]
+            for mode, p in zip(self.modes, self.params)
+        )
+        return f"{self.address:>6}: {self.op.name} {', '.join(params)}".rstrip()
+
+
+class BasicBlock(NamedTuple):
+    start: int
+    end: int  # Exclusive
+    # Statically known successors, empty for a `STOP` or an indirect jump
+    successors: Tuple[int, ...]
+
+
+class Analysis(NamedTuple):
+    entry_points: Tuple[int, ...]
+    instructions: Dict[int, DecodedInstruction]
+    # Target of each jump, `None` for indirect jumps
+    jumps: Dict[int, Optional[int]]
+    blocks: Dict[int, BasicBlock]
+    # Address written to by each self-modifying instruction, by its address
+    writes: Dict[int, int]
+
+    @property
+    def volatile(self) -> FrozenSet[int]:
+        """Addresses of code which the program (statically) writes to."""
+        return frozenset(self.writes.values())
+
+    def listing(self) -> str:
+        """Disassembly of the program, one instruction per line.
+
+        Blocks are separated by a blank line, and self-modified instructions are
+        marked with a `*`.
+        """
+        lines: List[str] = []
+        volatile = self.volatile
+        for start, block in sorted(self.blocks.items()):
+            lines.append("")
+            addr = start
+            while addr < block.end:
+                inst = self.instructions[addr]
+                modified = any(a in volatile for a in range(addr, inst.end))
+                lines.append(f"{'*' if modified else ' '}{inst}")
+                addr = inst.end
+        return "\n".join(lines[1:])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": VERSION,
+            "entry_points": list(self.entry_points),
+            "instructions": [
+                [i.address, i.op, list(i.modes), list(i.params)]
+                for i in self.instructions.values()
+            ],
+            "jumps": [[addr, target] for addr, target in self.jumps.items()],
+            "blocks": [
+                [b.start, b.end, list(b.successors)] for b in self.blocks.values()
+            ],
+            "writes": [[addr, target] for addr, target in self.writes.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Analysis":
+        instructions = (
+            DecodedInstruction(
+                addr, OpCodes(op), tuple(map(Mode, modes)), tuple(params)
+            )
+            for addr, op, modes, params in d["instructions"]
+        )
+        return cls(
+            tuple(d["entry_points"]),
+            {i.address: i for i in instructions},
+            {addr: target for addr, target in d["jumps"]},
+            {start: BasicBlock(start, end, tuple(s)) for start, end, s in d["blocks"]},
+            {addr: target for addr, target in d["writes"]},
+        )
+
+
+def decode(prg: Program, addr: int) -> Optional[DecodedInstruction]:
+    """Decodes the instruction at `addr`, `None` if it isn't a valid instruction."""
+    if not 0 <= addr < len(prg):
+        return None
+    try:
+        inst = parse_instruction(prg[addr])
+        op = OpCodes(inst.op)
+    except (ValueError, AssertionError):
+        return None
+    n = PARAMETERS[op]
+    params = tuple(prg[addr + 1 : addr + 1 + n])
+    if len(params) < n:
+        return None
+    modes = tuple(inst.modes[:n])
+    if op in DESTINATIONS and modes[DESTINATIONS[op] - 1] == Mode.IMMEDIATE:
+        return None
+    return DecodedInstruction(addr, op, modes, params)
+
+
+def _jump(inst: DecodedInstruction) -> Tuple[bool, bool, Optional[int]]:
+    """Whether a jump may be taken, may fall through, and its static target."""
+    (cond_mode, target_mode), (cond, target) = inst.modes, inst.params
+    static_target = target if target_mode == Mode.IMMEDIATE else None
+    if cond_mode != Mode.IMMEDIATE:
+        return True, True, static_target
+    taken = bool(cond) == (inst.op == OpCodes.JUMP_IF_TRUE)
+    return taken, not taken, static_target
+
+
+def _successors(inst: DecodedInstruction) -> Tuple[int, ...]:
+    if inst.op == OpCodes.STOP:
+        return ()
+    if inst.op in JUMPS:
+        may_jump, may_fall_through, target = _jump(inst)
+        successors = [target] if may_jump and target is not None else []
+        return tuple(successors + ([inst.end] if may_fall_through else []))
+    return (inst.end,)
+
+
+def _return_address(prg: Program, store: DecodedInstruction) -> Optional[int]:
+    # The constant stored by `store`, if it's a possible return address
+    if store.op in (OpCodes.ADD, OpCodes.MUL) and store.modes[:2] == (
+        Mode.IMMEDIATE,
+        Mode.IMMEDIATE,
+    ):
+        x, y = store.params[:2]
+        addr = x + y if store.op == OpCodes.ADD else x * y
+        if 0 <= addr < len(prg):
+            return addr
+    return None
+
+
+def disassemble(prg: Program, entry_points: Iterable[int] = (0,)) -> Analysis:
+    """Statically analyses `prg`, starting from `entry_points` (see module)."""
+    entries = list(entry_points)
+    instructions: Dict[int, DecodedInstruction] = {}
+    # Instructions by the address following them
+    preceding: Dict[int, DecodedInstruction] = {}
+    # Unconditional jumps, whose preceding instruction is checked for a return
+    # address once it has been disassembled
+    calls: List[DecodedInstruction] = []
+    # Addresses reached which could not be decoded, e.g. as they are only valid
+    # code once the program has modified itself
+    invalid = set()
+    leaders = set(entries)
+    pending = list(entries)
+    while pending:
+        while pending:
+            addr = pending.pop()
+            if addr in instructions or addr in invalid:
+                continue
+            inst = decode(prg, addr)
+            if inst is None:
+                invalid.add(addr)
+                continue
+            instructions[addr] = inst
+            preceding[inst.end] = inst
+            successors = _successors(inst)
+            if inst.op in JUMPS:
+                calls.append(inst)
+            if inst.op in BLOCK_ENDS or inst.op == OpCodes.STOP:
+                leaders.update(successors)
+            pending.extend(successors)
+        unresolved = []
+        for call in calls:
+            may_jump, may_fall_through, _ = _jump(call)
+            if not may_jump or may_fall_through:
+                continue
+            if call.address not in preceding:
+                # Its preceding instruction may yet be disassembled
+                unresolved.append(call)
+                continue
+            ret = _return_address(prg, preceding[call.address])
+            if ret is not None and ret not in instructions and ret not in invalid:
+                entries.append(ret)
+                leaders.add(ret)
+                pending.append(ret)
+        calls = unresolved
+
+    jumps: Dict[int, Optional[int]] = {
+        addr: _jump(inst)[2] for addr, inst in instructions.items() if inst.op in JUMPS
+    }
+
+    blocks: Dict[int, BasicBlock] = {}
+    for start in sorted(leaders & instructions.keys()):
+        inst = instructions[start]
+        while inst.op not in BLOCK_ENDS and inst.op != OpCodes.STOP:
+            following = instructions.get(inst.end)
+            if following is None or following.address in leaders:
+                break
+            inst = following
+        blocks[start] = BasicBlock(start, inst.end, _successors(inst))
+
+    cells = {a for inst in instructions.values() for a in range(inst.address, inst.end)}
+    cells |= invalid
+    writes: Dict[int, int] = {}
+    for addr, inst in instructions.items():
+        if inst.op in DESTINATIONS:
+            param = DESTINATIONS[inst.op] - 1
+            if inst.modes[param] == Mode.POSITION and inst.params[param] in cells:
+                writes[addr] = inst.params[param]
+
+    return Analysis(tuple(entries), instructions, jumps, blocks, writes)
+
+
+def default_cache_dir() -> str:
+    """`$INTCODE_CACHE_DIR`, or `~/.cache/intcode` if it isn't set."""
+    return os.environ.get("INTCODE_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "intcode"
+    )
+
+
+# Analyses loaded (or computed) by this process, keyed by cache directory and
+# program digest
+_analyses: Dict[Tuple[str, str], Analysis] = {}
+
+
+def analyse(prg: Program, cache_dir: Optional[str] = None) -> Analysis:
+    """`disassemble(prg)`, cached on disk (and in memory) by program digest.
+
+    Args:
+        prg: Intcode program, as loaded (before it has modified itself)
+        cache_dir: Directory of cached analyses (default: `default_cache_dir()`),
+            created if it doesn't exist. The analysis is still returned if it
+            can't be written there.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    key = (cache_dir, program_digest(prg))
+    if key not in _analyses:
+        _analyses[key] = _load_or_analyse(prg, cache_dir, key[1])
+    return _analyses[key]
+
+
+def _load_or_analyse(prg: Program, cache_dir: str, digest: str) -> Analysis:
+    path = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(path) as f:
+            d = json.load(f)
+        if d["version"] != VERSION:
+            raise ValueError(f"Analysis version {d['version']}")
+        return Analysis.from_dict(d)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # Not cached, or not an analysis (e.g. corrupt)
+    analysis = disassemble(prg)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Written atomically as other processes may be reading it
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    except OSError:
+        return analysis  # Not cached, e.g. if the directory is read-only
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(analysis.to_dict(), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)  # Not cached, e.g. if the disk is full
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return analysis
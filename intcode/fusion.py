@@ -0,0 +1,146 @@
+"""
+Superinstruction fusion: an optional pass which finds common sequences of
+instructions so engines can execute each sequence with a single dispatch.
+
+Patterns, each ending with a conditional jump depending on the preceding
+instruction's result:
+
+- `COMPARE_JUMP`: `LT`/`EQ`, then a jump *on* the comparison's result
+- `ARITHMETIC_JUMP`: `ADD`/`MUL`, then a jump *to* the result
+- `ARITHMETIC_COMPARE_JUMP`: `ADD`/`MUL`, then `LT`/`EQ` of the result, then a
+  jump on the comparison's result
+- `CALL`: `ADD`/`MUL`/`LT`/`EQ`, then an unconditional jump (immediate mode
+  condition), e.g. storing a return address then calling a subroutine
+
+Pass a `Fusion` to `execute` (or its synchronous equivalents) to enable it. The
+`INTERPRETER` engine skips decoding and dispatching the later instructions of a
+superinstruction, the `THREADED` engine compiles each superinstruction into a
+single closure. (The `COMPILED` engine already executes whole basic blocks with
+a single dispatch, so fusion does not apply to it.)
+"""
+from enum import IntEnum
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .core import Instruction, Mode, OpCodes, parse_instruction
+from .memory import Memory
+
+ARITHMETIC = {OpCodes.ADD, OpCodes.MUL}
+COMPARISONS = {OpCodes.LT, OpCodes.EQ}
+JUMPS = {OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE}
+
+OPERATIONS: Dict[int, Callable[[int, int], int]] = {
+    OpCodes.ADD: lambda x, y: x + y,
+    OpCodes.MUL: lambda x, y: x * y,
+    OpCodes.LT: lambda x, y: 1 if x < y else 0,
+    OpCodes.EQ: lambda x, y: 1 if x == y else 0,
+}
+
+
+class Pattern(IntEnum):
+    # Values are pseudo opcodes, distinct from every real opcode, so decoded
+    # superinstructions can be dispatched alongside decoded instructions
+    COMPARE_JUMP = 100
+    ARITHMETIC_JUMP = 101
+    ARITHMETIC_COMPARE_JUMP = 102
+    CALL = 103
+
+    @property
+    def instructions(self) -> int:
+        return 3 if self == Pattern.ARITHMETIC_COMPARE_JUMP else 2
+
+
+class Superinstruction(NamedTuple):
+    op: Pattern
+    start: int
+    end: int  # Exclusive, i.e. the address following the final jump
+    instructions: Tuple[Instruction, ...]
+
+
+class FusionStats(NamedTuple):
+    # Number of superinstructions found
+    fused: int
+    executions: Dict[Pattern, int]
+    dispatches_saved: int
+
+
+def _same_cell(mode_a: Mode, val_a: int, mode_b: Mode, val_b: int) -> bool:
+    """Whether two parameters refer to the same cell (with the same `rel_base`)."""
+    return mode_a == mode_b and mode_a != Mode.IMMEDIATE and val_a == val_b
+
+
+def match_superinstruction(mem: Memory, ip: int) -> Optional[Superinstruction]:
+    """The superinstruction starting at `ip`, if any."""
+    try:
+        first = parse_instruction(mem[ip])
+        second = parse_instruction(mem[ip + 4])
+    except (AssertionError, ValueError):
+        return None
+    dst = (first.modes[2], mem[ip + 3])
+
+    if first.op in ARITHMETIC and second.op in COMPARISONS:
+        if _same_cell(*dst, second.modes[0], mem[ip + 5]) or _same_cell(
+            *dst, second.modes[1], mem[ip + 6]
+        ):
+            try:
+                jump = parse_instruction(mem[ip + 8])
+            except (AssertionError, ValueError):
+                return None
+            if jump.op in JUMPS and _same_cell(
+                second.modes[2], mem[ip + 7], jump.modes[0], mem[ip + 9]
+            ):
+                return Superinstruction(
+                    Pattern.ARITHMETIC_COMPARE_JUMP, ip, ip + 11, (first, second, jump)
+                )
+    if second.op not in JUMPS:
+        return None
+    if first.op in OPERATIONS and second.modes[0] == Mode.IMMEDIATE:
+        if bool(mem[ip + 5]) == (second.op == OpCodes.JUMP_IF_TRUE):
+            return Superinstruction(Pattern.CALL, ip, ip + 7, (first, second))
+        return None
+    if first.op in COMPARISONS and _same_cell(*dst, second.modes[0], mem[ip + 5]):
+        return Superinstruction(Pattern.COMPARE_JUMP, ip, ip + 7, (first, second))
+    if first.op in ARITHMETIC and _same_cell(*dst, second.modes[1], mem[ip + 6]):
+        return Superinstruction(Pattern.ARITHMETIC_JUMP, ip, ip + 7, (first, second))
+    return None
+
+
+class Fusion:
+    """Enables superinstruction fusion for a run and collects its stats.
+
+    Note: Like a `DecodeCache`, a `Fusion` must only be used for one run at a
+    time, although it can be reused for later runs to accumulate stats.
+    """
+
+    def __init__(self):
+        # Executions of each superinstruction found, boxed to be shared with
+        # the engines (which count them cheaply). Superinstructions whose
+        # execution was cut short by a write to their own code are not counted.
+        self._counters: List[Tuple[Pattern, List[int]]] = []
+
+    def match(self, mem: Memory, ip: int) -> Optional[Superinstruction]:
+        return match_superinstruction(mem, ip)
+
+    def counter(self, sup: Superinstruction) -> List[int]:
+        """Box counting executions of `sup`, for the engine which fused it."""
+        counter = [0]
+        self._counters.append((sup.op, counter))
+        return counter
+
+    @property
+    def fused(self) -> int:
+        return len(self._counters)
+
+    @property
+    def executions(self) -> Dict[Pattern, int]:
+        executions = {p: 0 for p in Pattern}
+        for pattern, counter in self._counters:
+            executions[pattern] += counter[0]
+        return executions
+
+    @property
+    def dispatches_saved(self) -> int:
+        return sum(n * (p.instructions - 1) for p, n in self.executions.items())
+
+    @property
+    def stats(self) -> FusionStats:
+        return FusionStats(self.fused, self.executions, self.dispatches_saved)
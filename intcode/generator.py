@@ -0,0 +1,31 @@
+"""
+Generator based Intcode VM interface, originally written for day 09.
+
+`run` yields each output and reads inputs from a `deque` which the caller fills
+in between outputs.
+"""
+from collections import deque
+
+from .interpreter import Engine, execute_generator
+from .memory import Memory
+
+
+def run(mem: Memory, inqueue: deque, engine: Engine = Engine.INTERPRETER):
+    """Executes the program in `mem`, yielding each output.
+
+    Inputs are popped from the left of `inqueue` as the program requires them,
+    the caller must add them before resuming the generator. Returns `mem` (as the
+    generator's return value) once the program stops.
+    """
+    vm = execute_generator(mem, engine=engine)
+    val = None
+    while True:
+        try:
+            out = vm.send(val)
+        except StopIteration:
+            return mem
+        if out is None:
+            val = inqueue.popleft()
+        else:
+            val = None
+            yield out
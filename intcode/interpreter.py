@@ -0,0 +1,419 @@
+"""
+The Intcode VM entrypoints (`execute` and its synchronous equivalents), the
+interpreter engine and I/O helpers.
+"""
+from collections import defaultdict
+from enum import Enum
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    DefaultDict,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from .compiled import execute_compiled
+from .core import (
+    DebugCommands,
+    ExecutionGenerator,
+    Instruction,
+    Mode,
+    OpCodes,
+    parse_instruction,
+)
+from .fusion import OPERATIONS, Fusion, Pattern, Superinstruction
+from .memoise import Memoiser, execute_memoised
+from .memory import Memory
+from .profiler import Profiler, execute_profiled
+from .threaded import execute_threaded
+from .trace import Trace, execute_traced
+
+
+_SUPERINSTRUCTIONS = frozenset(Pattern)
+
+
+class Engine(Enum):
+    INTERPRETER = 0
+    THREADED = 1
+    COMPILED = 2
+
+
+class DecodeCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    invalidations: int
+
+
+class DecodeCache:
+    """Decoded instructions for a single `Memory`, keyed by address.
+
+    Only the opcode cell of an instruction is used to decode it (parameters are
+    read from memory when the instruction is executed) so an entry only becomes
+    stale when the opcode cell itself is overwritten. `execute` calls
+    `invalidate` for every write it makes, which handles self-modifying code.
+
+    Note: A cache must not be shared between different `Memory` instances, nor
+    used across writes made to memory outside of `execute`.
+    """
+
+    def __init__(self):
+        self._instructions: Dict[int, Instruction] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def decode(self, mem: Memory, addr: int) -> Instruction:
+        try:
+            inst = self._instructions[addr]
+        except KeyError:
+            self.misses += 1
+            inst = self._instructions[addr] = parse_instruction(mem[addr])
+        else:
+            self.hits += 1
+        return inst
+
+    def invalidate(self, addr: int):
+        if addr in self._instructions:
+            del self._instructions[addr]
+            self.invalidations += 1
+
+    @property
+    def stats(self) -> DecodeCacheStats:
+        return DecodeCacheStats(self.hits, self.misses, self.invalidations)
+
+
+class _FusingDecodeCache(DecodeCache):
+    """`DecodeCache` which decodes superinstructions where `fusion` finds them.
+
+    A superinstruction depends on every cell of its instructions (opcodes and
+    parameters, which are matched on), so its entry is invalidated when any of
+    them is overwritten.
+    """
+
+    def __init__(self, fusion: Fusion):
+        super().__init__()
+        self.fusion = fusion
+        # Start of the superinstructions using each (non-starting) cell
+        self._fused_cells: DefaultDict[int, List[int]] = defaultdict(list)
+        # Execution counters of the cached superinstructions, by start
+        self.counters: Dict[int, List[int]] = {}
+
+    def decode(self, mem: Memory, addr: int) -> Union[Instruction, Superinstruction]:
+        try:
+            inst = self._instructions[addr]
+        except KeyError:
+            self.misses += 1
+            inst = self.fusion.match(mem, addr)
+            if inst is None:
+                inst = parse_instruction(mem[addr])
+            else:
+                self.counters[addr] = self.fusion.counter(inst)
+                for cell in range(addr + 1, inst.end):
+                    self._fused_cells[cell].append(addr)
+            self._instructions[addr] = inst
+        else:
+            self.hits += 1
+        return inst
+
+    def invalidate(self, addr: int):
+        # Inlined `DecodeCache.invalidate`, as it's called for every write
+        if addr in self._instructions:
+            del self._instructions[addr]
+            self.invalidations += 1
+        if addr in self._fused_cells:
+            for start in self._fused_cells.pop(addr):
+                if start in self._instructions:
+                    del self._instructions[start]
+                    self.invalidations += 1
+
+
+def no_input():
+    """
+    Used as a `read_in` argument to `execute` (or `execute_sync`) when the caller
+    expects the program to receive *no* input.
+
+    Raises:
+        RuntimeError: If called.
+    """
+    raise RuntimeError("Program was not expected to require input")
+
+
+class stdin:
+    def __init__(self):
+        self._input_iter = self._input()
+
+    async def __call__(self):
+        return next(self._input_iter)
+
+    def _input(self):
+        while True:
+            s = input()
+            yield from map(ord, s + "\n")
+
+
+async def stdout(val: int):
+    try:
+        s = chr(val)
+    except ValueError:
+        s = val
+    print(s, end="")
+
+
+async def execute(
+    mem: Memory,
+    read_in: Callable[[], Coroutine[None, None, int]],
+    write_out: Callable[[int], Coroutine],
+    ip: int = 0,
+    rel_base: int = 0,
+    decode_cache: Optional[DecodeCache] = None,
+    engine: Engine = Engine.INTERPRETER,
+    profiler: Optional[Profiler] = None,
+    fusion: Optional[Fusion] = None,
+    trace: Optional[Trace] = None,
+    memoiser: Optional[Memoiser] = None,
+):
+    """Intcode 'VM' entrypoint. Executes a program 'loaded' into memory (`mem`).
+
+    Args:
+        mem : Memory containing an Intcode program. Note: Can be combined with
+              `ip` and `rel_base` args to start the VM from a 'snapshot'. These
+              values are returned from the VM when `DebugCommands.IMMEDIAT_EXIT`
+              is received as input.
+        read_in: Callable providing a coro which returns the next instruction
+            (an `int`) to the running machine when awaited
+        write_out: Callable to receive program outputs (more `int`s)
+        ip: Instruction pointer, provide specific value when re-starting the VM
+            from a known state (default 0)
+        rel_base: Relative base provide specific value when re-starting the VM
+            from a known state (default 0)
+        decode_cache: Cache of decoded instructions for `mem`, provide one to
+            inspect its `stats` after execution (default: new, empty cache)
+        engine: Execution engine to run the program with, all engines behave
+            identically (default `Engine.INTERPRETER`)
+        profiler: Record a profile of the run in this `Profiler`, running the
+            program with the profiling interpreter instead of `engine`
+            (default: no profiling)
+        fusion: Execute common instruction sequences as superinstructions (see
+            `intcode.fusion`), collecting stats in this `Fusion`. Supported by
+            the `INTERPRETER` and `THREADED` engines (default: no fusion)
+        trace: Record the inputs and outputs of the run in this `Trace` (see
+            `intcode.trace`), running the program with the recording interpreter
+            instead of `engine` (default: no recording)
+        memoiser: Memoise the results of subroutine calls in this `Memoiser`
+            (see `intcode.memoise`), running the program with the memoising
+            interpreter instead of `engine` (default: no memoisation)
+    """
+    vm = execute_generator(
+        mem, ip, rel_base, decode_cache, engine, profiler, fusion, trace, memoiser
+    )
+    val = None
+    while True:
+        try:
+            out = vm.send(val)
+        except StopIteration as stop:
+            return stop.value
+        if out is None:
+            val = await read_in()
+        else:
+            val = None
+            await write_out(out)
+
+
+def execute_sync(
+    mem: Memory,
+    read_in: Callable[[], int],
+    write_out: Callable[[int], Any],
+    ip: int = 0,
+    rel_base: int = 0,
+    decode_cache: Optional[DecodeCache] = None,
+    engine: Engine = Engine.INTERPRETER,
+    profiler: Optional[Profiler] = None,
+    fusion: Optional[Fusion] = None,
+    trace: Optional[Trace] = None,
+    memoiser: Optional[Memoiser] = None,
+):
+    """Synchronous equivalent of `execute`, taking plain (not async) callables.
+
+    Use this rather than `execute` when `read_in` and `write_out` never need to
+    wait for anything, it avoids running an event loop and awaiting a coroutine
+    for every input and output (see `benchmarks.py`).
+    """
+    vm = execute_generator(
+        mem, ip, rel_base, decode_cache, engine, profiler, fusion, trace, memoiser
+    )
+    val = None
+    while True:
+        try:
+            out = vm.send(val)
+        except StopIteration as stop:
+            return stop.value
+        if out is None:
+            val = read_in()
+        else:
+            val = None
+            write_out(out)
+
+
+def execute_generator(
+    mem: Memory,
+    ip: int = 0,
+    rel_base: int = 0,
+    decode_cache: Optional[DecodeCache] = None,
+    engine: Engine = Engine.INTERPRETER,
+    profiler: Optional[Profiler] = None,
+    fusion: Optional[Fusion] = None,
+    trace: Optional[Trace] = None,
+    memoiser: Optional[Memoiser] = None,
+) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`) as a generator.
+
+    Each output is yielded. When the program requires input `None` is yielded
+    instead and the input must be sent to the generator (`vm.send(val)`), which
+    resumes the program until its next output or input. Sending
+    `DebugCommands.IMMEDIATE_EXIT` as input stops the program, the generator
+    then returns the `(mem, ip, rel_base)` snapshot (as `StopIteration.value`).
+
+    See `execute` for argument details.
+
+    Raises:
+        ValueError: If `fusion` is given for an engine which doesn't support it,
+            or together with a `decode_cache`, or if more than one of `profiler`,
+            `trace` and `memoiser` are given, or `memoiser` with `fusion`.
+    """
+    if memoiser is not None:
+        if profiler is not None or trace is not None:
+            raise ValueError("Can't memoise a profiled or traced run")
+        if fusion is not None:
+            raise ValueError("Fusion is not supported when memoising a run")
+    if trace is not None:
+        if profiler is not None:
+            raise ValueError("Can't both profile and trace a run")
+        if fusion is not None:
+            raise ValueError("Fusion is not supported when tracing a run")
+    if fusion is not None:
+        if profiler is not None or engine is Engine.COMPILED:
+            raise ValueError(
+                "Fusion is only supported by the INTERPRETER and THREADED engines"
+            )
+        if decode_cache is not None:
+            raise ValueError("Fusion uses its own decode cache")
+    if profiler is not None:
+        return execute_profiled(mem, profiler, ip, rel_base)
+    if trace is not None:
+        return execute_traced(mem, trace, ip, rel_base)
+    if memoiser is not None:
+        return execute_memoised(mem, memoiser, ip, rel_base)
+    if engine is Engine.THREADED:
+        return execute_threaded(mem, ip, rel_base, fusion)
+    if engine is Engine.COMPILED:
+        return execute_compiled(mem, ip, rel_base)
+    if fusion is not None:
+        decode_cache = _FusingDecodeCache(fusion)
+    return _interpret(mem, ip, rel_base, decode_cache)
+
+
+def _interpret(
+    mem: Memory, ip: int, rel_base: int, decode_cache: Optional[DecodeCache]
+) -> ExecutionGenerator:
+    if decode_cache is None:
+        decode_cache = DecodeCache()
+    decode = decode_cache.decode
+    invalidate = decode_cache.invalidate
+
+    def read(inst: Instruction, param: int):
+        assert param >= 1
+        addr = {
+            Mode.POSITION: mem[ip + param],
+            Mode.IMMEDIATE: ip + param,
+            Mode.RELATIVE: rel_base + mem[ip + param],
+        }[inst.modes[param - 1]]
+        return mem[addr]
+
+    def write(inst: Instruction, param: int, val: int) -> int:
+        assert param >= 1
+        addr = {
+            Mode.POSITION: mem[ip + param],
+            Mode.RELATIVE: rel_base + mem[ip + param],
+        }[inst.modes[param - 1]]
+        mem[addr] = val
+        invalidate(addr)
+        return addr
+
+    while True:
+        assert ip >= 0
+
+        inst = decode(mem, ip)
+
+        if inst.op == OpCodes.STOP:
+            return
+        elif inst.op == OpCodes.ADD:
+            write(inst, 3, read(inst, 1) + read(inst, 2))
+            ip += 4
+        elif inst.op == OpCodes.MUL:
+            write(inst, 3, read(inst, 1) * read(inst, 2))
+            ip += 4
+        elif inst.op == OpCodes.INPUT:
+            val = yield None
+            if val is DebugCommands.IMMEDIATE_EXIT:
+                # Return 'snapshot' of VM state for debugging
+                return mem, ip, rel_base
+            write(inst, 1, val)
+            ip += 2
+        elif inst.op == OpCodes.OUTPUT:
+            yield read(inst, 1)
+            ip += 2
+        elif inst.op == OpCodes.JUMP_IF_TRUE:
+            if read(inst, 1):
+                ip = read(inst, 2)
+            else:
+                ip += 3
+        elif inst.op == OpCodes.JUMP_IF_FALSE:
+            if not read(inst, 1):
+                ip = read(inst, 2)
+            else:
+                ip += 3
+        elif inst.op == OpCodes.LT:
+            write(inst, 3, 1 if read(inst, 1) < read(inst, 2) else 0)
+            ip += 4
+        elif inst.op == OpCodes.EQ:
+            write(inst, 3, 1 if read(inst, 1) == read(inst, 2) else 0)
+            ip += 4
+        elif inst.op == OpCodes.SET_REL_BASE:
+            rel_base += read(inst, 1)
+            ip += 2
+        elif inst.op in _SUPERINSTRUCTIONS:
+            # Execute the instructions in turn without decoding or dispatching
+            # each of them, the jump uses the result of the previous instruction
+            # rather than reading it back. Stop early if a write lands on the
+            # superinstruction, so the rest is decoded again.
+            start, end, steps = ip, inst.end, inst.instructions
+            val = OPERATIONS[steps[0].op](read(steps[0], 1), read(steps[0], 2))
+            addr = write(steps[0], 3, val)
+            ip += 4
+            if start <= addr < end:
+                continue
+            if inst.op == Pattern.ARITHMETIC_COMPARE_JUMP:
+                val = OPERATIONS[steps[1].op](read(steps[1], 1), read(steps[1], 2))
+                addr = write(steps[1], 3, val)
+                ip += 4
+                if start <= addr < end:
+                    continue
+            decode_cache.counters[start][0] += 1
+            jump = steps[-1]
+            if inst.op == Pattern.CALL:
+                ip = read(jump, 2)
+            elif inst.op == Pattern.ARITHMETIC_JUMP:
+                if bool(read(jump, 1)) == (jump.op == OpCodes.JUMP_IF_TRUE):
+                    ip = val
+                else:
+                    ip += 3
+            elif val == (jump.op == OpCodes.JUMP_IF_TRUE):
+                ip = read(jump, 2)
+            else:
+                ip += 3
+        else:
+            raise RuntimeError(f"Invalid opcode {inst.op}")
@@ -0,0 +1,295 @@
+"""
+Opt-in memoisation of Intcode subroutines.
+
+Pass a `Memoiser` to `execute` (or `execute_sync`/`execute_generator`) to run
+the program with the memoising interpreter. A call is a taken jump to a
+`SET_REL_BASE` instruction allocating a stack frame (adding a positive
+immediate, the subroutine's prologue), and it returns at the first taken
+indirect jump made with the caller's relative base restored. The
+memory cells each call reads before writing, and the cells it writes, are
+recorded. A later call to the same subroutine, when every cell it read holds the
+same value again, skips the call by writing its results and jumping straight to
+its return address::
+
+    memoiser = intcode.Memoiser()
+    intcode.execute_sync(mem, read_in, write_out, memoiser=memoiser)
+    print(memoiser.stats)
+
+Cells are identified relative to the relative base for relative mode accesses
+(the stack frame) and absolutely otherwise (globals, and the subroutine's own
+code), so calls at different stack depths can share results. Calls which do I/O,
+or access a cell through both kinds of address, are never memoised. Calls are
+nested, a call's reads and writes include those of the calls it makes.
+
+Memoisation only pays off for subroutines called repeatedly with the same
+arguments, e.g. naively recursive ones, as the memoising interpreter is slower
+than the other engines. Check `stats`.
+"""
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .compiled import _decode
+from .core import DebugCommands, ExecutionGenerator, Instruction, Mode, OpCodes
+from .memory import Memory
+
+# Whether a cell is relative to the call's relative base, and its address (or
+# offset from the relative base)
+Location = Tuple[bool, int]
+
+# Calls which read or write more cells than this are not memoised
+MAX_CELLS = 4096
+
+# `SET_REL_BASE` of an immediate, which allocates a stack frame if positive
+_ALLOCATE_FRAME = 100 * Mode.IMMEDIATE + OpCodes.SET_REL_BASE
+
+
+class MemoStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    # Calls which could not be memoised, e.g. as they did I/O
+    uncacheable: int
+    # Instructions not executed thanks to hits
+    instructions_saved: int
+
+
+class _Result(NamedTuple):
+    writes: Tuple[Tuple[Location, int], ...]
+    ip: int  # Return address
+    instructions: int
+    # Addresses of the absolute cells, and offsets of the relative cells, read or
+    # written by the call
+    absolute: FrozenSet[int]
+    relative: Tuple[int, ...]
+
+
+class _Call:
+    """Reads and writes of a call in progress, keyed by (absolute) address."""
+
+    __slots__ = ("entry", "rel_base", "reads", "writes", "instructions", "cacheable")
+
+    def __init__(self, entry: int, rel_base: int):
+        self.entry = entry
+        self.rel_base = rel_base
+        self.reads: Dict[int, Tuple[Location, int]] = {}
+        self.writes: Dict[int, Tuple[Location, int]] = {}
+        self.instructions = 0
+        self.cacheable = True
+
+    def read(self, addr: int, relative: bool, val: int):
+        loc = (relative, addr - self.rel_base if relative else addr)
+        seen = self.writes.get(addr) or self.reads.get(addr)
+        if seen is None:
+            self.reads[addr] = (loc, val)
+        elif seen[0] != loc:
+            self.cacheable = False
+
+    def write(self, addr: int, relative: bool, val: int):
+        loc = (relative, addr - self.rel_base if relative else addr)
+        seen = self.writes.get(addr) or self.reads.get(addr)
+        if seen is not None and seen[0] != loc:
+            self.cacheable = False
+        self.writes[addr] = (loc, val)
+
+    def merge(self, other: "_Call"):
+        """Records the reads and writes of `other`, a call made by this call."""
+        for addr, ((relative, _), val) in other.reads.items():
+            self.read(addr, relative, val)
+        for addr, ((relative, _), val) in other.writes.items():
+            self.write(addr, relative, val)
+        self.instructions += other.instructions
+        self.cacheable = self.cacheable and other.cacheable
+
+
+class Memoiser:
+    """Results of calls, keyed by subroutine and the values of the cells read.
+
+    Args:
+        maxsize: Maximum number of results, the least recently used result is
+            evicted when it's exceeded
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._results: "OrderedDict[tuple, _Result]" = OrderedDict()
+        # Locations read by the results of each subroutine, with the number of
+        # results which read them
+        self._reads: Dict[int, Dict[Tuple[Location, ...], int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        self.instructions_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def lookup(
+        self, mem: Memory, entry: int, rel_base: int
+    ) -> Optional[Tuple[Tuple[Tuple[Location, int], ...], _Result]]:
+        """The reads and result of a call to `entry` with the current memory.
+
+        A result isn't used if, at this relative base, one of its relative cells
+        is also one of its absolute cells: the call may then behave differently.
+        """
+        for locs in self._reads.get(entry, ()):
+            values = tuple(mem[rel_base + a if rel else a] for rel, a in locs)
+            result = self._results.get((entry, locs, values))
+            if result is not None and not any(
+                rel_base + a in result.absolute for a in result.relative
+            ):
+                self._results.move_to_end((entry, locs, values))
+                self.hits += 1
+                self.instructions_saved += result.instructions
+                return tuple(zip(locs, values)), result
+        self.misses += 1
+        return None
+
+    def store(self, call: _Call, ip: int):
+        if not call.cacheable or len(call.reads) + len(call.writes) > MAX_CELLS:
+            self.uncacheable += 1
+            return
+        reads = sorted(call.reads.values())
+        locs = tuple(loc for loc, _ in reads)
+        key = (call.entry, locs, tuple(val for _, val in reads))
+        if key not in self._results:
+            entry_reads = self._reads.setdefault(call.entry, {})
+            entry_reads[locs] = entry_reads.get(locs, 0) + 1
+        writes = tuple(call.writes.values())
+        cells = locs + tuple(loc for loc, _ in writes)
+        self._results[key] = _Result(
+            writes,
+            ip,
+            call.instructions,
+            frozenset(a for rel, a in cells if not rel),
+            tuple({a for rel, a in cells if rel}),
+        )
+        if len(self._results) > self.maxsize:
+            (entry, locs, _), _ = self._results.popitem(last=False)
+            self._reads[entry][locs] -= 1
+            if not self._reads[entry][locs]:
+                del self._reads[entry][locs]
+            self.evictions += 1
+
+    def clear(self):
+        self._results.clear()
+        self._reads.clear()
+
+    @property
+    def stats(self) -> MemoStats:
+        return MemoStats(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.uncacheable,
+            self.instructions_saved,
+        )
+
+
+def execute_memoised(
+    mem: Memory, memoiser: Memoiser, ip: int = 0, rel_base: int = 0
+) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`), memoising calls.
+
+    Engine for `execute_generator` (see it for argument details).
+    """
+    # Calls in progress, innermost last
+    calls: List[_Call] = []
+
+    def load(addr: int, relative: bool = False) -> int:
+        val = mem[addr]
+        if calls:
+            calls[-1].read(addr, relative, val)
+        return val
+
+    def operand(inst: Instruction, param: int) -> Tuple[int, bool]:
+        # Address of a parameter's operand, and whether it's relative
+        mode = inst.modes[param - 1]
+        if mode == Mode.IMMEDIATE:
+            return ip + param, False
+        val = load(ip + param)
+        if mode == Mode.POSITION:
+            return val, False
+        return rel_base + val, True
+
+    def read(inst: Instruction, param: int) -> int:
+        return load(*operand(inst, param))
+
+    def write(inst: Instruction, param: int, val: int):
+        addr, relative = operand(inst, param)
+        mem[addr] = val
+        if calls:
+            calls[-1].write(addr, relative, val)
+
+    while True:
+        assert ip >= 0
+
+        inst = _decode(load(ip))
+        op = inst.op
+        if calls:
+            calls[-1].instructions += 1
+
+        if op == OpCodes.STOP:
+            return
+        elif op == OpCodes.ADD:
+            write(inst, 3, read(inst, 1) + read(inst, 2))
+            ip += 4
+        elif op == OpCodes.MUL:
+            write(inst, 3, read(inst, 1) * read(inst, 2))
+            ip += 4
+        elif op == OpCodes.INPUT:
+            for call in calls:
+                call.cacheable = False
+            val = yield None
+            if val is DebugCommands.IMMEDIATE_EXIT:
+                # Return 'snapshot' of VM state for debugging
+                return mem, ip, rel_base
+            write(inst, 1, val)
+            ip += 2
+        elif op == OpCodes.OUTPUT:
+            for call in calls:
+                call.cacheable = False
+            yield read(inst, 1)
+            ip += 2
+        elif op == OpCodes.JUMP_IF_TRUE or op == OpCodes.JUMP_IF_FALSE:
+            if bool(read(inst, 1)) != (op == OpCodes.JUMP_IF_TRUE):
+                ip += 3
+                continue
+            ip = read(inst, 2)
+            if (
+                calls
+                and rel_base == calls[-1].rel_base
+                and inst.modes[1] != Mode.IMMEDIATE
+            ):
+                # Return
+                call = calls.pop()
+                memoiser.store(call, ip)
+                if calls:
+                    calls[-1].merge(call)
+            if mem[ip] == _ALLOCATE_FRAME and mem[ip + 1] > 0:
+                # Call
+                found = memoiser.lookup(mem, ip, rel_base)
+                if found is None:
+                    calls.append(_Call(ip, rel_base))
+                    continue
+                reads, result = found
+                for (relative, a), val in result.writes:
+                    mem[rel_base + a if relative else a] = val
+                if calls:
+                    for (relative, a), val in reads:
+                        calls[-1].read(rel_base + a if relative else a, relative, val)
+                    for (relative, a), val in result.writes:
+                        calls[-1].write(rel_base + a if relative else a, relative, val)
+                    calls[-1].instructions += result.instructions
+                ip = result.ip
+        elif op == OpCodes.LT:
+            write(inst, 3, 1 if read(inst, 1) < read(inst, 2) else 0)
+            ip += 4
+        elif op == OpCodes.EQ:
+            write(inst, 3, 1 if read(inst, 1) == read(inst, 2) else 0)
+            ip += 4
+        elif op == OpCodes.SET_REL_BASE:
+            rel_base += read(inst, 1)
+            ip += 2
+        else:
+            raise RuntimeError(f"Invalid opcode {op}")
@@ -0,0 +1,138 @@
+"""
+Intcode memory: `prg_to_memory` and the copy-on-write `PagedMemory`.
+"""
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterator, List, Sequence, Tuple, Union
+
+from .core import Program
+
+PAGE_BITS = 10
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# Writes more than this many pages past the end of the allocated pages go to the
+# sparse overflow instead of growing the pages to cover them
+MAX_PAGE_GROWTH = 64
+
+
+class PagedMemory:
+    """Intcode memory: a contiguous run of fixed size pages starting at address 0.
+
+    Pages are plain lists allocated on demand as writes reach higher addresses.
+    Writes far beyond the allocated pages (or to negative addresses) are stored
+    in a sparse overflow dict. Like a `defaultdict(int)`, reading an address
+    that has never been written to returns 0.
+
+    Copies are copy-on-write: a copy shares all of its pages with the original
+    and a page is only copied by whichever memory first writes to it. Copying
+    (e.g. to snapshot a VM) therefore costs about as much as the pages which are
+    subsequently written to. However, indexing is implemented in Python rather
+    than C so each read/write is slower than with a dict.
+
+    Shared pages need not be lists, any sequence of ints will do: memory loaded
+    by `load_snapshot` starts out with read-only views of a memory-mapped file.
+    """
+
+    __slots__ = ("_pages", "_owned", "_overflow")
+
+    def __init__(self, prg: Program = ()):
+        self._pages: List[Sequence[int]] = []
+        # Whether each page is private to this memory, i.e. safe to write to
+        self._owned: List[bool] = []
+        self._overflow: Dict[int, int] = {}
+        for start in range(0, len(prg), PAGE_SIZE):
+            page = list(prg[start : start + PAGE_SIZE])
+            page.extend([0] * (PAGE_SIZE - len(page)))
+            self._pages.append(page)
+            self._owned.append(True)
+
+    def __getitem__(self, addr: int) -> int:
+        if addr >= 0:
+            try:
+                return self._pages[addr >> PAGE_BITS][addr & PAGE_MASK]
+            except IndexError:
+                pass
+        return self._overflow.get(addr, 0)
+
+    def __setitem__(self, addr: int, val: int):
+        if addr >= 0:
+            page = addr >> PAGE_BITS
+            if page < len(self._pages):
+                if not self._owned[page]:
+                    self._pages[page] = list(self._pages[page])
+                    self._owned[page] = True
+                self._pages[page][addr & PAGE_MASK] = val
+                return
+            if page < len(self._pages) + MAX_PAGE_GROWTH:
+                self._grow(page + 1)
+                self._pages[page][addr & PAGE_MASK] = val
+                return
+        self._overflow[addr] = val
+
+    def __contains__(self, addr: object) -> bool:
+        """Whether `addr` is in the allocated pages or the overflow."""
+        if not isinstance(addr, int):
+            return False
+        if 0 <= addr < len(self._pages) * PAGE_SIZE:
+            return True
+        return addr in self._overflow
+
+    def __iter__(self) -> Iterator[int]:
+        """Addresses of the non-zero values in memory, as for `items`."""
+        return (addr for addr, _ in self.items())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PagedMemory):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def _grow(self, n_pages: int):
+        start = len(self._pages) * PAGE_SIZE
+        new_pages = n_pages - len(self._pages)
+        self._pages.extend([0] * PAGE_SIZE for _ in range(new_pages))
+        self._owned.extend([True] * new_pages)
+        end = len(self._pages) * PAGE_SIZE
+        # Move any overflow values which are now covered by pages
+        for addr in [a for a in self._overflow if start <= a < end]:
+            self._pages[addr >> PAGE_BITS][addr & PAGE_MASK] = self._overflow.pop(addr)
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        """Non-zero values in memory as `(address, value)` pairs."""
+        for i, page in enumerate(self._pages):
+            base = i << PAGE_BITS
+            yield from ((base + j, val) for j, val in enumerate(page) if val)
+        yield from ((addr, val) for addr, val in self._overflow.items() if val)
+
+    @property
+    def shared_pages(self) -> int:
+        """Number of pages which will be copied by the next write to them."""
+        return self._owned.count(False)
+
+    def copy(self) -> "PagedMemory":
+        mem = PagedMemory.__new__(PagedMemory)
+        mem._pages = self._pages[:]
+        # Pages are now shared, neither memory can write to them without copying
+        self._owned = [False] * len(self._pages)
+        mem._owned = self._owned[:]
+        mem._overflow = self._overflow.copy()
+        return mem
+
+
+Memory = Union[DefaultDict[int, int], PagedMemory]
+
+
+def prg_to_memory(prg: Program, paged: bool = False) -> Memory:
+    """Loads `prg` into a new `Memory`.
+
+    Args:
+        prg: Intcode program
+        paged: Use `PagedMemory` instead of a `defaultdict`. Copying paged memory
+            is much cheaper (copy-on-write) but reading/writing it is slower, see
+            `benchmarks.py` (default False)
+    """
+    if paged:
+        return PagedMemory(prg)
+    return defaultdict(int, enumerate(prg))
@@ -0,0 +1,156 @@
+"""
+Fork-server style pool of worker processes for exploring from a VM snapshot.
+
+Every worker loads the same snapshot once, when it starts. Jobs then restore
+(copy) the worker's snapshot and run it with the job's inputs, so the snapshot
+is neither re-sent nor re-created for each job::
+
+    with intcode.SnapshotPool(snapshot) as pool:
+        for i, outputs in pool.imap_unordered(jobs):
+            ...
+        i, outputs = pool.first(jobs, lambda outputs: 42 in outputs)
+"""
+import os
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .core import DebugCommands
+from .interpreter import execute_sync
+from .snapshot import load_snapshot, save_snapshot
+from .vm import VMSnapshot
+
+# The snapshot of this worker process, see `_init_worker`
+_snapshot: Optional[VMSnapshot] = None
+
+
+def run_snapshot(snapshot: VMSnapshot, inputs: Iterable[int], **kwargs) -> List[int]:
+    """Runs a copy of `snapshot` until it stops or needs more than `inputs`.
+
+    The snapshot's pending inputs are read before `inputs`.
+
+    Args:
+        snapshot: VM state to start from, left unchanged
+        inputs: Inputs to the program
+        kwargs: Passed to `execute_sync`, e.g. `engine`
+    Returns:
+        The program's outputs
+    """
+    remaining = chain(snapshot.inputs, inputs)
+    outputs: List[int] = []
+    execute_sync(
+        snapshot.mem.copy(),
+        lambda: next(remaining, DebugCommands.IMMEDIATE_EXIT),
+        outputs.append,
+        snapshot.ip,
+        snapshot.rel_base,
+        **kwargs,
+    )
+    return outputs
+
+
+def _init_worker(path: str):
+    global _snapshot
+    _snapshot = load_snapshot(path)
+
+
+def _run_job(inputs: Sequence[int], kwargs: Dict[str, Any]) -> List[int]:
+    return run_snapshot(_snapshot, inputs, **kwargs)
+
+
+class SnapshotPool:
+    """Pool of worker processes which run jobs starting from the same snapshot.
+
+    Args:
+        snapshot: `VMSnapshot` (saved to a temporary file for the workers to load)
+            or the path of a snapshot saved by `save_snapshot`
+        processes: Number of worker processes (default: number of CPUs)
+        kwargs: Passed to `execute_sync` for every job, e.g. `engine`. They are
+            pickled, so each worker has its own copy (of a `Fusion`, say).
+    """
+
+    def __init__(
+        self,
+        snapshot: Union[VMSnapshot, str],
+        processes: Optional[int] = None,
+        **kwargs,
+    ):
+        self._tmp_path: Optional[str] = None
+        if isinstance(snapshot, str):
+            path = snapshot
+        else:
+            fd, path = tempfile.mkstemp(suffix=".icvm")
+            os.close(fd)
+            save_snapshot(snapshot, path)
+            self._tmp_path = path
+        self._kwargs = kwargs
+        self._executor = ProcessPoolExecutor(
+            processes, initializer=_init_worker, initargs=(path,)
+        )
+        self.completed = 0
+        # Jobs cancelled before they started, see `first`
+        self.cancelled = 0
+
+    def submit(self, inputs: Sequence[int]) -> "Future[List[int]]":
+        """Runs a single job (see `run_snapshot`), returning its future outputs."""
+        return self._executor.submit(_run_job, list(inputs), self._kwargs)
+
+    def imap_unordered(
+        self, jobs: Iterable[Sequence[int]]
+    ) -> Iterator[Tuple[int, List[int]]]:
+        """Runs every job, yielding `(index, outputs)` as each job completes.
+
+        Jobs which haven't started yet are cancelled if the iterator is closed
+        before it is exhausted.
+        """
+        futures = {self.submit(inputs): i for i, inputs in enumerate(jobs)}
+        try:
+            for future in as_completed(futures):
+                self.completed += 1
+                yield futures[future], future.result()
+        finally:
+            self.cancelled += sum(future.cancel() for future in futures)
+
+    def first(
+        self, jobs: Iterable[Sequence[int]], predicate: Callable[[List[int]], bool]
+    ) -> Optional[Tuple[int, List[int]]]:
+        """The first job to complete whose outputs satisfy `predicate`.
+
+        The remaining jobs are cancelled as soon as one is found (jobs which are
+        already running are left to finish, their results are discarded).
+
+        Returns:
+            `(index, outputs)` of the job, `None` if no job satisfies `predicate`
+        """
+        results = self.imap_unordered(jobs)
+        try:
+            for i, outputs in results:
+                if predicate(outputs):
+                    return i, outputs
+            return None
+        finally:
+            results.close()
+
+    def close(self):
+        self._executor.shutdown()
+        if self._tmp_path is not None:
+            os.remove(self._tmp_path)
+            self._tmp_path = None
+
+    def __enter__(self) -> "SnapshotPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,248 @@
+"""
+Opt-in profiling of Intcode programs.
+
+Pass a `Profiler` to `execute` (or `execute_sync`/`execute_generator`) to run the
+program with the profiling interpreter, which counts executions per opcode,
+address, basic block and jump, and times every wait for I/O::
+
+    profiler = intcode.Profiler()
+    intcode.execute_sync(mem, read_in, write_out, profiler=profiler)
+    print(profiler.summary())
+    profiler.dump("profile.json")
+
+Runs without a profiler are unaffected, the profiling interpreter is separate
+from the other engines. A profiler can be used for several runs (e.g. every run
+of a search), the counts and timings are accumulated across them.
+"""
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+from .compiled import _decode, _param_address, _step, _write_address
+from .core import DebugCommands, ExecutionGenerator, Mode, OpCodes
+from .memory import Memory
+
+# Number of parameters of each instruction
+PARAMETERS = {
+    OpCodes.ADD: 3,
+    OpCodes.MUL: 3,
+    OpCodes.INPUT: 1,
+    OpCodes.OUTPUT: 1,
+    OpCodes.JUMP_IF_TRUE: 2,
+    OpCodes.JUMP_IF_FALSE: 2,
+    OpCodes.LT: 3,
+    OpCodes.EQ: 3,
+    OpCodes.SET_REL_BASE: 1,
+    OpCodes.STOP: 0,
+}
+
+# Instructions which end a basic block
+BLOCK_ENDS = {
+    OpCodes.INPUT,
+    OpCodes.OUTPUT,
+    OpCodes.JUMP_IF_TRUE,
+    OpCodes.JUMP_IF_FALSE,
+}
+
+
+class IOWait(NamedTuple):
+    op: OpCodes  # `OpCodes.INPUT` or `OpCodes.OUTPUT`
+    # Instructions executed (in total, across runs) before the wait
+    instruction: int
+    # Seconds since the profiler was created
+    start: float
+    duration: float
+
+
+class Block(NamedTuple):
+    start: int
+    end: int  # Exclusive
+    executions: int
+    instructions: int
+
+
+class Loop(NamedTuple):
+    """Addresses from a backwards jump's target up to (and including) the jump."""
+
+    start: int
+    end: int  # Exclusive
+    iterations: int
+    instructions: int
+
+
+class Profiler:
+    def __init__(self):
+        self.opcodes: Counter = Counter()
+        self.addresses: Counter = Counter()
+        # Opcode of the instruction last executed at each address
+        self.ops: Dict[int, int] = {}
+        # Taken jumps, keyed by (jump address, target address)
+        self.jumps: Counter = Counter()
+        # Addresses of jumps whose target is read from memory, e.g. returns
+        self.indirect_jumps: Set[int] = set()
+        # Addresses at which execution was (re)started
+        self.entries: Counter = Counter()
+        self.io_waits: List[IOWait] = []
+        self.runs = 0
+        self.elapsed = 0.0
+        self._created = time.perf_counter()
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.opcodes.values())
+
+    def blocks(self) -> List[Block]:
+        """Basic blocks executed, hottest (most instructions executed) first.
+
+        Blocks are found from the execution counts: a block starts at an entry
+        point, a jump target or the instruction following a jump or I/O, and
+        continues through consecutively executed instructions.
+        """
+        leaders = set(self.entries) | {target for _, target in self.jumps}
+        blocks = []
+        start = end = None
+        executions = instructions = 0
+        for addr in sorted(self.addresses):
+            if addr != end or addr in leaders:
+                if start is not None:
+                    blocks.append(Block(start, end, executions, instructions))
+                start, executions, instructions = addr, self.addresses[addr], 0
+            instructions += self.addresses[addr]
+            end = addr + self._length(addr)
+            if self.ops[addr] in BLOCK_ENDS:
+                leaders.add(end)
+        if start is not None:
+            blocks.append(Block(start, end, executions, instructions))
+        return sorted(blocks, key=lambda b: b.instructions, reverse=True)
+
+    def loops(self) -> List[Loop]:
+        """Loops (taken backwards jumps to a fixed target), hottest first.
+
+        Indirect jumps are excluded as backwards indirect jumps are usually
+        returns from subroutines, rather than loops.
+        """
+        loops: Dict[Tuple[int, int], int] = Counter()
+        for (src, target), count in self.jumps.items():
+            if target <= src and src not in self.indirect_jumps:
+                loops[(target, src + self._length(src))] += count
+        return sorted(
+            (
+                Loop(start, end, iterations, self._instructions_in(start, end))
+                for (start, end), iterations in loops.items()
+            ),
+            key=lambda loop: loop.instructions,
+            reverse=True,
+        )
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """Machine readable (JSON serialisable) report, see `dump`."""
+        io: Dict[str, Dict[str, float]] = {}
+        for op in (OpCodes.INPUT, OpCodes.OUTPUT):
+            waits = [w.duration for w in self.io_waits if w.op == op]
+            io[op.name.lower()] = {
+                "count": len(waits),
+                "total": sum(waits),
+                "max": max(waits, default=0.0),
+            }
+        return {
+            "runs": self.runs,
+            "elapsed": self.elapsed,
+            "instructions": self.instructions,
+            "opcodes": {OpCodes(op).name: n for op, n in self.opcodes.most_common()},
+            "io_waits": io,
+            "blocks": [b._asdict() for b in self.blocks()[:top]],
+            "loops": [loop._asdict() for loop in self.loops()[:top]],
+            "addresses": {str(a): n for a, n in sorted(self.addresses.items())},
+        }
+
+    def dump(self, path: str, top: int = 10):
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+
+    def summary(self, top: int = 10) -> str:
+        """Human readable report of the hottest blocks and loops."""
+        total = self.instructions or 1
+        io_wait = sum(w.duration for w in self.io_waits)
+        lines = [
+            f"{self.instructions} instructions in {self.runs} run(s), "
+            f"{self.elapsed:.3f}s ({io_wait:.3f}s waiting for I/O)",
+            "Opcodes: "
+            + ", ".join(
+                f"{OpCodes(op).name} {n / total:.1%}"
+                for op, n in self.opcodes.most_common()
+            ),
+            "Hottest blocks:",
+        ]
+        lines += [
+            f"  {b.start:>6}-{b.end:<6} {b.instructions / total:>6.1%}"
+            f"  ({b.executions} executions)"
+            for b in self.blocks()[:top]
+        ]
+        lines.append("Hottest loops:")
+        lines += [
+            f"  {loop.start:>6}-{loop.end:<6} {loop.instructions / total:>6.1%}"
+            f"  ({loop.iterations} iterations)"
+            for loop in self.loops()[:top]
+        ]
+        return "\n".join(lines)
+
+    def _length(self, addr: int) -> int:
+        return PARAMETERS.get(self.ops[addr], 0) + 1
+
+    def _instructions_in(self, start: int, end: int) -> int:
+        return sum(n for a, n in self.addresses.items() if start <= a < end)
+
+
+def execute_profiled(
+    mem: Memory, profiler: Profiler, ip: int = 0, rel_base: int = 0
+) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`), recording a profile.
+
+    Engine for `execute_generator` (see it for argument details).
+    """
+    opcodes, addresses, jumps = profiler.opcodes, profiler.addresses, profiler.jumps
+    ops, io_waits = profiler.ops, profiler.io_waits
+    profiler.runs += 1
+    profiler.entries[ip] += 1
+    started = time.perf_counter()
+    try:
+        while True:
+            inst = _decode(mem[ip])
+            op = inst.op
+            opcodes[op] += 1
+            addresses[ip] += 1
+            ops[ip] = op
+
+            if op == OpCodes.STOP:
+                return
+            elif op == OpCodes.INPUT or op == OpCodes.OUTPUT:
+                wait_start = time.perf_counter()
+                if op == OpCodes.INPUT:
+                    val = yield None
+                else:
+                    yield mem[_param_address(mem, inst, ip, rel_base, 1)]
+                wait_end = time.perf_counter()
+                io_waits.append(
+                    IOWait(
+                        OpCodes(op),
+                        sum(opcodes.values()),
+                        wait_start - profiler._created,
+                        wait_end - wait_start,
+                    )
+                )
+                if op == OpCodes.INPUT:
+                    if val is DebugCommands.IMMEDIATE_EXIT:
+                        # Return 'snapshot' of VM state for debugging
+                        return mem, ip, rel_base
+                    mem[_write_address(mem, inst, ip, rel_base, 1)] = val
+                ip += 2
+            else:
+                next_ip, rel_base, _ = _step(mem, inst, ip, rel_base)
+                if next_ip != ip + PARAMETERS[op] + 1:
+                    jumps[(ip, next_ip)] += 1
+                    if inst.modes[1] != Mode.IMMEDIATE:
+                        profiler.indirect_jumps.add(ip)
+                ip = next_ip
+    finally:
+        profiler.elapsed += time.perf_counter() - started
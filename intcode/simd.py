@@ -0,0 +1,167 @@
+"""
+Lock-step 'SIMD' Intcode engine for batches of independent runs, using NumPy.
+
+Every run (lane) has a row in a 2-D memory array. Each step, the lanes with the
+lowest instruction pointer execute their instruction together as a single NumPy
+operation. Lanes which take different branches are therefore split into
+separate groups, and lanes behind the others catch up (and are grouped again)
+when they reach the same instruction.
+
+Note: Memory is `int64`, values which overflow it wrap around silently.
+"""
+from typing import Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+
+from .core import Mode, OpCodes, Program, parse_instruction
+
+# Extra memory allocated for each lane beyond the end of the program
+MEMORY_HEADROOM = 1024
+
+
+class LaneStats(NamedTuple):
+    lanes: int
+    # Number of (vectorised) instructions executed
+    dispatches: int
+    # Number of instructions executed summed across all lanes
+    lane_steps: int
+
+    @property
+    def utilisation(self) -> float:
+        """Mean fraction of lanes executing each dispatch.
+
+        Each dispatch costs a roughly fixed amount of NumPy overhead, so below a
+        certain utilisation (depending on the number of lanes) this engine is
+        slower than running each lane with a scalar engine.
+        """
+        if not self.dispatches:
+            return 0.0
+        return self.lane_steps / (self.dispatches * self.lanes)
+
+
+class LockstepVM:
+    def __init__(self, prg: Program, inputs: Iterable[Sequence[int]]):
+        inputs = [list(i) for i in inputs]
+        self.n_lanes = n = len(inputs)
+
+        self.mem = np.zeros((n, len(prg) + MEMORY_HEADROOM), dtype=np.int64)
+        self.mem[:, : len(prg)] = prg
+        self.ip = np.zeros(n, dtype=np.int64)
+        self.rel_base = np.zeros(n, dtype=np.int64)
+        self.running = np.ones(n, dtype=bool)
+
+        self.inputs = np.zeros((n, max(map(len, inputs), default=0)), dtype=np.int64)
+        for lane, lane_inputs in enumerate(inputs):
+            self.inputs[lane, : len(lane_inputs)] = lane_inputs
+        self.input_len = np.array([len(i) for i in inputs], dtype=np.int64)
+        self.input_pos = np.zeros(n, dtype=np.int64)
+        self.outputs: List[List[int]] = [[] for _ in range(n)]
+
+        self.dispatches = 0
+        self.lane_steps = 0
+
+    @property
+    def stats(self) -> LaneStats:
+        return LaneStats(self.n_lanes, self.dispatches, self.lane_steps)
+
+    def run(self) -> List[List[int]]:
+        """Runs every lane to completion.
+
+        Returns:
+            Outputs of each lane, in lane order
+        """
+        while self.running.any():
+            lanes = np.flatnonzero(self.running)
+            ips = self.ip[lanes]
+            ip = int(ips.min())
+            lanes = lanes[ips == ip]
+            self._ensure_size(np.array([ip + 3]))
+            codes = self.mem[lanes, ip]
+            if codes.min() == codes.max():
+                self._execute(lanes, ip, int(codes[0]))
+            else:
+                # Self-modified code, lanes have different instructions at `ip`
+                for code in np.unique(codes):
+                    self._execute(lanes[codes == code], ip, int(code))
+        return self.outputs
+
+    def _ensure_size(self, addrs: np.ndarray):
+        if not len(addrs):
+            return
+        if addrs.min() < 0:
+            raise RuntimeError("Negative addresses are not supported")
+        size = self.mem.shape[1]
+        if addrs.max() >= size:
+            while size <= addrs.max():
+                size *= 2
+            grown = np.zeros((self.n_lanes, size), dtype=np.int64)
+            grown[:, : self.mem.shape[1]] = self.mem
+            self.mem = grown
+
+    def _execute(self, lanes: np.ndarray, ip: int, code: int):
+        inst = parse_instruction(code)
+        op = inst.op
+        self.dispatches += 1
+        self.lane_steps += len(lanes)
+
+        def address(lanes: np.ndarray, param: int) -> np.ndarray:
+            mode = inst.modes[param - 1]
+            if mode == Mode.IMMEDIATE:
+                return np.full(len(lanes), ip + param, dtype=np.int64)
+            addrs = self.mem[lanes, ip + param]
+            if mode == Mode.RELATIVE:
+                addrs = addrs + self.rel_base[lanes]
+            self._ensure_size(addrs)
+            return addrs
+
+        def read(param: int, lanes: np.ndarray = lanes) -> np.ndarray:
+            addrs = address(lanes, param)  # May grow (replace) `self.mem`
+            return self.mem[lanes, addrs]
+
+        def write(param: int, vals: np.ndarray):
+            if inst.modes[param - 1] not in (Mode.POSITION, Mode.RELATIVE):
+                raise KeyError(inst.modes[param - 1])
+            addrs = address(lanes, param)
+            self.mem[lanes, addrs] = vals
+
+        if op == OpCodes.STOP:
+            self.running[lanes] = False
+        elif op == OpCodes.ADD:
+            write(3, read(1) + read(2))
+            self.ip[lanes] += 4
+        elif op == OpCodes.MUL:
+            write(3, read(1) * read(2))
+            self.ip[lanes] += 4
+        elif op == OpCodes.LT:
+            write(3, (read(1) < read(2)).astype(np.int64))
+            self.ip[lanes] += 4
+        elif op == OpCodes.EQ:
+            write(3, (read(1) == read(2)).astype(np.int64))
+            self.ip[lanes] += 4
+        elif op == OpCodes.INPUT:
+            pos = self.input_pos[lanes]
+            if (pos >= self.input_len[lanes]).any():
+                raise RuntimeError("Program requires more input than provided")
+            write(1, self.inputs[lanes, pos])
+            self.input_pos[lanes] += 1
+            self.ip[lanes] += 2
+        elif op == OpCodes.OUTPUT:
+            for lane, val in zip(lanes, read(1)):
+                self.outputs[lane].append(int(val))
+            self.ip[lanes] += 2
+        elif op in (OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE):
+            jump = read(1) != 0
+            if op == OpCodes.JUMP_IF_FALSE:
+                jump = ~jump
+            self.ip[lanes[~jump]] += 3
+            self.ip[lanes[jump]] = read(2, lanes[jump])
+        elif op == OpCodes.SET_REL_BASE:
+            self.rel_base[lanes] += read(1)
+            self.ip[lanes] += 2
+        else:
+            raise RuntimeError(f"Invalid opcode {op}")
+
+
+def run_batch(prg: Program, inputs: Iterable[Sequence[int]]) -> List[List[int]]:
+    """Lock-step equivalent of `intcode.run_batch`."""
+    return LockstepVM(prg, inputs).run()
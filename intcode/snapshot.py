@@ -0,0 +1,207 @@
+"""
+Persistent VM snapshots: a compact, versioned and checksummed binary format for
+`VMSnapshot`s, which is memory-mapped when loaded.
+
+Format (little-endian):
+
+- Header (`HEADER`): magic, format version, page size (as bits), `ip`,
+  `rel_base`, status and the counts of each of the following sections, followed
+  by a CRC32 of the rest of the header and the whole body
+- Pages: memory from address 0 up, as 64-bit signed integers
+- Extra cells: `(address, value)` pairs for the cells not in the pages, i.e.
+  `PagedMemory` overflow and values too big for 64 bits (stored as 0 in pages)
+- Pending inputs, then pending outputs
+
+Every integer outside of the header and pages is stored as its length in bytes
+(a `uint16`) followed by its signed little-endian bytes, as Intcode values are
+unbounded.
+
+Loading a snapshot maps the file into memory and returns a `PagedMemory` whose
+pages are read-only views of the mapping, shared copy-on-write like the pages of
+a copied memory. Restoring a checkpoint therefore costs about as much as the
+pages which are subsequently written to, plus the checksum (`verify=False` to
+skip it for trusted files).
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import List, Tuple
+
+from .memory import PAGE_BITS, PAGE_SIZE, Memory, PagedMemory
+from .vm import Status, VMSnapshot
+
+MAGIC = b"ICVM"
+VERSION = 1
+
+# magic, version, page bits, ip, rel_base, status, pages, extra cells, inputs,
+# outputs, checksum
+HEADER = struct.Struct("<4sHHqqB3xIIIII")
+_CHECKSUM_SIZE = struct.calcsize("<I")
+
+_INT_LENGTH = struct.Struct("<H")
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+class SnapshotError(ValueError):
+    """The file is not a (valid) snapshot in a format this version can load."""
+
+
+def _pack_int(val: int) -> bytes:
+    length = (val + (val < 0)).bit_length() // 8 + 1
+    return _INT_LENGTH.pack(length) + val.to_bytes(length, "little", signed=True)
+
+
+def _unpack_ints(buf: memoryview, offset: int, n: int) -> Tuple[List[int], int]:
+    """`n` ints packed by `_pack_int` from `offset`, and the offset following them."""
+    vals = []
+    for _ in range(n):
+        (length,) = _INT_LENGTH.unpack_from(buf, offset)
+        offset += _INT_LENGTH.size
+        vals.append(
+            int.from_bytes(buf[offset : offset + length], "little", signed=True)
+        )
+        offset += length
+    return vals, offset
+
+
+def _as_paged(mem: Memory) -> PagedMemory:
+    if isinstance(mem, PagedMemory):
+        return mem
+    paged = PagedMemory()
+    for addr, val in sorted(mem.items()):
+        if val:
+            paged[addr] = val
+    return paged
+
+
+def dump_snapshot(snapshot: VMSnapshot) -> bytes:
+    """Serialises `snapshot` (see the module docstring for the format)."""
+    mem = _as_paged(snapshot.mem)
+    pages = bytearray()
+    extra: List[Tuple[int, int]] = []
+    for i, page in enumerate(mem._pages):
+        cells = list(page)
+        for j, val in enumerate(cells):
+            if not _INT64_MIN <= val <= _INT64_MAX:
+                extra.append(((i << PAGE_BITS) + j, val))
+                cells[j] = 0
+        pages += struct.pack(f"<{PAGE_SIZE}q", *cells)
+    extra += [(addr, val) for addr, val in mem._overflow.items() if val]
+
+    body = pages + b"".join(
+        _pack_int(x)
+        for x in (
+            *(x for cell in extra for x in cell),
+            *snapshot.inputs,
+            *snapshot.outputs,
+        )
+    )
+    fields = (
+        MAGIC,
+        VERSION,
+        PAGE_BITS,
+        snapshot.ip,
+        snapshot.rel_base,
+        snapshot.status.value,
+        len(mem._pages),
+        len(extra),
+        len(snapshot.inputs),
+        len(snapshot.outputs),
+    )
+    header = HEADER.pack(*fields, 0)[:-_CHECKSUM_SIZE]
+    checksum = zlib.crc32(body, zlib.crc32(header))
+    return header + struct.pack("<I", checksum) + body
+
+
+def save_snapshot(snapshot: VMSnapshot, path: str):
+    """Saves `snapshot` to `path`, atomically so it's never left half written."""
+    data = dump_snapshot(snapshot)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".icvm"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_snapshot(path: str, verify: bool = True) -> VMSnapshot:
+    """Loads a snapshot saved by `save_snapshot`, memory-mapping the file.
+
+    Args:
+        path: Snapshot file
+        verify: Check the checksum, which reads the whole file (default True)
+
+    Raises:
+        SnapshotError: If the file isn't a snapshot, is of an unsupported version
+            or (with `verify`) is corrupt.
+    """
+    with open(path, "rb") as f:
+        try:
+            buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:  # Empty file
+            raise SnapshotError(f"{path} is not an Intcode snapshot")
+    if len(buf) < HEADER.size or bytes(buf[: len(MAGIC)]) != MAGIC:
+        raise SnapshotError(f"{path} is not an Intcode snapshot")
+    (
+        _,
+        version,
+        page_bits,
+        ip,
+        rel_base,
+        status,
+        n_pages,
+        n_extra,
+        n_inputs,
+        n_outputs,
+        checksum,
+    ) = HEADER.unpack_from(buf)
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version} in {path}")
+    if verify:
+        crc = zlib.crc32(buf[: HEADER.size - _CHECKSUM_SIZE])
+        if zlib.crc32(buf[HEADER.size :], crc) != checksum:
+            raise SnapshotError(f"Checksum mismatch in {path}")
+
+    page_size = 1 << page_bits
+    pages_end = HEADER.size + n_pages * page_size * 8
+    try:
+        if len(buf) < pages_end:
+            raise ValueError
+        extra, offset = _unpack_ints(buf, pages_end, 2 * n_extra)
+        inputs, offset = _unpack_ints(buf, offset, n_inputs)
+        outputs, offset = _unpack_ints(buf, offset, n_outputs)
+        if offset > len(buf):
+            raise ValueError
+    except (struct.error, ValueError):
+        raise SnapshotError(f"{path} is truncated")
+    try:
+        status = Status(status)
+    except ValueError:
+        raise SnapshotError(f"Invalid status {status} in {path}")
+
+    cells = buf[HEADER.size : pages_end].cast("q")
+    if sys.byteorder != "little":
+        cells = array("q", cells.tobytes())
+        cells.byteswap()
+    pages = [cells[i * page_size : (i + 1) * page_size] for i in range(n_pages)]
+    mem = PagedMemory()
+    if page_bits == PAGE_BITS:
+        mem._pages = pages
+        mem._owned = [False] * n_pages
+    else:
+        for i, page in enumerate(pages):
+            for j, val in enumerate(page):
+                if val:
+                    mem[(i << page_bits) + j] = val
+    for addr, val in zip(extra[::2], extra[1::2]):
+        mem[addr] = val
+
+    return VMSnapshot(mem, ip, rel_base, status, tuple(inputs), tuple(outputs))
@@ -0,0 +1,138 @@
+"""
+Partial evaluation of Intcode programs for a known prefix of their inputs.
+
+Running a program on a known prefix of its inputs, up to the first instruction
+which needs an input beyond the prefix, only depends on the program and the
+prefix. `specialise` evaluates that part of the run ahead of time, leaving a
+residual program: a `VMSnapshot` waiting on that input, along with the outputs
+produced before it. `SpecialisationCache` caches residual programs by program
+and prefix, so runs sharing a preamble only execute it once::
+
+    cache = intcode.SpecialisationCache()
+    outputs = cache.run(prg, springscript)
+"""
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from .core import DebugCommands, Program, program_digest
+from .interpreter import execute_generator
+from .memory import prg_to_memory
+from .pool import run_snapshot
+from .vm import Status, VMSnapshot
+
+
+def specialise(snapshot: VMSnapshot, inputs: Iterable[int], **kwargs) -> VMSnapshot:
+    """Runs a copy of `snapshot` until it halts or needs more than `inputs`.
+
+    Args:
+        snapshot: VM state to start from, left unchanged. Its pending inputs are
+            read before `inputs`
+        inputs: Known inputs to the program
+        kwargs: Passed to `execute_generator`, e.g. `engine`
+    Returns:
+        The residual program: a snapshot with status `INTERRUPTED` at the first
+        instruction reading an input beyond `inputs`, or `COMPLETE` (`ip` is then
+        meaningless) if the program halted. Its pending outputs are those of
+        `snapshot` followed by every output produced.
+    """
+    if snapshot.status is Status.COMPLETE:
+        return snapshot
+    mem = snapshot.mem.copy()
+    remaining = chain(snapshot.inputs, inputs)
+    outputs = list(snapshot.outputs)
+    vm = execute_generator(mem, snapshot.ip, snapshot.rel_base, **kwargs)
+    val = None
+    while True:
+        try:
+            out = vm.send(val)
+        except StopIteration as stop:
+            if stop.value is None:
+                return VMSnapshot(mem, 0, 0, Status.COMPLETE, (), tuple(outputs))
+            _, ip, rel_base = stop.value
+            return VMSnapshot(mem, ip, rel_base, Status.INTERRUPTED, (), tuple(outputs))
+        if out is None:
+            val = next(remaining, DebugCommands.IMMEDIATE_EXIT)
+        else:
+            val = None
+            outputs.append(out)
+
+
+class SpecialisationCacheStats(NamedTuple):
+    hits: int
+    # Lookups resumed from the residual program of a shorter prefix
+    partial_hits: int
+    misses: int
+
+
+class SpecialisationCache:
+    """Residual programs (see `specialise`), keyed by program and input prefix.
+
+    A prefix which isn't cached is specialised from the residual program of its
+    longest cached prefix (a partial hit). The program's start up, up to its
+    first input, is cached the first time the program is seen (a miss) so is
+    shared by every prefix. Entries are never evicted.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[Tuple[str, Tuple[int, ...]], VMSnapshot] = {}
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+
+    def _lookup(self, prg: Program, prefix: Sequence[int], **kwargs) -> VMSnapshot:
+        digest = program_digest(prg)
+        prefix = tuple(prefix)
+        snapshots = self._snapshots
+        if (digest, ()) not in snapshots:
+            self.misses += 1
+            start = VMSnapshot(prg_to_memory(prg), 0, 0)
+            snapshots[digest, ()] = specialise(start, (), **kwargs)
+        elif (digest, prefix) in snapshots:
+            self.hits += 1
+            return snapshots[digest, prefix]
+        else:
+            self.partial_hits += 1
+        n = next(
+            n for n in range(len(prefix), -1, -1) if (digest, prefix[:n]) in snapshots
+        )
+        if n < len(prefix):
+            snapshots[digest, prefix] = specialise(
+                snapshots[digest, prefix[:n]], prefix[n:], **kwargs
+            )
+        return snapshots[digest, prefix]
+
+    def specialise(self, prg: Program, prefix: Sequence[int], **kwargs) -> VMSnapshot:
+        """`prg`'s residual program for `prefix`, see `specialise`.
+
+        The snapshot is a copy, so can be run (or modified) by the caller.
+        """
+        snapshot = self._lookup(prg, prefix, **kwargs)
+        return snapshot._replace(mem=snapshot.mem.copy())
+
+    def run(
+        self,
+        prg: Program,
+        prefix: Sequence[int],
+        inputs: Iterable[int] = (),
+        **kwargs,
+    ) -> List[int]:
+        """Runs `prg` with `prefix` then `inputs` from `prefix`'s residual program.
+
+        Like `run_snapshot`, the program is stopped if it needs more inputs.
+
+        Args:
+            kwargs: Passed to `execute_generator`, e.g. `engine`
+        Returns:
+            The program's outputs
+        """
+        snapshot = self._lookup(prg, prefix, **kwargs)
+        outputs = list(snapshot.outputs)
+        if snapshot.status is not Status.COMPLETE:
+            outputs.extend(
+                run_snapshot(snapshot._replace(outputs=()), inputs, **kwargs)
+            )
+        return outputs
+
+    @property
+    def stats(self) -> SpecialisationCacheStats:
+        return SpecialisationCacheStats(self.hits, self.partial_hits, self.misses)
@@ -0,0 +1,190 @@
+"""
+Conformance tests run against every engine: examples from the puzzle
+descriptions and day tests, plus the day 05 and day 09 puzzle inputs.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pytest
+
+import intcode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class RunResult(NamedTuple):
+    outputs: List[int]
+    # `None` for engines which don't expose memory
+    mem: Optional[intcode.Memory]
+
+
+def run_execute(
+    engine: intcode.Engine, fused: bool = False, memoised: bool = False
+) -> Callable:
+    def runner(prg: intcode.Program, inputs: List[int]) -> RunResult:
+        mem = intcode.prg_to_memory(prg)
+        inputs = inputs[:]
+        outputs: List[int] = []
+
+        async def read_in():
+            return inputs.pop(0)
+
+        async def write_out(val: int):
+            outputs.append(val)
+
+        fusion = intcode.Fusion() if fused else None
+        memoiser = intcode.Memoiser() if memoised else None
+        asyncio.run(
+            intcode.execute(
+                mem,
+                read_in,
+                write_out,
+                engine=engine,
+                fusion=fusion,
+                memoiser=memoiser,
+            )
+        )
+        return RunResult(outputs, mem)
+
+    return runner
+
+
+def run_execute_sync(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    mem = intcode.prg_to_memory(prg)
+    outputs: List[int] = []
+    intcode.execute_sync(mem, iter(inputs).__next__, outputs.append)
+    return RunResult(outputs, mem)
+
+
+def run_vm(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    vm = intcode.IntCodeVM(prg)
+    remaining = iter(inputs)
+    vm.input_val = next(remaining, None)
+    outputs: List[int] = []
+    while vm.status != intcode.Status.COMPLETE:
+        vm.execute_until_complete_or_io()
+        if vm.status == intcode.Status.HALTED_ON_INPUT:
+            vm.input_val = next(remaining, None)
+        elif vm.status == intcode.Status.HALTED_ON_OUTPUT:
+            outputs.append(vm.output)
+    return RunResult(outputs, vm.mem)
+
+
+def run_generator(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    mem = intcode.prg_to_memory(prg)
+    return RunResult(list(intcode.run(mem, deque(inputs))), mem)
+
+
+def run_compiled(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    mem = intcode.prg_to_memory(prg)
+    return RunResult(intcode.run_compiled(mem, inputs), mem)
+
+
+def run_batch(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    return RunResult(intcode.run_batch(prg, [inputs])[0], None)
+
+
+def run_simd(prg: intcode.Program, inputs: List[int]) -> RunResult:
+    simd = pytest.importorskip("intcode.simd")
+    return RunResult(simd.run_batch(prg, [inputs])[0], None)
+
+
+ENGINES: Dict[str, Callable[[intcode.Program, List[int]], RunResult]] = {
+    **{f"execute-{e.name.lower()}": run_execute(e) for e in intcode.Engine},
+    "execute-interpreter-fused": run_execute(intcode.Engine.INTERPRETER, fused=True),
+    "execute-threaded-fused": run_execute(intcode.Engine.THREADED, fused=True),
+    "execute-memoised": run_execute(intcode.Engine.INTERPRETER, memoised=True),
+    "execute_sync": run_execute_sync,
+    "vm": run_vm,
+    "generator": run_generator,
+    "run_compiled": run_compiled,
+    "run_batch": run_batch,
+    "simd": run_simd,
+}
+
+engines = pytest.mark.parametrize("engine", ENGINES)
+
+
+def load_program(day: str) -> intcode.Program:
+    with open(os.path.join(BASE_DIR, "..", day, "input.txt")) as f:
+        return [int(x) for x in f.read().strip().split(",")]
+
+
+# (program, final memory) from the day 02 and day 05 examples
+MEMORY_EXAMPLES: List[Tuple[intcode.Program, intcode.Program]] = [
+    ([1, 0, 0, 0, 99], [2, 0, 0, 0, 99]),
+    ([2, 3, 0, 3, 99], [2, 3, 0, 6, 99]),
+    ([2, 4, 4, 5, 99, 0], [2, 4, 4, 5, 99, 9801]),
+    ([1, 1, 1, 4, 99, 5, 6, 0, 99], [30, 1, 1, 4, 2, 5, 6, 0, 99]),
+    ([1002, 4, 3, 4, 33], [1002, 4, 3, 4, 99]),
+    ([1101, 100, -1, 4, 0], [1101, 100, -1, 4, 99]),
+]
+
+
+@engines
+@pytest.mark.parametrize("prg,expected", MEMORY_EXAMPLES)
+def test_memory(engine, prg, expected):
+    mem = ENGINES[engine](prg, []).mem
+    if mem is None:
+        pytest.skip(f"{engine} does not expose memory")
+    assert [mem[i] for i in range(len(expected))] == expected
+
+
+# Outputs 999 if the input is below 8, 1000 if it is equal to 8, 1001 otherwise
+COMPARE_TO_8 = [
+    3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31, 1106, 0, 36,
+    98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104, 999, 1105, 1, 46, 1101,
+    1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99,
+]  # fmt: skip
+
+QUINE = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+
+# A loop at 20 overwrites the condition of the jump at 4 (fused with the
+# comparison before it) then jumps back to 0, so the jump is no longer taken
+OVERWRITES_FUSED_JUMP = [
+    1108, 1, 1, 100, 1005, 100, 20, 104, 0, 99, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1001,
+    101, 1, 101, 1008, 101, 2, 102, 1005, 102, 40, 1101, 0, 103, 5, 1105, 1, 0, 99,
+    99, 104, 1, 99,
+]  # fmt: skip
+
+# (program, inputs, outputs) from the day 05 and day 09 examples, and
+# regression tests
+IO_EXAMPLES = [
+    ([3, 0, 4, 0, 99], [42], [42]),
+    ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8], [1]),
+    ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [9], [0]),
+    ([3, 9, 7, 9, 10, 9, 4, 9, 99, -1, 8], [7], [1]),
+    ([3, 3, 1108, -1, 8, 3, 4, 3, 99], [8], [1]),
+    ([3, 3, 1107, -1, 8, 3, 4, 3, 99], [8], [0]),
+    ([3, 12, 6, 12, 15, 1, 13, 14, 13, 4, 13, 99, -1, 0, 1, 9], [0], [0]),
+    ([3, 3, 1105, -1, 9, 1101, 0, 0, 12, 4, 12, 99, 1], [5], [1]),
+    (COMPARE_TO_8, [7], [999]),
+    (COMPARE_TO_8, [8], [1000]),
+    (COMPARE_TO_8, [9], [1001]),
+    (QUINE, [], QUINE),
+    ([1102, 34915192, 34915192, 7, 4, 7, 99, 0], [], [1219070632396864]),
+    ([104, 1125899906842624, 99], [], [1125899906842624]),
+    (OVERWRITES_FUSED_JUMP, [], [0]),
+]
+
+
+@engines
+@pytest.mark.parametrize("prg,inputs,expected", IO_EXAMPLES)
+def test_outputs(engine, prg, inputs, expected):
+    assert ENGINES[engine](prg, inputs).outputs == expected
+
+
+@engines
+@pytest.mark.parametrize("system_id,expected", [(1, 9006673), (5, 3629692)])
+def test_day_05_diagnostics(engine, system_id, expected):
+    outputs = ENGINES[engine](load_program("05"), [system_id]).outputs
+    # Every test outputs 0 if it passed, followed by the diagnostic code
+    assert outputs[-1] == expected
+    assert not any(outputs[:-1])
+
+
+@engines
+def test_day_09_boost_test_mode(engine):
+    assert ENGINES[engine](load_program("09"), [1]).outputs == [3507134798]
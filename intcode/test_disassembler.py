@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+import intcode
+from intcode import Analysis, BasicBlock, Mode, OpCodes, disassembler
+from intcode.test_intcode import SELF_MODIFYING
+from intcode.test_profiler import COUNTDOWN
+
+# Calls a subroutine (outputting 7) at 10 which returns to 9, where it stops
+CALL = [109, 20, 21101, 0, 9, 0, 1105, 1, 10, 99, 104, 7, 2106, 0, 0]
+
+# Writes the jump at 4 (1105, 1, 7), which is only valid code once written
+WRITES_JUMP = [1101, 1100, 5, 4, 0, 1, 7, 99]
+
+
+@pytest.fixture(autouse=True)
+def no_cached_analyses(monkeypatch):
+    monkeypatch.setattr(disassembler, "_analyses", {})
+
+
+def test_instructions():
+    analysis = intcode.disassemble(COUNTDOWN)
+    assert sorted(analysis.instructions) == [0, 2, 4, 8, 11]
+    inst = analysis.instructions[4]
+    assert inst.op == OpCodes.ADD and inst.end == 8
+    assert inst.modes == (Mode.POSITION, Mode.IMMEDIATE, Mode.POSITION)
+    assert str(inst) == "     4: ADD [12], -1, [12]"
+    # Data isn't disassembled
+    assert 12 not in analysis.instructions
+
+
+def test_control_flow():
+    analysis = intcode.disassemble(COUNTDOWN)
+    assert analysis.jumps == {8: 2}
+    assert analysis.blocks == {
+        0: BasicBlock(0, 2, (2,)),
+        2: BasicBlock(2, 4, (4,)),
+        4: BasicBlock(4, 11, (2, 11)),
+        11: BasicBlock(11, 12, ()),
+    }
+
+
+def test_call_and_return():
+    analysis = intcode.disassemble(CALL)
+    assert analysis.entry_points == (0, 9)
+    assert analysis.jumps == {6: 10, 12: None}
+    assert analysis.blocks == {
+        0: BasicBlock(0, 9, (10,)),
+        9: BasicBlock(9, 10, ()),
+        10: BasicBlock(10, 12, (12,)),
+        12: BasicBlock(12, 15, ()),
+    }
+    assert intcode.run_compiled(intcode.prg_to_memory(CALL), []) == [7]
+
+
+@pytest.mark.parametrize(
+    "prg,writes", [(SELF_MODIFYING, {2: 0}), (WRITES_JUMP, {0: 4}), (COUNTDOWN, {})]
+)
+def test_self_modifying_writes(prg, writes):
+    analysis = intcode.disassemble(prg)
+    assert analysis.writes == writes
+    assert analysis.volatile == set(writes.values())
+
+
+def test_listing():
+    lines = intcode.disassemble(SELF_MODIFYING).listing().splitlines()
+    assert lines == [
+        "*     0: OUTPUT [9]",
+        "",
+        "      2: ADD 0, 99, [0]",
+        "      6: JUMP_IF_TRUE 1, 0",
+    ]
+
+
+def test_analyse_cached(tmp_path):
+    analysis = intcode.analyse(CALL, str(tmp_path))
+    path = tmp_path / f"{intcode.program_digest(CALL)}.json"
+    assert Analysis.from_dict(json.loads(path.read_text())) == analysis
+    # Cached in memory too
+    os.remove(path)
+    assert intcode.analyse(CALL, str(tmp_path)) is analysis
+    assert not path.exists()
+
+
+def test_analyse_cached_per_directory(tmp_path):
+    intcode.analyse(CALL, str(tmp_path / "a"))
+    intcode.analyse(CALL, str(tmp_path / "b"))
+    assert (tmp_path / "b" / f"{intcode.program_digest(CALL)}.json").exists()
+
+
+def test_analyse_loads_cached(tmp_path, monkeypatch):
+    analysis = intcode.analyse(CALL, str(tmp_path))
+    monkeypatch.setattr(disassembler, "_analyses", {})
+    monkeypatch.setattr(disassembler, "disassemble", None)
+    assert intcode.analyse(CALL, str(tmp_path)) == analysis
+
+
+def test_analyse_recomputes_other_versions(tmp_path, monkeypatch):
+    path = tmp_path / f"{intcode.program_digest(CALL)}.json"
+    version = disassembler.VERSION
+    monkeypatch.setattr(disassembler, "VERSION", version - 1)
+    intcode.analyse(CALL, str(tmp_path))
+    assert json.loads(path.read_text())["version"] == version - 1
+    monkeypatch.setattr(disassembler, "_analyses", {})
+    monkeypatch.setattr(disassembler, "VERSION", version)
+    assert intcode.analyse(CALL, str(tmp_path)) == intcode.disassemble(CALL)
+    assert json.loads(path.read_text())["version"] == version
+
+
+@pytest.mark.parametrize("contents", ["[]", "{}", '{"version": []}', "{"])
+def test_analyse_recomputes_corrupt(tmp_path, contents):
+    path = tmp_path / f"{intcode.program_digest(CALL)}.json"
+    path.write_text(contents)
+    assert intcode.analyse(CALL, str(tmp_path)) == intcode.disassemble(CALL)
+    assert json.loads(path.read_text())["version"] == disassembler.VERSION
+
+
+def test_analyse_cleans_up_failed_write(tmp_path, monkeypatch):
+    def replace(src, dst):
+        raise OSError("Disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    assert intcode.analyse(CALL, str(tmp_path)) == intcode.disassemble(CALL)
+    assert os.listdir(tmp_path) == []
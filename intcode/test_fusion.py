@@ -0,0 +1,136 @@
+from typing import List
+
+import pytest
+
+import intcode
+from intcode import Fusion, Pattern
+from intcode.test_intcode import MODIFIES_OWN_BLOCK, QUINE, SELF_MODIFYING
+from intcode.test_profiler import COUNTDOWN
+
+# The comparison writes over the opcode of the fused jump, turning it into an ADD
+# which stores 42 for output
+OVERWRITES_FUSED_OPCODE = [1107, 0, 1, 4, 1005, 4, 11, 12, 4, 12, 99, 41, 0]
+
+# The comparison writes over the fused jump's condition parameter, so the jump
+# reads its condition from address 1 and isn't taken
+OVERWRITES_FUSED_PARAMETER = [1107, 0, 1, 5, 1005, 5, 10, 104, 1, 99, 104, 2, 99]
+
+FUSING_ENGINES = [intcode.Engine.INTERPRETER, intcode.Engine.THREADED]
+
+
+def run_fused(
+    prg: intcode.Program, inputs: List[int], engine: intcode.Engine, fusion: Fusion
+) -> List[int]:
+    inputs = inputs[:]
+    output: List[int] = []
+    mem = intcode.prg_to_memory(prg)
+    intcode.execute_sync(mem, inputs.pop, output.append, engine=engine, fusion=fusion)
+    return output
+
+
+@pytest.mark.parametrize(
+    "prg,start,pattern,instructions",
+    [
+        ([1008, 10, 16, 11, 1005, 11, 0], 0, Pattern.COMPARE_JUMP, 2),
+        ([1001, 10, 1, 11, 5, 5, 11], 0, Pattern.ARITHMETIC_JUMP, 2),
+        (QUINE, 4, Pattern.ARITHMETIC_COMPARE_JUMP, 3),
+        ([99, 1007, 9, 3, 9, 1006, 9, 0], 1, Pattern.COMPARE_JUMP, 2),
+        ([21107, 1, 2, 0, 1205, 0, 0], 0, Pattern.COMPARE_JUMP, 2),
+        ([21101, 0, 7, 0, 1105, 1, 10], 0, Pattern.CALL, 2),
+        ([21101, 0, 7, 0, 1106, 0, 10], 0, Pattern.CALL, 2),
+    ],
+)
+def test_match(prg, start, pattern, instructions):
+    sup = intcode.match_superinstruction(intcode.prg_to_memory(prg), start)
+    assert sup.op == pattern
+    assert sup.start == start
+    assert len(sup.instructions) == instructions
+    assert sup.end == start + 4 * (instructions - 1) + 3
+
+
+@pytest.mark.parametrize(
+    "prg",
+    [
+        # Jump on a different cell
+        [1008, 10, 16, 11, 1005, 12, 0],
+        # Same value, different modes
+        [1008, 10, 16, 11, 205, 11, 0],
+        # Jump which is never taken
+        [21101, 0, 7, 0, 1106, 1, 10],
+        # Not followed by a jump
+        [1008, 10, 16, 11, 4, 11, 99],
+        # Not an arithmetic instruction or comparison
+        [4, 0, 1005, 0, 0],
+        # Invalid opcodes
+        [1008, 10, 16, 11, 42],
+        [98],
+    ],
+)
+def test_no_match(prg):
+    assert intcode.match_superinstruction(intcode.prg_to_memory(prg), 0) is None
+
+
+@pytest.mark.parametrize(
+    "prg,inputs,expected",
+    [
+        (QUINE, [], QUINE),
+        (COUNTDOWN, [3], [3, 2, 1]),
+        (SELF_MODIFYING, [], [42]),
+        (MODIFIES_OWN_BLOCK, [], [2]),
+        (OVERWRITES_FUSED_OPCODE, [], [42]),
+        (OVERWRITES_FUSED_PARAMETER, [], [1]),
+    ],
+)
+@pytest.mark.parametrize("engine", FUSING_ENGINES)
+def test_outputs_unchanged(prg, inputs, expected, engine):
+    assert run_fused(prg, inputs, engine, Fusion()) == expected
+
+
+@pytest.mark.parametrize("engine", FUSING_ENGINES)
+def test_stats(engine):
+    fusion = Fusion()
+    run_fused(QUINE, [], engine, fusion)
+    # One superinstruction per loop iteration, the last iteration falls through
+    assert fusion.stats == (
+        1,
+        {
+            Pattern.COMPARE_JUMP: 0,
+            Pattern.ARITHMETIC_JUMP: 0,
+            Pattern.ARITHMETIC_COMPARE_JUMP: len(QUINE),
+            Pattern.CALL: 0,
+        },
+        2 * len(QUINE),
+    )
+
+
+@pytest.mark.parametrize("engine", FUSING_ENGINES)
+def test_interrupted_superinstruction_not_counted(engine):
+    fusion = Fusion()
+    run_fused(OVERWRITES_FUSED_OPCODE, [], engine, fusion)
+    assert fusion.fused == 1
+    assert fusion.dispatches_saved == 0
+
+
+def test_threaded_superinstruction_compiled_once():
+    mem = intcode.prg_to_memory(QUINE)
+    code = intcode.ThreadedCode(mem, fusion=Fusion())
+    op = code.fetch(4)
+    assert code.fetch(4) is op
+    # The superinstruction covers the following instructions
+    assert 8 not in code.ops and 12 not in code.ops
+    code.invalidate(13)
+    assert 4 not in code.ops
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"engine": intcode.Engine.COMPILED},
+        {"profiler": intcode.Profiler()},
+        {"decode_cache": intcode.DecodeCache()},
+    ],
+)
+def test_unsupported(kwargs):
+    mem = intcode.prg_to_memory(QUINE)
+    with pytest.raises(ValueError):
+        intcode.execute_generator(mem, fusion=Fusion(), **kwargs)
@@ -0,0 +1,310 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import List
+
+import pytest
+
+import intcode
+from intcode import compiled
+
+QUINE = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+
+# Outputs mem[9] then overwrites its own first opcode with STOP and jumps back to it
+SELF_MODIFYING = [4, 9, 1101, 0, 99, 0, 1105, 1, 0, 42]
+
+# Overwrites a parameter of the following instruction with 2 before it is executed
+MODIFIES_OWN_BLOCK = [1101, 1, 1, 6, 1101, 0, 5, 20, 4, 20, 99]
+
+
+def run_program(
+    prg: intcode.Program, inputs: List[int] = None, paged: bool = False, **kwargs
+) -> List[int]:
+    inputs = list(inputs or [])
+    output: List[int] = []
+
+    async def read_in():
+        return inputs.pop(0)
+
+    async def write_out(val: int):
+        output.append(val)
+
+    asyncio.run(
+        intcode.execute(intcode.prg_to_memory(prg, paged), read_in, write_out, **kwargs)
+    )
+    return output
+
+
+@pytest.mark.parametrize(
+    "prg,inputs,expected",
+    [
+        (QUINE, [], QUINE),
+        ([1102, 34915192, 34915192, 7, 4, 7, 99, 0], [], [1219070632396864]),
+        ([104, 1125899906842624, 99], [], [1125899906842624]),
+        ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8], [1]),
+        ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [7], [0]),
+        ([3, 3, 1107, -1, 8, 3, 4, 3, 99], [5], [1]),
+        ([3, 12, 6, 12, 15, 1, 13, 14, 13, 4, 13, 99, -1, 0, 1, 9], [0], [0]),
+        (SELF_MODIFYING, [], [42]),
+        (MODIFIES_OWN_BLOCK, [], [2]),
+    ],
+)
+@pytest.mark.parametrize("engine", list(intcode.Engine))
+@pytest.mark.parametrize("paged", [False, True])
+def test_execute(prg, inputs, expected, engine, paged):
+    assert run_program(prg, inputs, paged, engine=engine) == expected
+
+
+@pytest.mark.parametrize("engine", list(intcode.Engine))
+def test_execute_immediate_exit(engine):
+    prg = [109, 5, 3, 0, 99]
+
+    async def read_in():
+        return intcode.DebugCommands.IMMEDIATE_EXIT
+
+    mem = intcode.prg_to_memory(prg)
+    snapshot = asyncio.run(
+        intcode.execute(mem, read_in, intcode.no_input, engine=engine)
+    )
+    assert snapshot == (mem, 2, 5)
+
+
+class TestExecuteGenerator:
+    # Outputs each input doubled, forever
+    DOUBLER = [3, 9, 1002, 9, 2, 9, 4, 9, 1105, 1, 0]
+
+    @pytest.mark.parametrize("engine", list(intcode.Engine))
+    def test_send_inputs(self, engine):
+        vm = intcode.execute_generator(
+            intcode.prg_to_memory(self.DOUBLER), engine=engine
+        )
+        assert next(vm) is None  # Requires input
+        assert vm.send(3) == 6
+        assert next(vm) is None
+        assert vm.send(5) == 10
+
+    @pytest.mark.parametrize("engine", list(intcode.Engine))
+    def test_returns_on_stop(self, engine):
+        vm = intcode.execute_generator(intcode.prg_to_memory(QUINE), engine=engine)
+        assert list(vm) == QUINE
+
+    @pytest.mark.parametrize("engine", list(intcode.Engine))
+    def test_immediate_exit(self, engine):
+        mem = intcode.prg_to_memory(self.DOUBLER)
+        vm = intcode.execute_generator(mem, engine=engine)
+        next(vm)
+        vm.send(3)
+        next(vm)
+        with pytest.raises(StopIteration) as stop:
+            vm.send(intcode.DebugCommands.IMMEDIATE_EXIT)
+        assert stop.value.value == (mem, 0, 0)
+
+
+@pytest.mark.parametrize("engine", list(intcode.Engine))
+def test_execute_sync(engine):
+    inputs = iter([8])
+    output: List[int] = []
+    prg = [3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8]
+    mem = intcode.prg_to_memory(prg)
+    intcode.execute_sync(mem, lambda: next(inputs), output.append, engine=engine)
+    assert output == [1]
+
+
+def test_execute_sync_no_input():
+    with pytest.raises(RuntimeError):
+        intcode.execute_sync(intcode.prg_to_memory([3, 0, 99]), intcode.no_input, print)
+
+
+class TestPagedMemory:
+    def test_read_program(self):
+        mem = intcode.PagedMemory(QUINE)
+        assert [mem[i] for i in range(len(QUINE))] == QUINE
+        assert mem[len(QUINE)] == 0
+
+    def test_write_grows_pages(self):
+        mem = intcode.PagedMemory(QUINE)
+        addr = intcode.PAGE_SIZE * 3 + 5
+        mem[addr] = 7
+        assert mem[addr] == 7
+        assert not mem._overflow
+
+    @pytest.mark.parametrize(
+        "addr", [-1, intcode.PAGE_SIZE * (intcode.MAX_PAGE_GROWTH + 1)]
+    )
+    def test_far_writes_overflow(self, addr):
+        mem = intcode.PagedMemory(QUINE)
+        mem[addr] = 7
+        assert mem[addr] == 7
+        assert mem._overflow == {addr: 7}
+
+    def test_growth_moves_overflow(self):
+        mem = intcode.PagedMemory(QUINE)
+        addr = intcode.PAGE_SIZE * (intcode.MAX_PAGE_GROWTH + 1)
+        mem[addr] = 7
+        mem[intcode.PAGE_SIZE * intcode.MAX_PAGE_GROWTH] = 1
+        mem[addr + 1] = 1  # Now close enough to the allocated pages to grow them
+        assert mem[addr] == 7
+        assert not mem._overflow
+
+    def test_copy(self):
+        mem = intcode.PagedMemory(QUINE)
+        mem[-1] = 1
+        copied = mem.copy()
+        assert copied == mem
+        copied[0] = 0
+        copied[-1] = 0
+        assert copied != mem
+        assert mem[0] == QUINE[0] and mem[-1] == 1
+
+    def test_copy_shares_pages(self):
+        mem = intcode.PagedMemory(QUINE)
+        mem[intcode.PAGE_SIZE] = 1
+        copied = mem.copy()
+        assert copied._pages[0] is mem._pages[0]
+        assert copied.shared_pages == mem.shared_pages == 2
+
+        copied[intcode.PAGE_SIZE] = 2
+        # Only the written page is copied
+        assert copied._pages[0] is mem._pages[0]
+        assert copied._pages[1] is not mem._pages[1]
+        assert copied.shared_pages == 1
+        assert mem[intcode.PAGE_SIZE] == 1
+
+        mem[0] = 0
+        assert copied[0] == QUINE[0]
+
+    def test_items(self):
+        mem = intcode.PagedMemory([1, 0, 2])
+        mem[-5] = 3
+        assert list(mem.items()) == [(0, 1), (2, 2), (-5, 3)]
+
+    def test_container(self):
+        mem = intcode.prg_to_memory([1, 0, 2], paged=True)
+        mem[-5] = 3
+        assert 1 in mem and intcode.PAGE_SIZE - 1 in mem and -5 in mem
+        assert intcode.PAGE_SIZE not in mem and -1 not in mem and "a" not in mem
+        assert list(mem) == [0, 2, -5]
+        assert len(mem) == 3
+
+
+class TestDecodeCache:
+    def test_hits(self):
+        cache = intcode.DecodeCache()
+        run_program(QUINE, decode_cache=cache)
+        # 5 instructions executed once per output, plus the final STOP
+        assert cache.stats == (len(QUINE) * 5 - 5, 6, 0)
+
+    def test_self_modifying_write_invalidates(self):
+        cache = intcode.DecodeCache()
+        assert run_program(SELF_MODIFYING, decode_cache=cache) == [42]
+        assert cache.stats == (0, 4, 1)
+
+
+class TestThreadedCode:
+    def test_compiled_once(self):
+        mem = intcode.prg_to_memory(QUINE)
+        code = intcode.ThreadedCode(mem)
+        op = code.fetch(0)
+        assert code.fetch(0) is op
+        assert 0 in code.ops
+
+    def test_self_modified_instruction_not_cached(self):
+        mem = intcode.prg_to_memory(SELF_MODIFYING)
+        code = intcode.ThreadedCode(mem)
+        code.fetch(0)
+        code.fetch(2)
+        kind, fn = code.fetch(2)
+        fn()  # Overwrites the opcode at address 0
+        assert 0 not in code.ops
+        assert code.self_modified == {0}
+        code.fetch(0)
+        assert 0 not in code.ops
+
+
+class TestBlockCode:
+    def test_translate_block(self):
+        mem = intcode.prg_to_memory(QUINE)
+        block = intcode.translate_block(mem, 0)
+        assert block.start == 0
+        assert block.end == 2  # Stops before OUTPUT
+        assert "rb += 1" in block.source
+
+    def test_translate_block_ends_at_jump(self):
+        mem = intcode.prg_to_memory(QUINE)
+        block = intcode.translate_block(mem, 4)
+        assert block.end == 15
+
+    def test_no_block_at_io(self):
+        mem = intcode.prg_to_memory(QUINE)
+        assert intcode.translate_block(mem, 2) is None
+
+    def test_compiled_blocks_shared_between_runs(self):
+        first = intcode.compile_block(intcode.prg_to_memory(QUINE), 4)
+        second = intcode.compile_block(intcode.prg_to_memory(QUINE), 4)
+        assert first[0] is second[0]
+
+    def test_compiled_blocks_evicted(self, monkeypatch):
+        monkeypatch.setattr(compiled, "MAX_COMPILED_BLOCKS", 2)
+        monkeypatch.setattr(compiled, "_compiled_blocks", OrderedDict())
+        monkeypatch.setattr(compiled, "_block_ends", {})
+        # The same block with different constants, compiled for each
+        for n in range(3):
+            mem = intcode.prg_to_memory([1101, n, 1, 5, 99, 0])
+            assert intcode.compile_block(mem, 0)[1] == 4
+        assert len(compiled._compiled_blocks) == 2
+        assert compiled._block_ends == {0: {4: 2}}
+        # The least recently used block was evicted
+        assert (0, (1101, 0, 1, 5)) not in compiled._compiled_blocks
+
+    def test_self_modified_block_discarded(self):
+        code = intcode.BlockCode(intcode.prg_to_memory(MODIFIES_OWN_BLOCK))
+        block = code.fetch(0)
+        assert block(code.mem, 0, code.cells, code.invalidate) == (4, 0)
+        assert 0 not in code.blocks
+        assert code.volatile == {6}
+
+    def test_volatile_parameters_read_from_memory(self):
+        mem = intcode.prg_to_memory(MODIFIES_OWN_BLOCK)
+        source = intcode.translate_block(mem, 4, volatile={6}).source
+        assert "mem[6]" in source
+
+    def test_volatile_opcode_not_translated(self):
+        mem = intcode.prg_to_memory(MODIFIES_OWN_BLOCK)
+        assert intcode.translate_block(mem, 0, volatile={4}).end == 4
+
+    def test_fork_learns_volatile(self):
+        image = intcode.BlockCode(intcode.prg_to_memory(MODIFIES_OWN_BLOCK))
+        code = image.fork(image.mem.copy())
+        code.run_until_io(0, 0)
+        image.learn(code)
+        assert image.volatile == {6}
+        assert image.fork(image.mem.copy()).run_until_io(0, 0)[1:] == (8, 0)
+
+
+class TestRunBatch:
+    # Outputs 1 if the input is equal to 8, 0 otherwise
+    EQUAL_TO_8 = [3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8]
+
+    def test_run_compiled(self):
+        assert intcode.run_compiled(intcode.prg_to_memory(QUINE), []) == QUINE
+
+    def test_run_compiled_input_exhausted(self):
+        with pytest.raises(RuntimeError):
+            intcode.run_compiled(intcode.prg_to_memory(self.EQUAL_TO_8), [])
+
+    @pytest.mark.parametrize("processes", [None, 2])
+    def test_run_batch(self, processes):
+        inputs = [[x] for x in range(5, 12)]
+        outputs = intcode.run_batch(self.EQUAL_TO_8, inputs, processes=processes)
+        assert outputs == [[0], [0], [0], [1], [0], [0], [0]]
+
+    def test_runs_are_independent(self):
+        # Overwrites its own code, every run must start from the original program
+        assert intcode.run_batch(MODIFIES_OWN_BLOCK, [[], []]) == [[2], [2]]
+
+    def test_analysis_cached_on_disk_if_requested(self, tmp_path):
+        path = tmp_path / f"{intcode.program_digest(self.EQUAL_TO_8)}.json"
+        intcode.run_batch(self.EQUAL_TO_8, [[8]])
+        assert not os.path.exists(os.environ["INTCODE_CACHE_DIR"])
+        intcode.run_batch(self.EQUAL_TO_8, [[8]], cache_dir=str(tmp_path))
+        assert path.exists()
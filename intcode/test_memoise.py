@@ -0,0 +1,98 @@
+from typing import List
+
+import pytest
+
+import intcode
+from intcode import MemoStats, Memoiser
+
+# Outputs fib(n) of its input, calculated by a naively recursive subroutine at 14
+# taking its argument (and returning its result) at [rb+1] and its return
+# address at [rb+0] of the caller's frame
+FIB = [
+    109, 100, 203, 1, 21101, 0, 11, 0, 1105, 1, 14, 204, 1, 99,
+    109, 3, 21207, -2, 2, -1, 1205, -1, 56,
+    21201, -2, -1, 1, 21101, 0, 34, 0, 1105, 1, 14,
+    22101, 0, 1, -1, 21201, -2, -2, 1, 21101, 0, 49, 0, 1105, 1, 14,
+    22201, -1, 1, -2, 1105, 1, 56,
+    109, -3, 2105, 1, 0,
+]  # fmt: skip
+
+# Calls a subroutine at 20, which outputs its input, twice
+OUTPUTS = [
+    109, 50, 3, 100, 21101, 0, 11, 0, 1105, 1, 20, 21101, 0, 18, 0, 1105, 1, 20, 99,
+    0, 109, 1, 4, 100, 109, -1, 2105, 1, 0,
+]  # fmt: skip
+
+# Calls a subroutine at 29 at rb=100 then rb=198, which writes 5 to [rb+2] then
+# copies global 200 to 300 for the caller to output. At rb=198, [rb+2] is 200
+ALIASES_GLOBAL = [
+    109, 100, 1101, 7, 0, 200, 21101, 0, 13, 0, 1105, 1, 29, 4, 300, 109, 98,
+    1001, 301, 1, 301, 1008, 301, 2, 302, 1006, 302, 6, 99,
+    109, 1, 21101, 5, 0, 1, 1001, 200, 0, 300, 109, -1, 2106, 0, 0,
+]  # fmt: skip
+
+
+def run(prg: intcode.Program, inputs: List[int], **kwargs) -> List[int]:
+    inputs = inputs[::-1]
+    output: List[int] = []
+    mem = intcode.prg_to_memory(prg)
+    intcode.execute_sync(mem, inputs.pop, output.append, **kwargs)
+    return output
+
+
+@pytest.mark.parametrize("n,expected", [(0, 0), (1, 1), (2, 1), (10, 55), (20, 6765)])
+def test_outputs_unchanged(n, expected):
+    assert run(FIB, [n]) == [expected]
+    assert run(FIB, [n], memoiser=Memoiser()) == [expected]
+
+
+def test_stats():
+    memoiser = Memoiser()
+    run(FIB, [20], memoiser=memoiser)
+    # fib(k) is calculated once for each of its return addresses (the call of
+    # fib(k - 1) and of fib(k - 2)), rather than 21891 calls
+    hits, misses, evictions, uncacheable, saved = memoiser.stats
+    assert misses == 2 * 20 - 1 and hits == 2 * 20 - 6
+    assert evictions == uncacheable == 0
+    assert saved > 200000
+    assert len(memoiser) == misses
+    # Results are kept between runs
+    assert run(FIB, [20], memoiser=memoiser) == [6765]
+    assert memoiser.hits == hits + 1
+
+
+def test_calls_at_other_depths_share_results():
+    memoiser = Memoiser()
+    run(FIB, [10], memoiser=memoiser)
+    assert memoiser.misses == 19
+    # Only fib(11), and the fib(10) and fib(9) it calls, are new. The rest were
+    # calculated by fib(10) with a shallower stack
+    run(FIB, [11], memoiser=memoiser)
+    assert memoiser.misses == 19 + 3
+
+
+def test_relative_cell_aliasing_absolute_cell():
+    memoiser = Memoiser()
+    assert run(ALIASES_GLOBAL, []) == [7, 5]
+    assert run(ALIASES_GLOBAL, [], memoiser=memoiser) == [7, 5]
+    assert memoiser.hits == 0
+
+
+def test_lru_eviction():
+    memoiser = Memoiser(maxsize=2)
+    assert run(FIB, [15], memoiser=memoiser) == [610]
+    assert len(memoiser) == 2 and memoiser.evictions > 0
+
+
+def test_io_not_memoised():
+    memoiser = Memoiser()
+    assert run(OUTPUTS, [7], memoiser=memoiser) == [7, 7]
+    assert memoiser.stats == MemoStats(0, 2, 0, 2, 0)
+
+
+def test_unsupported_options():
+    mem = intcode.prg_to_memory(FIB)
+    with pytest.raises(ValueError):
+        intcode.execute_generator(mem, memoiser=Memoiser(), trace=intcode.Trace())
+    with pytest.raises(ValueError):
+        intcode.execute_generator(mem, memoiser=Memoiser(), fusion=intcode.Fusion())
@@ -0,0 +1,50 @@
+import pytest
+
+import intcode
+from intcode import SnapshotPool, VMSnapshot
+from intcode.test_profiler import COUNTDOWN
+from intcode.test_vm import DOUBLER
+
+
+@pytest.fixture
+def snapshot():
+    # DOUBLER waiting for its first input, with a pending input of 5
+    return VMSnapshot(intcode.prg_to_memory(DOUBLER, paged=True), 0, 0, inputs=(5,))
+
+
+def test_run_snapshot(snapshot):
+    assert intcode.run_snapshot(snapshot, [1, 2]) == [10, 2, 4]
+    # The snapshot is unchanged, so can be run again
+    assert intcode.run_snapshot(snapshot, [3]) == [10, 6]
+
+
+def test_imap_unordered(snapshot):
+    jobs = [[i] for i in range(1, 21)]
+    with SnapshotPool(snapshot, processes=2) as pool:
+        results = dict(pool.imap_unordered(jobs))
+        assert pool.completed == 20
+    assert results == {i: [10, 2 * (i + 1)] for i in range(20)}
+
+
+def test_from_path(snapshot, tmp_path):
+    path = str(tmp_path / "doubler.icvm")
+    intcode.save_snapshot(snapshot, path)
+    with SnapshotPool(path, processes=1, engine=intcode.Engine.THREADED) as pool:
+        assert pool.submit([7]).result() == [10, 14]
+
+
+def test_first_cancels_remaining_jobs():
+    # Each job counts down from 20000, long enough for most jobs to be pending
+    snapshot = VMSnapshot(intcode.prg_to_memory(COUNTDOWN, paged=True), 0, 0)
+    jobs = [[20000]] * 20
+    with SnapshotPool(snapshot, processes=1) as pool:
+        i, outputs = pool.first(jobs, lambda outputs: outputs[-1] == 1)
+        assert len(outputs) == 20000
+        assert pool.completed < 20
+        assert pool.cancelled > 0
+
+
+def test_first_not_found(snapshot):
+    with SnapshotPool(snapshot, processes=1) as pool:
+        assert pool.first([[1], [2]], lambda outputs: 42 in outputs) is None
+        assert pool.completed == 2
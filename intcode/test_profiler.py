@@ -0,0 +1,92 @@
+import json
+from typing import List
+
+import pytest
+
+import intcode
+from intcode import OpCodes, Profiler
+from intcode.test_intcode import QUINE, SELF_MODIFYING
+
+# Counts down from the input to 1, outputting each value
+COUNTDOWN = [3, 12, 4, 12, 1001, 12, -1, 12, 1005, 12, 2, 99, 0]
+
+
+def profile(prg: intcode.Program, inputs: List[int], profiler: Profiler) -> List[int]:
+    inputs = inputs[:]
+    output: List[int] = []
+    mem = intcode.prg_to_memory(prg)
+    intcode.execute_sync(mem, inputs.pop, output.append, profiler=profiler)
+    return output
+
+
+@pytest.mark.parametrize(
+    "prg,inputs,expected",
+    [(QUINE, [], QUINE), (SELF_MODIFYING, [], [42]), (COUNTDOWN, [3], [3, 2, 1])],
+)
+def test_outputs_unchanged(prg, inputs, expected):
+    assert profile(prg, inputs, Profiler()) == expected
+
+
+def test_counts():
+    profiler = Profiler()
+    profile(COUNTDOWN, [3], profiler)
+    assert profiler.instructions == 1 + 3 * 3 + 1
+    assert profiler.opcodes[OpCodes.OUTPUT] == 3
+    assert profiler.addresses[2] == 3
+    assert profiler.addresses[11] == 1  # STOP
+    assert profiler.jumps == {(8, 2): 2}
+    assert [w.op for w in profiler.io_waits] == [OpCodes.INPUT] + [OpCodes.OUTPUT] * 3
+
+
+def test_blocks_and_loops():
+    profiler = Profiler()
+    profile(COUNTDOWN, [3], profiler)
+    assert profiler.blocks() == [
+        intcode.Block(4, 11, 3, 6),  # Decrement and jump
+        intcode.Block(2, 4, 3, 3),  # Output
+        intcode.Block(0, 2, 1, 1),  # Input
+        intcode.Block(11, 12, 1, 1),  # Stop
+    ]
+    assert profiler.loops() == [intcode.Loop(2, 11, 2, 9)]
+
+
+def test_indirect_jumps_are_not_loops():
+    # Decrements mem[8] and jumps back to the target in mem[9] until it is 0
+    prg = [101, -1, 8, 8, 5, 8, 9, 99, 2, 0]
+    profiler = Profiler()
+    profile(prg, [], profiler)
+    assert profiler.jumps == {(4, 0): 1}
+    assert profiler.indirect_jumps == {4}
+    assert profiler.loops() == []
+
+
+def test_accumulates_across_runs():
+    profiler = Profiler()
+    profile(COUNTDOWN, [3], profiler)
+    profile(COUNTDOWN, [2], profiler)
+    assert profiler.runs == 2
+    assert profiler.opcodes[OpCodes.OUTPUT] == 5
+
+
+def test_immediate_exit():
+    mem = intcode.prg_to_memory(COUNTDOWN)
+    vm = intcode.execute_generator(mem, profiler=Profiler())
+    next(vm)
+    with pytest.raises(StopIteration) as stop:
+        vm.send(intcode.DebugCommands.IMMEDIATE_EXIT)
+    assert stop.value.value == (mem, 0, 0)
+
+
+def test_dump(tmp_path):
+    profiler = Profiler()
+    profile(COUNTDOWN, [3], profiler)
+    path = tmp_path / "profile.json"
+    profiler.dump(str(path))
+    report = json.loads(path.read_text())
+    assert report["instructions"] == 11
+    assert report["opcodes"]["ADD"] == 3
+    assert report["io_waits"]["output"]["count"] == 3
+    assert report["loops"] == [
+        {"start": 2, "end": 11, "iterations": 2, "instructions": 9}
+    ]
+    assert "Hottest loops:" in profiler.summary()
@@ -0,0 +1,44 @@
+import pytest
+
+import intcode
+from intcode.test_intcode import MODIFIES_OWN_BLOCK, QUINE, SELF_MODIFYING
+
+pytest.importorskip("numpy")
+
+from intcode import simd  # noqa: E402
+
+# Outputs 999 if the input is below 8, 1000 if it is equal to 8, 1001 otherwise
+COMPARE_TO_8 = [
+    3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31, 1106, 0, 36,
+    98, 0, 0, 1002, 21, 125, 20, 4, 20, 1105, 1, 46, 104, 999, 1105, 1, 46, 1101,
+    1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99,
+]  # fmt: skip
+
+
+@pytest.mark.parametrize(
+    "prg,inputs",
+    [
+        (QUINE, [[]] * 3),
+        (SELF_MODIFYING, [[]] * 3),
+        (MODIFIES_OWN_BLOCK, [[]] * 3),
+        (COMPARE_TO_8, [[x] for x in range(12)]),
+        ([109, 2000, 203, 0, 204, 0, 99], [[x] for x in range(3)]),
+    ],
+)
+def test_run_batch(prg, inputs):
+    assert simd.run_batch(prg, inputs) == intcode.run_batch(prg, inputs)
+
+
+def test_input_exhausted():
+    with pytest.raises(RuntimeError):
+        simd.run_batch(COMPARE_TO_8, [[1], []])
+
+
+def test_stats():
+    vm = simd.LockstepVM(COMPARE_TO_8, [[7], [7], [8], [9]])
+    vm.run()
+    stats = vm.stats
+    assert stats.lanes == 4
+    # Lanes only diverge for part of the program
+    assert stats.dispatches < stats.lane_steps < stats.dispatches * 4
+    assert 0.25 < stats.utilisation < 1
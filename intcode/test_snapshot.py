@@ -0,0 +1,125 @@
+import asyncio
+import os
+import struct
+
+import pytest
+
+import intcode
+from intcode import IntCodeVM, SnapshotError, Status, VMSnapshot
+from intcode.snapshot import HEADER
+from intcode.test_vm import DOUBLER
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "vm.icvm")
+
+
+def save_and_load(snapshot: VMSnapshot, path: str) -> VMSnapshot:
+    intcode.save_snapshot(snapshot, path)
+    return intcode.load_snapshot(path)
+
+
+@pytest.mark.parametrize("paged", [False, True])
+def test_round_trip(paged, path):
+    mem = intcode.prg_to_memory(DOUBLER, paged)
+    mem[5000] = 1 << 70  # Too big for a page
+    mem[-3] = -(1 << 65)
+    mem[10**9] = 7  # Far beyond the pages
+    snapshot = VMSnapshot(mem, 8, -4, Status.HALTED_ON_OUTPUT, (1, 1 << 80), (-5,))
+
+    loaded = save_and_load(snapshot, path)
+    assert loaded.ip == 8 and loaded.rel_base == -4
+    assert loaded.status == Status.HALTED_ON_OUTPUT
+    assert loaded.inputs == (1, 1 << 80) and loaded.outputs == (-5,)
+    assert dict(loaded.mem.items()) == {a: v for a, v in mem.items() if v}
+
+
+def test_pages_are_mapped_copy_on_write(path):
+    mem = intcode.prg_to_memory(DOUBLER * 200, paged=True)
+    loaded = save_and_load(VMSnapshot(mem, 0, 0), path)
+    assert loaded.mem.shared_pages == 3
+    loaded.mem[3] = 42
+    assert loaded.mem.shared_pages == 2
+    # The file is unaffected
+    assert intcode.load_snapshot(path).mem[3] == DOUBLER[3]
+
+
+def test_resume_vm(path):
+    vm = IntCodeVM(DOUBLER, input_val=3)
+    vm.execute_until_complete_or_io()
+    restored = IntCodeVM.from_snapshot(save_and_load(vm.to_snapshot(), path))
+    assert restored.status == Status.HALTED_ON_INPUT
+    # 3 was already read
+    assert restored.to_snapshot().inputs == ()
+    assert restored.execute_until_complete_or_io() == 6
+
+
+def test_resume_execute(path):
+    mem = intcode.prg_to_memory(DOUBLER, paged=True)
+    inputs = [intcode.DebugCommands.IMMEDIATE_EXIT, 4]
+    outputs = []
+
+    async def read_in():
+        return inputs.pop()
+
+    async def write_out(val: int):
+        outputs.append(val)
+
+    mem, ip, rel_base = asyncio.run(intcode.execute(mem, read_in, write_out))
+    loaded = save_and_load(VMSnapshot(mem, ip, rel_base, Status.INTERRUPTED), path)
+    inputs = [intcode.DebugCommands.IMMEDIATE_EXIT, 5]
+    asyncio.run(intcode.execute(loaded.mem, read_in, write_out, ip=ip))
+    assert outputs == [8, 10]
+
+
+def corrupt(path: str, offset: int, data: bytes):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def test_save_is_atomic(path, monkeypatch):
+    intcode.save_snapshot(VMSnapshot(intcode.prg_to_memory(DOUBLER), 0, 0), path)
+
+    def interrupted(src, dst):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        intcode.save_snapshot(VMSnapshot(intcode.prg_to_memory([99]), 0, 0), path)
+    # The previous snapshot is intact, and the temporary file removed
+    assert intcode.load_snapshot(path).mem[0] == DOUBLER[0]
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_checksum(path):
+    intcode.save_snapshot(VMSnapshot(intcode.prg_to_memory(DOUBLER), 0, 0), path)
+    corrupt(path, HEADER.size + 8, b"\xff")
+    with pytest.raises(SnapshotError, match="Checksum"):
+        intcode.load_snapshot(path)
+    # Not verified, so loads the corrupt memory
+    assert intcode.load_snapshot(path, verify=False).mem[1] == 0xFF
+
+
+def test_unsupported_version(path):
+    intcode.save_snapshot(VMSnapshot(intcode.prg_to_memory(DOUBLER), 0, 0), path)
+    corrupt(path, 4, struct.pack("<H", 99))
+    with pytest.raises(SnapshotError, match="version 99"):
+        intcode.load_snapshot(path)
+
+
+@pytest.mark.parametrize("data", [b"", b"ICVM", b"not a snapshot" * 10])
+def test_not_a_snapshot(data, path):
+    with open(path, "wb") as f:
+        f.write(data)
+    with pytest.raises(SnapshotError):
+        intcode.load_snapshot(path)
+
+
+def test_truncated(path):
+    intcode.save_snapshot(VMSnapshot(intcode.prg_to_memory(DOUBLER), 0, 0), path)
+    with open(path, "r+b") as f:
+        f.truncate(HEADER.size + 100)
+    with pytest.raises(SnapshotError, match="truncated"):
+        intcode.load_snapshot(path, verify=False)
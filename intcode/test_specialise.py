@@ -0,0 +1,63 @@
+import pytest
+
+import intcode
+from intcode import SpecialisationCache, SpecialisationCacheStats, Status, VMSnapshot
+from intcode.test_intcode import QUINE
+from intcode.test_profiler import COUNTDOWN
+from intcode.test_vm import DOUBLER
+
+# Outputs 42 before reading its first input, then outputs each input doubled
+PROMPT = [104, 42, 3, 11, 1002, 11, 2, 11, 4, 11, 1105, 1, 2]
+
+
+def start(prg):
+    return VMSnapshot(intcode.prg_to_memory(prg), 0, 0)
+
+
+def test_specialise():
+    residual = intcode.specialise(start(PROMPT), [1, 2])
+    assert residual.status == Status.INTERRUPTED
+    assert residual.ip == 2 and residual.outputs == (42, 2, 4)
+    assert intcode.run_snapshot(residual, [3]) == [6]
+
+
+def test_specialise_complete():
+    residual = intcode.specialise(start(COUNTDOWN), [3, 4])
+    assert residual.status == Status.COMPLETE
+    assert residual.outputs == (3, 2, 1)
+    assert intcode.specialise(start(QUINE), []).outputs == tuple(QUINE)
+
+
+def test_specialise_leaves_snapshot_unchanged():
+    snapshot = start(PROMPT)
+    intcode.specialise(snapshot, [1])
+    assert snapshot.mem == intcode.prg_to_memory(PROMPT)
+
+
+@pytest.mark.parametrize("engine", list(intcode.Engine))
+def test_run(engine):
+    cache = SpecialisationCache()
+    assert cache.run(PROMPT, [1, 2], [3], engine=engine) == [42, 2, 4, 6]
+    assert cache.stats == SpecialisationCacheStats(0, 0, 1)
+    assert cache.run(PROMPT, [1, 2], [5], engine=engine) == [42, 2, 4, 10]
+    assert cache.stats == SpecialisationCacheStats(1, 0, 1)
+    # Resumes from [1, 2]
+    assert cache.run(PROMPT, [1, 2, 7], engine=engine) == [42, 2, 4, 14]
+    # Resumes from the start up
+    assert cache.run(PROMPT, [8], engine=engine) == [42, 16]
+    assert cache.stats == SpecialisationCacheStats(1, 2, 1)
+
+
+def test_keyed_by_program():
+    cache = SpecialisationCache()
+    assert cache.run(DOUBLER, [1]) == [2]
+    assert cache.run(PROMPT, [1]) == [42, 2]
+    assert cache.stats.misses == 2
+    assert intcode.program_digest(DOUBLER) != intcode.program_digest(PROMPT)
+
+
+def test_specialised_copy():
+    cache = SpecialisationCache()
+    residual = cache.specialise(PROMPT, [1])
+    residual.mem[0] = 99
+    assert cache.run(PROMPT, [1]) == [42, 2]
@@ -0,0 +1,102 @@
+from typing import List
+
+import pytest
+
+import intcode
+from intcode import OpCodes, ReplayError, Trace, TraceEvent
+from intcode.test_intcode import QUINE, SELF_MODIFYING
+from intcode.test_profiler import COUNTDOWN
+from intcode.test_vm import DOUBLER
+
+
+def record(prg: intcode.Program, inputs: List, trace: Trace) -> List[int]:
+    inputs = inputs[::-1]
+    output: List[int] = []
+    mem = intcode.prg_to_memory(prg)
+    intcode.execute_sync(mem, inputs.pop, output.append, trace=trace)
+    return output
+
+
+@pytest.mark.parametrize(
+    "prg,inputs,expected",
+    [(QUINE, [], QUINE), (SELF_MODIFYING, [], [42]), (COUNTDOWN, [3], [3, 2, 1])],
+)
+def test_outputs_unchanged(prg, inputs, expected):
+    assert record(prg, inputs, Trace()) == expected
+
+
+def test_events():
+    trace = Trace()
+    record(COUNTDOWN, [3], trace)
+    assert trace.events == [
+        TraceEvent(OpCodes.INPUT, 3, 0),
+        TraceEvent(OpCodes.OUTPUT, 3, 1),
+        TraceEvent(OpCodes.OUTPUT, 2, 4),
+        TraceEvent(OpCodes.OUTPUT, 1, 7),
+    ]
+    assert trace.inputs == [3] and trace.outputs == [3, 2, 1]
+    assert trace.instructions == 1 + 3 * 3 + 1
+
+
+@pytest.mark.parametrize("engine", list(intcode.Engine))
+def test_replay(engine):
+    trace = Trace()
+    record(COUNTDOWN, [5], trace)
+    mem = intcode.prg_to_memory(COUNTDOWN)
+    assert intcode.replay(trace, mem, engine=engine) is None
+
+
+def test_replay_stopped_session():
+    # The session was stopped while DOUBLER was waiting for a third input
+    trace = Trace()
+    outputs = record(DOUBLER, [1, 2, intcode.DebugCommands.IMMEDIATE_EXIT], trace)
+    assert outputs == [2, 4] and trace.inputs == [1, 2]
+    mem, ip, rel_base = intcode.replay(trace, intcode.prg_to_memory(DOUBLER))
+    assert ip == 0
+
+
+def test_replay_differs():
+    trace = Trace()
+    record(COUNTDOWN, [3], trace)
+    mem = intcode.prg_to_memory(COUNTDOWN)
+    trace.events[2] = TraceEvent(OpCodes.OUTPUT, 42, 4)
+    with pytest.raises(ReplayError, match="Output 1"):
+        intcode.replay(trace, mem.copy())
+    assert intcode.replay(trace, mem.copy(), verify=False) is None
+
+    trace.events[2] = TraceEvent(OpCodes.OUTPUT, 2, 4)
+    trace.events.append(TraceEvent(OpCodes.OUTPUT, 0, 10))
+    with pytest.raises(ReplayError, match="Fewer outputs"):
+        intcode.replay(trace, mem.copy())
+
+
+def test_replay_instructions_differ():
+    trace = Trace()
+    record([104, 7, 99], [], trace)
+    # Prints the same output, but after an extra instruction
+    mem = intcode.prg_to_memory([1101, 0, 0, 9, 104, 7, 99, 0, 0, 0])
+    with pytest.raises(ReplayError, match="OUTPUT 0 after 1 instructions, not 0"):
+        intcode.replay(trace, mem.copy())
+    assert intcode.replay(trace, mem.copy(), verify=False) is None
+
+    trace = Trace()
+    record(COUNTDOWN, [3], trace)
+    trace.instructions += 1
+    with pytest.raises(ReplayError, match="11 instructions, not 12"):
+        intcode.replay(trace, intcode.prg_to_memory(COUNTDOWN))
+
+
+def test_dump_and_load(tmp_path):
+    trace = Trace()
+    record(COUNTDOWN, [3], trace)
+    path = str(tmp_path / "trace.json")
+    trace.dump(path)
+    assert Trace.load(path) == trace
+
+
+def test_unsupported_options():
+    mem = intcode.prg_to_memory(COUNTDOWN)
+    with pytest.raises(ValueError):
+        intcode.execute_generator(mem, profiler=intcode.Profiler(), trace=Trace())
+    with pytest.raises(ValueError):
+        intcode.execute_generator(mem, fusion=intcode.Fusion(), trace=Trace())
@@ -0,0 +1,64 @@
+import pytest
+
+import intcode
+from intcode import IntCodeVM, Status
+
+# Outputs each input doubled, forever
+DOUBLER = [3, 9, 1002, 9, 2, 9, 4, 9, 1105, 1, 0]
+
+
+def test_halts_on_io():
+    vm = IntCodeVM(DOUBLER, input_val=3)
+    assert vm.status == Status.NOT_STARTED
+    assert vm.execute_until_complete_or_io() is None
+    assert vm.status == Status.HALTED_ON_INPUT
+    assert vm.execute_until_complete_or_io() == 6
+    assert vm.status == Status.HALTED_ON_OUTPUT
+
+
+def test_runs_to_completion():
+    vm = IntCodeVM([104, 7, 99])
+    assert vm.execute_until_complete_or_input() is None
+    assert vm.status == Status.COMPLETE
+    assert vm.output == 7
+
+
+def test_immediate_exit():
+    vm = IntCodeVM(DOUBLER, input_val=intcode.DebugCommands.IMMEDIATE_EXIT)
+    vm.execute()
+    assert vm.status == Status.INTERRUPTED
+
+
+def test_snapshot_round_trip():
+    vm = IntCodeVM(DOUBLER, input_val=3)
+    vm.execute_until_complete_or_io()
+    snapshot = vm.to_snapshot()
+
+    assert vm.execute_until_complete_or_io() == 6
+    # The snapshot is a copy, unaffected by the VM continuing
+    assert snapshot.mem[9] == 3 and snapshot.ip == 2
+
+    restored = IntCodeVM.from_snapshot(snapshot)
+    assert restored.execute_until_complete_or_io() == 6
+
+
+def test_snapshot_only_has_pending_io():
+    vm = IntCodeVM([3, 9, 4, 9, 3, 9, 4, 9, 99, 0], input_val=7)
+    assert vm.to_snapshot().inputs == (7,)
+    assert vm.execute_until_complete_or_io() is None
+    assert vm.execute_until_complete_or_io() == 7
+    # 7 has been read and output already
+    snapshot = vm.to_snapshot()
+    assert snapshot.inputs == () and snapshot.outputs == ()
+    assert intcode.run_snapshot(snapshot, [42]) == [42]
+    vm.input_val = 42
+    assert intcode.run_snapshot(vm.to_snapshot(), []) == [42]
+
+
+def test_from_snapshot_rejects_io_it_cant_hold():
+    snapshot = IntCodeVM(DOUBLER).to_snapshot()
+    assert IntCodeVM.from_snapshot(snapshot._replace(inputs=(1,))).input_val == 1
+    with pytest.raises(ValueError):
+        IntCodeVM.from_snapshot(snapshot._replace(inputs=(1, 2)))
+    with pytest.raises(ValueError):
+        IntCodeVM.from_snapshot(snapshot._replace(outputs=(1, 2)))
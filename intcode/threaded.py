@@ -0,0 +1,312 @@
+"""
+Threaded code Intcode engine: each instruction is compiled into a closure.
+"""
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Optional, Set, Tuple
+
+from .core import (
+    DebugCommands,
+    ExecutionGenerator,
+    Instruction,
+    Mode,
+    OpCodes,
+    parse_instruction,
+)
+from .fusion import OPERATIONS, Fusion, Pattern, Superinstruction
+from .memory import Memory
+
+# Kinds of compiled instruction, determines how `execute_threaded` dispatches them
+_PURE, _INPUT, _OUTPUT, _STOP = range(4)
+
+ThreadedOp = Tuple[int, Callable]
+
+
+def _reader(
+    mem: Memory, rb: List[int], inst: Instruction, ip: int, param: int
+) -> Callable[[], int]:
+    """Closure reading parameter `param` of `inst` at `ip`."""
+    val = mem[ip + param]
+    return {
+        Mode.POSITION: lambda: mem[val],
+        Mode.IMMEDIATE: lambda: val,
+        Mode.RELATIVE: lambda: mem[rb[0] + val],
+    }[inst.modes[param - 1]]
+
+
+def _address(
+    mem: Memory, rb: List[int], inst: Instruction, ip: int, param: int
+) -> Callable[[], int]:
+    """Closure returning the address written by parameter `param` of `inst`."""
+    val = mem[ip + param]
+    return {
+        Mode.POSITION: lambda: val,
+        Mode.RELATIVE: lambda: rb[0] + val,
+    }[inst.modes[param - 1]]
+
+
+class ThreadedCode:
+    """Intcode instructions compiled into closures ('threaded code') for `mem`.
+
+    Each instruction is compiled the first time it is executed into a closure
+    with its addressing modes and parameters fixed, removing the per-step
+    decoding and opcode/mode dispatch of `execute`. Compiled closures return the
+    address of the next instruction, apart from I/O:
+
+    - `_INPUT` closures take the input value to write
+    - `_OUTPUT` closures return the value to output
+
+    Writes which land on a compiled instruction discard it and mark its address
+    as self-modified. Self-modified instructions are never cached again, instead
+    they are decoded each time they are executed, as in `execute`.
+
+    With `fusion`, superinstructions (see `intcode.fusion`) are compiled into a
+    single closure, which counts as one instruction spanning all their cells.
+    """
+
+    def __init__(self, mem: Memory, rel_base: int = 0, fusion: Optional[Fusion] = None):
+        self.mem = mem
+        self.rel_base = [rel_base]  # Boxed to be shared with compiled closures
+        self.fusion = fusion
+        self.ops: Dict[int, ThreadedOp] = {}
+        self._cells: DefaultDict[int, List[int]] = defaultdict(list)
+        self._lengths: Dict[int, int] = {}
+        self.self_modified: Set[int] = set()
+
+    def fetch(self, ip: int) -> ThreadedOp:
+        try:
+            return self.ops[ip]
+        except KeyError:
+            pass
+        assert ip >= 0
+        op, length = self._compile(ip)
+        if ip not in self.self_modified:
+            self.ops[ip] = op
+            self._lengths[ip] = length
+            for addr in range(ip, ip + length):
+                self._cells[addr].append(ip)
+        return op
+
+    def invalidate(self, addr: int):
+        for start in self._cells.pop(addr, ()):
+            del self.ops[start]
+            for other in range(start, start + self._lengths.pop(start)):
+                if other != addr:
+                    self._cells[other].remove(start)
+                    if not self._cells[other]:
+                        del self._cells[other]
+            self.self_modified.add(start)
+
+    def _compile(self, ip: int) -> Tuple[ThreadedOp, int]:
+        mem, rb, cells, invalidate = (
+            self.mem,
+            self.rel_base,
+            self._cells,
+            self.invalidate,
+        )
+        if self.fusion is not None and ip not in self.self_modified:
+            sup = self.fusion.match(mem, ip)
+            if sup is not None:
+                return (_PURE, self._compile_fused(sup)), sup.end - ip
+        inst = parse_instruction(mem[ip])
+        op = inst.op
+
+        def reader(param: int) -> Callable[[], int]:
+            return _reader(mem, rb, inst, ip, param)
+
+        def address(param: int) -> Callable[[], int]:
+            return _address(mem, rb, inst, ip, param)
+
+        if op == OpCodes.STOP:
+            return (_STOP, None), 1
+        elif op == OpCodes.INPUT:
+            dst = address(1)
+            nxt = ip + 2
+
+            def fn(val):
+                addr = dst()
+                mem[addr] = val
+                if addr in cells:
+                    invalidate(addr)
+                return nxt
+
+            return (_INPUT, fn), 2
+        elif op == OpCodes.OUTPUT:
+            return (_OUTPUT, reader(1)), 2
+        elif op == OpCodes.SET_REL_BASE:
+            x = reader(1)
+            nxt = ip + 2
+
+            def fn():
+                rb[0] += x()
+                return nxt
+
+            return (_PURE, fn), 2
+        elif op in (OpCodes.JUMP_IF_TRUE, OpCodes.JUMP_IF_FALSE):
+            x, y = reader(1), reader(2)
+            nxt = ip + 3
+            if op == OpCodes.JUMP_IF_TRUE:
+
+                def fn():
+                    return y() if x() else nxt
+
+            else:
+
+                def fn():
+                    return nxt if x() else y()
+
+            return (_PURE, fn), 3
+        elif op in (OpCodes.ADD, OpCodes.MUL, OpCodes.LT, OpCodes.EQ):
+            x, y, dst = reader(1), reader(2), address(3)
+            nxt = ip + 4
+            if op == OpCodes.ADD:
+
+                def fn():
+                    addr = dst()
+                    mem[addr] = x() + y()
+                    if addr in cells:
+                        invalidate(addr)
+                    return nxt
+
+            elif op == OpCodes.MUL:
+
+                def fn():
+                    addr = dst()
+                    mem[addr] = x() * y()
+                    if addr in cells:
+                        invalidate(addr)
+                    return nxt
+
+            elif op == OpCodes.LT:
+
+                def fn():
+                    addr = dst()
+                    mem[addr] = 1 if x() < y() else 0
+                    if addr in cells:
+                        invalidate(addr)
+                    return nxt
+
+            else:
+
+                def fn():
+                    addr = dst()
+                    mem[addr] = 1 if x() == y() else 0
+                    if addr in cells:
+                        invalidate(addr)
+                    return nxt
+
+            return (_PURE, fn), 4
+        raise RuntimeError(f"Invalid opcode {op}")
+
+    def _compile_fused(self, sup: Superinstruction) -> Callable[[], int]:
+        """Closure executing `sup`.
+
+        Results are passed on directly rather than read back from memory. If a
+        write lands on compiled code (possibly the superinstruction itself) the
+        closure stops and returns the address of the following instruction, so
+        it is executed (recompiled if need be) separately.
+        """
+        mem, rb, cells, invalidate = (
+            self.mem,
+            self.rel_base,
+            self._cells,
+            self.invalidate,
+        )
+        executions, pattern = self.fusion.counter(sup), sup.op
+        start, end = sup.start, sup.end
+        first, jump = sup.instructions[0], sup.instructions[-1]
+        jump_at = end - 3
+        compute = OPERATIONS[first.op]
+        x, y, dst = (
+            _reader(mem, rb, first, start, 1),
+            _reader(mem, rb, first, start, 2),
+            _address(mem, rb, first, start, 3),
+        )
+        if_true = jump.op == OpCodes.JUMP_IF_TRUE
+
+        if pattern == Pattern.COMPARE_JUMP:
+            target = _reader(mem, rb, jump, jump_at, 2)
+
+            def fn():
+                addr = dst()
+                mem[addr] = val = compute(x(), y())
+                if addr in cells:
+                    invalidate(addr)
+                    return jump_at
+                executions[0] += 1
+                return target() if val == if_true else end
+
+        elif pattern == Pattern.ARITHMETIC_JUMP:
+            cond = _reader(mem, rb, jump, jump_at, 1)
+
+            def fn():
+                addr = dst()
+                mem[addr] = val = compute(x(), y())
+                if addr in cells:
+                    invalidate(addr)
+                    return jump_at
+                executions[0] += 1
+                return val if bool(cond()) == if_true else end
+
+        elif pattern == Pattern.CALL:
+            target = _reader(mem, rb, jump, jump_at, 2)
+
+            def fn():
+                addr = dst()
+                mem[addr] = compute(x(), y())
+                if addr in cells:
+                    invalidate(addr)
+                    return jump_at
+                executions[0] += 1
+                return target()
+
+        else:
+            second = sup.instructions[1]
+            compare = OPERATIONS[second.op]
+            x2, y2, dst2 = (
+                _reader(mem, rb, second, start + 4, 1),
+                _reader(mem, rb, second, start + 4, 2),
+                _address(mem, rb, second, start + 4, 3),
+            )
+            target = _reader(mem, rb, jump, jump_at, 2)
+
+            def fn():
+                addr = dst()
+                mem[addr] = compute(x(), y())
+                if addr in cells:
+                    invalidate(addr)
+                    return start + 4
+                addr = dst2()
+                mem[addr] = val = compare(x2(), y2())
+                if addr in cells:
+                    invalidate(addr)
+                    return jump_at
+                executions[0] += 1
+                return target() if val == if_true else end
+
+        return fn
+
+
+def execute_threaded(
+    mem: Memory, ip: int = 0, rel_base: int = 0, fusion: Optional[Fusion] = None
+) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`) using `ThreadedCode`.
+
+    Engine for `execute_generator` (see it for argument details).
+    """
+    code = ThreadedCode(mem, rel_base, fusion)
+    ops, fetch = code.ops, code.fetch
+    while True:
+        kind, fn = ops[ip] if ip in ops else fetch(ip)
+        if kind == _PURE:
+            ip = fn()
+        elif kind == _INPUT:
+            val = yield None
+            if val is DebugCommands.IMMEDIATE_EXIT:
+                # Return 'snapshot' of VM state for debugging
+                return mem, ip, code.rel_base[0]
+            ip = fn(val)
+        elif kind == _OUTPUT:
+            yield fn()
+            ip += 2
+        else:
+            return
@@ -0,0 +1,203 @@
+"""
+Deterministic recording and replay of Intcode sessions.
+
+Pass a `Trace` to `execute` (or `execute_sync`/`execute_generator`) to record
+every input consumed and output produced by the program, along with the number
+of instructions executed before each::
+
+    trace = intcode.Trace()
+    intcode.execute_sync(mem.copy(), game.handle_input, game.handle_output, trace=trace)
+    trace.dump("day13.json")
+
+A recorded session can then be replayed, on any engine, without whatever drove
+it (a game controller, a droid's search...), e.g. to benchmark the VM alone on a
+realistic workload or to bisect a performance regression against a fixed trace::
+
+    trace = intcode.Trace.load("day13.json")
+    intcode.replay(trace, mem.copy(), verify=False, engine=intcode.Engine.THREADED)
+
+By default `replay` instead records the replay, checking that the program still
+produces the same outputs after the same number of instructions.
+
+Like profiling, recording runs the program with its own (counting) interpreter.
+"""
+import json
+from typing import Any, Dict, List, NamedTuple
+
+from .compiled import _decode, _param_address, _step, _write_address
+from .core import DebugCommands, ExecutionGenerator, OpCodes
+from .memory import Memory
+
+
+class TraceEvent(NamedTuple):
+    op: OpCodes  # `OpCodes.INPUT` or `OpCodes.OUTPUT`
+    value: int
+    # Instructions executed (in this session) before the I/O instruction
+    instruction: int
+
+
+class ReplayError(ValueError):
+    """The program's output differed from the recorded session's."""
+
+
+class Trace:
+    def __init__(self, events: List[TraceEvent] = None, instructions: int = 0):
+        self.events: List[TraceEvent] = events if events is not None else []
+        # Instructions executed in the session, including the final instruction
+        self.instructions = instructions
+
+    @property
+    def inputs(self) -> List[int]:
+        return [e.value for e in self.events if e.op == OpCodes.INPUT]
+
+    @property
+    def outputs(self) -> List[int]:
+        return [e.value for e in self.events if e.op == OpCodes.OUTPUT]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instructions": self.instructions,
+            "events": [[e.op.name, e.value, e.instruction] for e in self.events],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Trace":
+        events = [TraceEvent(OpCodes[op], val, i) for op, val, i in d["events"]]
+        return cls(events, d["instructions"])
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "Trace":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Trace):
+            return NotImplemented
+        return self.events == other.events and self.instructions == other.instructions
+
+    def __repr__(self) -> str:
+        return (
+            f"Trace({len(self.inputs)} inputs, {len(self.outputs)} outputs, "
+            f"{self.instructions} instructions)"
+        )
+
+
+def execute_traced(
+    mem: Memory, trace: Trace, ip: int = 0, rel_base: int = 0
+) -> ExecutionGenerator:
+    """Executes a program 'loaded' into memory (`mem`), recording its I/O.
+
+    Engine for `execute_generator` (see it for argument details). The trace is
+    recorded to, not reset, so should be new for each session.
+    """
+    events = trace.events
+    instructions = 0
+    try:
+        while True:
+            inst = _decode(mem[ip])
+            op = inst.op
+            if op == OpCodes.STOP:
+                instructions += 1
+                return
+            elif op == OpCodes.INPUT:
+                val = yield None
+                if val is DebugCommands.IMMEDIATE_EXIT:
+                    # Return 'snapshot' of VM state for debugging
+                    return mem, ip, rel_base
+                events.append(TraceEvent(OpCodes.INPUT, val, instructions))
+                mem[_write_address(mem, inst, ip, rel_base, 1)] = val
+                ip += 2
+            elif op == OpCodes.OUTPUT:
+                val = mem[_param_address(mem, inst, ip, rel_base, 1)]
+                events.append(TraceEvent(OpCodes.OUTPUT, val, instructions))
+                yield val
+                ip += 2
+            else:
+                ip, rel_base, _ = _step(mem, inst, ip, rel_base)
+            instructions += 1
+    finally:
+        trace.instructions += instructions
+
+
+def replay(
+    trace: Trace,
+    mem: Memory,
+    ip: int = 0,
+    rel_base: int = 0,
+    verify: bool = True,
+    **kwargs,
+):
+    """Runs a program with the inputs of a recorded session.
+
+    The program is stopped (with `DebugCommands.IMMEDIATE_EXIT`) if it requires
+    more inputs than were recorded, e.g. if the session was stopped or cancelled.
+
+    Args:
+        trace: Recorded session
+        mem: Memory containing the program at the start of the session, along
+            with `ip` and `rel_base` (see `execute`)
+        verify: Check that every output, and the number of instructions executed
+            before each input and output and in total, are the same as recorded.
+            This records the replay, so runs the program with the recording
+            interpreter instead of any `engine` (default True)
+        kwargs: Passed to `execute_sync`, e.g. `engine`
+    Returns:
+        As `execute`, the `(mem, ip, rel_base)` snapshot if the program was
+        stopped
+    Raises:
+        ReplayError: If (with `verify`) the program's outputs or instruction
+            counts differ from the recording
+    """
+    from .interpreter import execute_sync  # Which imports this module
+
+    inputs = iter(trace.inputs)
+
+    def read_in() -> int:
+        if verify:
+            check()
+        return next(inputs, DebugCommands.IMMEDIATE_EXIT)
+
+    if not verify:
+        return execute_sync(mem, read_in, lambda _: None, ip, rel_base, **kwargs)
+
+    replayed = Trace()
+    checked = 0  # Events of `replayed` compared with `trace`
+    n_outputs = 0
+
+    def check():
+        nonlocal checked, n_outputs
+        for event in replayed.events[checked:]:
+            recorded = trace.events[checked] if checked < len(trace.events) else None
+            if recorded is None or event.op != recorded.op:
+                raise ReplayError(f"{event.op.name} {checked} isn't in the trace")
+            if event.value != recorded.value:
+                raise ReplayError(
+                    f"Output {n_outputs} ({event.value}) differs from the trace"
+                )
+            if event.instruction != recorded.instruction:
+                raise ReplayError(
+                    f"{event.op.name} {checked} after {event.instruction} "
+                    f"instructions, not {recorded.instruction} as in the trace"
+                )
+            n_outputs += event.op == OpCodes.OUTPUT
+            checked += 1
+
+    def write_out(_: int):
+        check()
+
+    result = execute_sync(
+        mem, read_in, write_out, ip, rel_base, trace=replayed, **kwargs
+    )
+    check()
+    if checked < len(trace.events):
+        raise ReplayError(f"Fewer outputs ({n_outputs}) than the trace")
+    if replayed.instructions != trace.instructions:
+        raise ReplayError(
+            f"{replayed.instructions} instructions, not {trace.instructions} as in "
+            "the trace"
+        )
+    return result
@@ -1,54 +1,16 @@
 """
-Simpler re-implementation of the Intcode VM *without asyncio* as using asyncio
-made solving today's puzzle overly complex. I may refactor previous solutions to
-use this (or similar) implementation as in hindsight the asyncio VM is not a
-great implementation.
-"""
-from collections import defaultdict
-from enum import Enum, IntEnum
-from typing import DefaultDict, List, NamedTuple, Optional
-
-Program = List[int]
-Memory = DefaultDict[int, int]
-
-
-class DebugCommands(Enum):
-    IMMEDIATE_EXIT = 0
-
-
-class Mode(IntEnum):
-    POSITION = 0
-    IMMEDIATE = 1
-    RELATIVE = 2
-
-
-class Instruction(NamedTuple):
-    op: int
-    modes: List[Mode]
-
-
-class OpCodes(IntEnum):
-    ADD = 1
-    MUL = 2
-    INPUT = 3
-    OUTPUT = 4
-    JUMP_IF_TRUE = 5
-    JUMP_IF_FALSE = 6
-    LT = 7
-    EQ = 8
-    SET_REL_BASE = 9
-    STOP = 99
-
-
-def parse_instruction(code: int) -> Instruction:
-    op = code % 100
-    inst = Instruction(op, [Mode(code // i % 10) for i in (100, 1000, 10000)])
-    assert inst.modes[-1] in (Mode.POSITION, Mode.RELATIVE)
-    return inst
+Stepping Intcode VM, *without asyncio*.
 
+Originally written for day 23 as using the asyncio VM (`execute`) made solving
+that puzzle overly complex. The caller drives the VM, running it until it halts
+on input and/or output, then inspecting `output` and setting `input_val` before
+resuming it.
+"""
+from enum import Enum
+from typing import NamedTuple, Optional, Tuple
 
-def prg_to_memory(prg: Program) -> Memory:
-    return defaultdict(int, enumerate(prg))
+from .core import DebugCommands, Instruction, Mode, OpCodes, Program, parse_instruction
+from .memory import Memory, prg_to_memory
 
 
 class Status(Enum):
@@ -65,28 +27,73 @@ class VMSnapshot(NamedTuple):
     mem: Memory
     ip: int
     rel_base: int
+    status: Status = Status.NOT_STARTED
+    # Pending I/O: inputs not yet read by the program, outputs not yet consumed
+    inputs: Tuple[int, ...] = ()
+    outputs: Tuple[int, ...] = ()
 
 
 class IntCodeVM:
     def __init__(self, prg: Program, input_val: int = 0):
         self.mem: Memory = prg_to_memory(prg)
-        self.input_val: int = input_val
+        self.input_val = input_val
         self.output: Optional[int] = None
         self.status: Status = Status.NOT_STARTED
 
         self._ip: int = 0
         self._rel_base: int = 0
 
+    @property
+    def input_val(self) -> int:
+        """Input read by the next input instruction (and any after it, until set)."""
+        return self._input_val
+
+    @input_val.setter
+    def input_val(self, val: int):
+        self._input_val = val
+        # Whether `input_val` is yet to be read, i.e. is pending
+        self._input_pending = True
+
     @staticmethod
     def from_snapshot(snapshot: VMSnapshot) -> "IntCodeVM":
+        """VM resuming `snapshot`.
+
+        Raises:
+            ValueError: If the snapshot has more than one pending input or output,
+                as the VM only holds one of each
+        """
+        if len(snapshot.inputs) > 1 or len(snapshot.outputs) > 1:
+            raise ValueError(
+                f"IntCodeVM can't hold {len(snapshot.inputs)} pending inputs and "
+                f"{len(snapshot.outputs)} pending outputs"
+            )
         vm = IntCodeVM([0])  # Dummy program
         vm.mem = snapshot.mem
         vm._ip = snapshot.ip
         vm._rel_base = snapshot.rel_base
+        vm.status = snapshot.status
+        if snapshot.inputs:
+            vm.input_val = snapshot.inputs[0]
+        else:
+            vm._input_pending = False
+        if snapshot.outputs:
+            vm.output = snapshot.outputs[0]
         return vm
 
     def to_snapshot(self) -> VMSnapshot:
-        return VMSnapshot(self.mem.copy(), self._ip, self._rel_base)
+        """Copy of the VM's state.
+
+        `input_val` is only a pending input if it hasn't been read yet. `output`
+        has already been returned to the caller, so is never a pending output.
+        """
+        pending = self._input_pending and isinstance(self.input_val, int)
+        return VMSnapshot(
+            self.mem.copy(),
+            self._ip,
+            self._rel_base,
+            self.status,
+            (self.input_val,) if pending else (),
+        )
 
     def execute_until_complete_or_input(self) -> Optional[int]:
         return self.execute(halt_on_input=True, halt_on_output=False)
@@ -119,6 +126,7 @@ class IntCodeVM:
                     self.status = Status.INTERRUPTED
                     return None
                 self._write(inst, 1, self.input_val)
+                self._input_pending = False
                 self._ip += 2
                 if halt_on_input:
                     self.status = Status.HALTED_ON_INPUT